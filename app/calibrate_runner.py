@@ -1,16 +1,17 @@
 import copy
+from dataclasses import dataclass
 from itertools import product
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
+from scipy.optimize import lsq_linear
 from scipy.stats import spearmanr, kendalltau
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import KFold
-from sklearn.neighbors import BallTree
 
-from app import config, engine, calibration_utils
+from app import config, engine, calibration_utils, kernels, spatial_index, transport
 from app.calibration_engine import CalibrationEngine
 
 # Default search space for physical parameters
@@ -29,7 +30,7 @@ def _prepare_inputs() -> Tuple[pd.DataFrame, pd.DataFrame, Dict]:
     """Load common inputs once to avoid repeated I/O in calibration."""
     base_scenario = copy.deepcopy(config.SCENARIOS["baseline_2025"])
     sanitation = engine.apply_interventions(
-        engine.load_and_standardize_sanitation(), base_scenario
+        engine.load_sanitation_sources()[0], base_scenario
     )
     gov_boreholes = pd.read_csv(config.GOVERNMENT_BOREHOLES_ENRICHED_PATH)
     return sanitation, gov_boreholes, base_scenario
@@ -53,7 +54,8 @@ def _run_model_once(
 
     pcfg = engine._get_pollutant_config("fio", scenario)  # type: ignore
     loads = engine.compute_load(sanitation, pcfg, save_output=False)
-    linked = engine.run_transport(loads, gov_boreholes, pcfg, radius_g)
+    tcfg = engine._get_transport_config(scenario)  # type: ignore
+    linked = engine.run_transport(loads, gov_boreholes, pcfg, radius_g, tcfg=tcfg)
     conc = engine.compute_concentration(linked, flow_multiplier=flow_mult)
     conc["borehole_type"] = "government"
     return conc
@@ -94,6 +96,152 @@ def run_grid_search(grid: Dict = None) -> pd.DataFrame:
     return results
 
 
+# --- Per-category load basis ---
+#
+# Loads are linear in leakage ``1 - efficiency`` and every later step is
+# linear in load, so government-well concentrations for any per-category
+# efficiency vector are ``basis @ (1 - eff)``. One decay matrix carries all
+# category columns; efficiency candidates and the least-squares fit are then small
+# matrix products instead of a full ``compute_load`` + ``run_transport``.
+
+Efficiency = Union[Mapping[int, float], np.ndarray]
+
+
+@dataclass
+class CategoryBasis:
+    """Government-well concentration per unit leakage of each toilet category.
+
+    An efficiency vector applies to every row of its category, replacing the
+    per-row ``pathogen_containment_efficiency``.
+    """
+    boreholes: pd.DataFrame
+    categories: np.ndarray
+    basis: np.ndarray  # (n_boreholes, n_categories) CFU/100mL at leakage 1
+
+    def leakage(self, efficiency: Efficiency) -> np.ndarray:
+        """Leakage per category column from a ``{category: eff}`` map (defaults from config) or array(s)."""
+        if isinstance(efficiency, Mapping):
+            eff_map = {**config.CONTAINMENT_EFFICIENCY_DEFAULT, **{int(k): float(v) for k, v in efficiency.items()}}
+            efficiency = np.array([eff_map.get(int(c), 0.0) for c in self.categories])
+        return 1.0 - np.asarray(efficiency, dtype=float)
+
+    def concentrations(self, efficiency: Efficiency) -> np.ndarray:
+        """Concentrations for one efficiency vector, or (n_candidates, n_boreholes) for a stack."""
+        return self.leakage(efficiency) @ self.basis.T
+
+    def predict(self, efficiency: Efficiency) -> pd.DataFrame:
+        """``compute_concentration``-style frame for ``CalibrationEngine``."""
+        conc = self.boreholes.copy()
+        conc["concentration_CFU_per_100mL"] = self.concentrations(efficiency)
+        return conc
+
+    def fit(self, observed: np.ndarray) -> Dict:
+        """Least-squares efficiencies against observed concentrations (NaNs skipped).
+
+        Leakage is bounded to [0, 1] (bounded-variable NNLS), so the fitted
+        efficiencies stay physical.
+        """
+        observed = np.asarray(observed, dtype=float)
+        valid = ~np.isnan(observed)
+        if not valid.any():
+            raise ValueError("No observed concentrations to fit against (all NaN).")
+        fit = lsq_linear(self.basis[valid], observed[valid], bounds=(0.0, 1.0), method="bvls")
+        efficiency = {int(c): float(1.0 - w) for c, w in zip(self.categories, fit.x)}
+        residual = self.basis[valid] @ fit.x - observed[valid]
+        return {
+            "efficiency": efficiency,
+            "n_samples": int(valid.sum()),
+            "rmse": float(np.sqrt(np.mean(residual ** 2))),
+            # Categories with no toilets in range of any observed well are not identified by the fit
+            "identified": {int(c): bool(col.any()) for c, col in zip(self.categories, self.basis[valid].T)},
+        }
+
+
+def build_category_basis(
+    sanitation: pd.DataFrame,
+    gov_boreholes: pd.DataFrame,
+    scenario_base: Dict,
+    efio: float,
+    ks: float,
+    radius_g: float,
+    flow_mult: float,
+) -> CategoryBasis:
+    """Transport every toilet category's load at leakage 1 (one adjacency in memory mode)."""
+    scenario = copy.deepcopy(scenario_base)
+    scenario["EFIO_override"] = efio
+    scenario["ks_per_m"] = ks
+    pcfg = engine._get_pollutant_config("fio", scenario)  # type: ignore
+    tcfg = engine._get_transport_config(scenario)  # type: ignore
+
+    unit = sanitation.assign(pathogen_containment_efficiency=0.0)
+    loads = engine.compute_load(unit, pcfg, save_output=False)
+    # Concentration is linear in aggregated load: scale per well from a unit load
+    boreholes = gov_boreholes.assign(aggregated_load=1.0)
+    boreholes = engine.compute_concentration(boreholes, flow_multiplier=flow_mult)
+    scale = boreholes["concentration_CFU_per_100mL"].values
+    boreholes = boreholes.drop(columns=["aggregated_load", "concentration_CFU_per_100mL", "risk_score"])
+    boreholes["borehole_type"] = "government"
+
+    categories = np.union1d(list(config.CONTAINMENT_EFFICIENCY_DEFAULT), sanitation["toilet_category_id"].unique())
+    # (n_rows, n_categories): each row's unit-leakage load in its category column
+    column = np.searchsorted(categories, loads["toilet_category_id"].values)
+    category_loads = np.zeros((len(loads), len(categories)))
+    category_loads[np.arange(len(loads)), column] = loads["load"].values
+    if tcfg.mode == "memory":
+        adjacency = transport.build_adjacency(
+            loads[["lat", "long"]].values, gov_boreholes[["lat", "long"]].values, radius_g
+        )
+        transported = transport.decay_matrix(adjacency, pcfg.decay_rate) @ category_loads
+    else:
+        sources = loads[["lat", "long"]].assign(source_index=np.arange(len(loads)))
+        transported = np.column_stack([
+            engine.run_transport(sources.assign(load=col), gov_boreholes, pcfg, radius_g, tcfg=tcfg)[
+                "aggregated_load"].values
+            for col in category_loads.T
+        ])
+    basis = transported * scale[:, None]
+    return CategoryBasis(boreholes=boreholes, categories=categories.astype(int), basis=basis)
+
+
+def run_efficiency_search(
+    eff_grid: Mapping[int, Iterable[float]],
+    efio: float = config.EFIO_DEFAULT,
+    ks: float = config.KS_PER_M_DEFAULT,
+    radius_g: Optional[float] = None,
+    flow_mult: float = 1.0,
+    basis: Optional[CategoryBasis] = None,
+) -> pd.DataFrame:
+    """Score every per-category efficiency combination in ``eff_grid`` from one basis."""
+    if basis is None:
+        sanitation, gov_boreholes, scenario_base = _prepare_inputs()
+        radius_g = radius_g or scenario_base["radius_by_type"]["government"]
+        basis = build_category_basis(sanitation, gov_boreholes, scenario_base, efio, ks, radius_g, flow_mult)
+    calib = CalibrationEngine()
+    cats = sorted(int(c) for c in eff_grid)
+
+    records: List[Dict] = []
+    for combo in product(*(eff_grid[c] for c in cats)):
+        calib.model_df = basis.predict(dict(zip(cats, combo)))
+        metrics = calib.calculate_metrics(calib.match_points())
+        metrics.update({f"eff_cat{c}": e for c, e in zip(cats, combo)})
+        metrics.update({"efio": efio, "ks": ks, "radius_g": radius_g, "flow_multiplier": flow_mult})
+        records.append(metrics)
+
+    results = pd.DataFrame(records).sort_values(
+        ["spearman_rho", "kendall_rho", "rmse_log"], ascending=[False, False, True]
+    )
+    out_path = config.OUTPUT_DATA_DIR / "efficiency_search_results.csv"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(out_path, index=False)
+    return results
+
+
+def fit_category_efficiencies(basis: CategoryBasis) -> Dict:
+    """Bounded NNLS fit of per-category efficiencies to the observed 'Total Coli'."""
+    observed = basis.boreholes["Total Coli"].apply(calibration_utils.parse_concentration).values
+    return basis.fit(observed)
+
+
 def _build_neighbor_features(
     toilets: pd.DataFrame, boreholes: pd.DataFrame, radii: Iterable[int]
 ) -> pd.DataFrame:
@@ -101,36 +249,20 @@ def _build_neighbor_features(
     leak_load = toilets["household_population"] * (
         1.0 - toilets["pathogen_containment_efficiency"]
     )
-    tree = BallTree(np.radians(toilets[["lat", "long"]].values), metric="haversine")
-    bore_rad = np.radians(boreholes[["lat", "long"]].values)
+    index = spatial_index.build_index(toilets[["lat", "long"]].values)
+    bore_latlon = boreholes[["lat", "long"]].values
 
     feats = {}
     for r in radii:
-        inds, dists = tree.query_radius(
-            bore_rad, r=r / config.EARTH_RADIUS_M, return_distance=True
+        inds, dists = index.query_radius(bore_latlon, r, return_distance=True)
+        indptr, flat_idx, flat_dist = spatial_index.flatten(inds, dists)
+        count, load_sum, invd_sum, decay_sum = kernels.neighbor_features(
+            indptr, flat_idx, flat_dist, leak_load.values, 0.01
         )
-        count_list = []
-        sum_list = []
-        invd_list = []
-        decay_list = []
-        for idx, dist in zip(inds, dists):
-            if len(idx) == 0:
-                count_list.append(0.0)
-                sum_list.append(0.0)
-                invd_list.append(0.0)
-                decay_list.append(0.0)
-                continue
-            ld = leak_load.iloc[idx].values
-            dist_m = dist * config.EARTH_RADIUS_M
-            count_list.append(float(len(idx)))
-            sum_list.append(ld.sum())
-            invd_list.append(np.sum(ld / (dist_m + 1.0)))
-            decay_list.append(np.sum(ld * np.exp(-0.01 * dist_m)))
-
-        feats[f"count_{r}m"] = count_list
-        feats[f"load_{r}m"] = sum_list
-        feats[f"invd_{r}m"] = invd_list
-        feats[f"decay_{r}m"] = decay_list
+        feats[f"count_{r}m"] = count
+        feats[f"load_{r}m"] = load_sum
+        feats[f"invd_{r}m"] = invd_sum
+        feats[f"decay_{r}m"] = decay_sum
 
     return pd.DataFrame(feats)
 
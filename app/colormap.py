@@ -0,0 +1,75 @@
+"""Vectorized colour palettes for dashboard map layers.
+
+Each palette is a set of colour stops over the normalized range [0, 1]. A
+256-entry RGBA lookup table is built once per palette and whole value arrays
+are coloured with a single index operation.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+LUT_SIZE = 256
+DEFAULT_ALPHA = 200
+FALLBACK_COLOR = (100, 100, 100, DEFAULT_ALPHA)
+
+PALETTES = {
+    # Dramatic color palette: Blue (Safe) -> Lime (Low) -> Yellow (Moderate) -> Orange (High) -> Deep Red (Critical)
+    'risk': {
+        0.00: (0, 120, 255),    # Bright Blue (Safe)
+        0.25: (0, 255, 0),      # Lime Green (Low)
+        0.50: (255, 255, 0),    # Yellow (Moderate)
+        0.60: (255, 165, 0),    # Orange (High) - standard orange
+        0.90: (255, 69, 0),     # Orange-Red (Very High) - subtle transition
+        1.00: (200, 0, 0),      # Deep Red (Critical) - darker red for maximum
+    },
+    # Green → Yellow → Red gradient to match category emojis (🟢🟡🔴)
+    'nitrogen': {
+        0.00: (100, 200, 100),  # Light green (Low)
+        0.33: (50, 200, 50),    # Medium green
+        0.50: (255, 255, 0),    # Yellow (Moderate)
+        0.67: (255, 200, 0),    # Orange-yellow
+        1.00: (255, 0, 0),      # Red (High)
+    },
+    # Blue → Purple → Brown gradient to match category emojis (🔵🟣🟤)
+    'phosphorus': {
+        0.00: (100, 150, 255),  # Light blue (Low)
+        0.33: (50, 100, 255),   # Medium blue
+        0.50: (150, 50, 200),   # Purple (Moderate)
+        0.67: (120, 80, 120),   # Purple-brown
+        1.00: (139, 69, 19),    # Brown (High)
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def build_lut(palette: str, alpha: int = DEFAULT_ALPHA) -> np.ndarray:
+    """Return a read-only ``(LUT_SIZE, 4)`` uint8 RGBA table for ``palette``."""
+    if palette not in PALETTES:
+        lut = np.tile(np.array(FALLBACK_COLOR, dtype=np.uint8), (LUT_SIZE, 1))
+    else:
+        stops = sorted(PALETTES[palette].items())
+        positions = np.array([p for p, _ in stops])
+        colors = np.array([c for _, c in stops], dtype=float)
+        x = np.linspace(0.0, 1.0, LUT_SIZE)
+        rgb = np.column_stack([np.interp(x, positions, colors[:, ch]) for ch in range(3)])
+        lut = np.empty((LUT_SIZE, 4), dtype=np.uint8)
+        lut[:, :3] = np.rint(rgb).astype(np.uint8)
+        lut[:, 3] = alpha
+    lut.setflags(write=False)
+    return lut
+
+
+def normalize(values, min_val: float, max_val: float) -> np.ndarray:
+    """Scale values into [0, 1] (0.5 everywhere for a degenerate range, 0 for NaN)."""
+    values = np.asarray(values, dtype=float)
+    if max_val == min_val:
+        return np.full(values.shape, 0.5)
+    norm = np.clip((values - min_val) / (max_val - min_val), 0.0, 1.0)
+    return np.nan_to_num(norm, nan=0.0)
+
+
+def map_values(values, min_val: float, max_val: float, palette: str = 'risk') -> np.ndarray:
+    """Colour an array of values; returns a packed ``(N, 4)`` uint8 RGBA array."""
+    idx = np.rint(normalize(values, min_val, max_val) * (LUT_SIZE - 1)).astype(np.intp)
+    return build_lut(palette)[idx]
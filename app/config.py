@@ -22,6 +22,8 @@ WARDS_GEOJSON_PATH = INPUT_DATA_DIR / 'wards.geojson'
 
 # Derived/Intermediate Files
 SANITATION_STANDARDIZED_PATH = DERIVED_DATA_DIR / 'sanitation_standardized.csv'
+SANITATION_CHUNK_ROWS = 200_000  # raw rows per chunk when standardizing
+SOURCE_COARSEN_M = None  # merge co-located sanitation rows within this many metres for FIO transport (0 = identical coordinates; None = off)
 PRIVATE_BOREHOLES_ENRICHED_PATH = DERIVED_DATA_DIR / 'private_boreholes_enriched.csv'
 GOVERNMENT_BOREHOLES_ENRICHED_PATH = DERIVED_DATA_DIR / 'government_boreholes_enriched.csv'
 SPATIAL_ADJ_CACHE_PREFIX = 'spatial_adj_{scenario}_{bh_type}_{radius_m}m.csv'
@@ -32,6 +34,87 @@ FIO_CONCENTRATION_PATH = OUTPUT_DATA_DIR / 'fio_concentration_layer3.csv'
 NET_NITROGEN_LOAD_PATH = OUTPUT_DATA_DIR / 'nitrogen_load_layer1.csv'
 NET_PHOSPHORUS_LOAD_PATH = OUTPUT_DATA_DIR / 'phosphorus_load_layer1.csv'
 
+# Scenario diffs: per-borehole baseline arrays and the latest scenario-vs-baseline diff
+BASELINE_SCENARIO = 'baseline_2025'
+BASELINE_RISK_PATH = OUTPUT_DATA_DIR / 'fio_baseline_risk.npz'
+FIO_SCENARIO_DIFF_PATH = OUTPUT_DATA_DIR / 'fio_scenario_diff.npz'
+FIO_SCENARIO_DIFF_SUMMARY_PATH = OUTPUT_DATA_DIR / 'fio_scenario_diff.json'
+
+# Targeted protection: toilets within a buffer of the top-percentile baseline-risk
+# boreholes are upgraded. Zones up to the max buffer are cached per baseline run.
+TARGETED_PROTECTION_PERCENTILE = 0.95
+TARGETED_PROTECTION_BUFFER_M = 35.0
+PROTECTION_MAX_BUFFER_M = 100.0
+PROTECTION_INDEX_PATH = OUTPUT_DATA_DIR / 'fio_protection_index.npz'
+
+# Upgrade optimizer (app/optimizer.py): wells above this risk score count as high-risk
+OPTIMIZER_RISK_THRESHOLD = 60.0
+OPTIMIZED_UPGRADES_PATH = OUTPUT_DATA_DIR / 'optimized_upgrades.csv'
+
+# Source attribution: per borehole, the top-k contributing toilets (long table)
+# and the decayed load share per toilet category. None disables it; scenarios
+# can set 'attribution_top_k'.
+ATTRIBUTION_TOP_K = None
+FIO_ATTRIBUTION_PATH = OUTPUT_DATA_DIR / 'fio_attribution.csv'
+FIO_ATTRIBUTION_CATEGORIES_PATH = OUTPUT_DATA_DIR / 'fio_attribution_categories.csv'
+
+# Incremental updates (app/incremental.py): rebuild a spatial index once moved,
+# inserted and deleted points exceed this fraction of the live points.
+INCREMENTAL_REINDEX_FRACTION = 0.05
+INCREMENTAL_CHANGE_LOG_PATH = OUTPUT_DATA_DIR / 'incremental_change_log.jsonl'
+
+# Multi-year projections (app/projection.py): year x borehole concentrations
+# and a per-year summary. Growth defaults to none; pass a rate for planning runs.
+PROJECTION_START_YEAR = 2025
+PROJECTION_END_YEAR = 2035
+PROJECTION_ANNUAL_GROWTH = 0.0
+FIO_PROJECTION_PATH = OUTPUT_DATA_DIR / 'fio_projection.npz'
+FIO_PROJECTION_SUMMARY_PATH = OUTPUT_DATA_DIR / 'fio_projection_summary.json'
+
+# Seasonal abstraction (app/seasonal.py): monthly Q per borehole from
+# Q_L_per_day_01..12 columns or the profile CSV (borehole_index + month columns),
+# else Q_L_per_day scaled by MONTHLY_Q_FACTORS (Jan..Dec). Months above
+# SEASONAL_EXCEEDANCE_CFU (CFU/100mL) count towards the exceedance frequency.
+# Scenarios can set 'seasonal', 'monthly_q_factors' and 'seasonal_exceedance_cfu'.
+SEASONAL_ENABLED = False
+MONTHLY_Q_FACTORS = (1.0,) * 12
+MONTHLY_Q_PROFILE_PATH = DERIVED_DATA_DIR / 'borehole_monthly_q.csv'
+SEASONAL_EXCEEDANCE_CFU = 100.0
+FIO_SEASONAL_PATH = OUTPUT_DATA_DIR / 'fio_seasonal.npz'
+
+# Per-run summary statistics (bucket counts, quantiles, totals) for the dashboard panels
+FIO_SUMMARY_PATH = OUTPUT_DATA_DIR / 'fio_summary.json'
+NITROGEN_SUMMARY_PATH = OUTPUT_DATA_DIR / 'nitrogen_summary.json'
+PHOSPHORUS_SUMMARY_PATH = OUTPUT_DATA_DIR / 'phosphorus_summary.json'
+
+# Dashboard job runner: each background run writes into its own sub-directory
+JOBS_OUTPUT_DIR = OUTPUT_DATA_DIR / 'jobs'
+JOB_MAX_WORKERS = 2
+JOB_HISTORY_LIMIT = 16  # finished jobs kept per runner (older scratch directories are deleted)
+# User-requested exports ("Export results") live apart from job scratch and are never pruned
+EXPORTS_OUTPUT_DIR = OUTPUT_DATA_DIR / 'exports'
+
+# Layer 2 transport evaluation: 'memory' (all pairs at once), 'tiled'
+# (quadtree tiles with radius halos, each kept under the memory budget) or
+# 'parallel' (spatial shards across a process pool) or 'far_field' (distant
+# source cells aggregated at their centroids within FAR_FIELD_TOLERANCE)
+TRANSPORT_MODE = 'memory'
+TRANSPORT_MEMORY_BUDGET_MB = 256
+TRANSPORT_WORKERS = None  # 'parallel' mode processes (None = all cores)
+TRANSPORT_SHARDS = 64  # spatial shards; fixed so results do not depend on the worker count
+FAR_FIELD_TOLERANCE = 0.01  # max estimated relative error per aggregated cell (and borehole sum)
+FAR_FIELD_LEAF_M = 10.0  # finest cell of the far-field pyramid
+# Neighbour-list accumulation kernels: 'auto' (numba if installed), 'numba' or 'numpy'
+ACCUMULATION_BACKEND = 'auto'
+
+# Spatial index for radius queries: 'haversine' (BallTree, spherical earth)
+# or 'utm' (KDTree on UTM zone 37S metres; faster, ellipsoidal distances)
+SPATIAL_INDEX_BACKEND = 'haversine'
+UTM_ZONE = 37
+# Persisted (memory-mapped) indexes over the standardized sanitation points
+SPATIAL_INDEX_DIR = DERIVED_DATA_DIR / 'spatial_index'
+SPATIAL_INDEX_CACHE_FILES = 8
+
 # --- Constants ---
 EARTH_RADIUS_M = 6371000
 # Model Constants
@@ -67,6 +150,31 @@ RADIUS_BY_TYPE_DEFAULT = {
     'government': 10.0  # Calibrated value
 }
 
+# Optional kernel-derived radius: when a scenario sets 'kernel_tolerance'
+# (max share of exp(-k r) mass left outside the radius), the per-run radius
+# is derived from ks_per_m instead of radius_by_type, within these bounds.
+KERNEL_TOLERANCE = None
+KERNEL_RADIUS_MIN_M = 5.0
+KERNEL_RADIUS_MAX_M = 1000.0
+
+# Dashboard map layers: quadtree level-of-detail aggregation
+# Cells are 360 / 2**level degrees wide (level 20 ~ 38 m, level 10 ~ 39 km).
+MAP_MAX_FEATURES = 20000
+LOD_MIN_LEVEL = 10
+LOD_MAX_LEVEL = 20
+
+# Offline tile pyramid export (python main.py export-tiles)
+TILES_OUTPUT_DIR = OUTPUT_DATA_DIR / 'tiles'
+TILE_MIN_ZOOM = 8
+TILE_MAX_ZOOM = 14
+TILE_EXTENT = 4096      # quantized coordinate units per tile side
+TILE_GRID = 64          # toilet aggregation bins per tile side
+TILE_BUFFER = 64        # ward geometry kept beyond the tile edge (extent units)
+TILE_EXPORT_WORKERS = None  # process pool size (None = all cores)
+
+# Ward overlay: simplified geometry levels (metres, see app/wards.py)
+WARD_SIMPLIFY_TOLERANCES_M = (5.0, 25.0, 100.0)
+
 # Column Mapping for Raw Data
 SANITATION_COLUMN_MAPPING = {
     'fid': 'id',
@@ -12,6 +12,8 @@ import pandas as pd
 import pydeck as pdk
 import numpy as np
 import json
+import time
+import hashlib
 from typing import Dict, Any
 
 import sys
@@ -24,141 +26,103 @@ if str(ROOT_DIR) not in sys.path:
 
 from app import config
 from app import engine
+from app import jobs
+from app import colormap
+from app import lod
+from app import wards
+from app import layers
+from app import scenario_diff
+from app import summary
 
 st.set_page_config(page_title="Zanzibar Water Quality Model", layout="wide")
 
+INITIAL_ZOOM = 10
+MAP_ZOOM_RANGE = (8, 16)
+
 # --- Helpers ---
 
+@st.cache_data(show_spinner=False)
+def _read_csv(path_str: str, mtime: float):
+    return pd.read_csv(path_str, low_memory=False)
+
 def load_data(path):
+    """Read a CSV output, cached until the file changes on disk."""
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, low_memory=False)
+    return _read_csv(str(path), path.stat().st_mtime)
 
-@st.cache_data
-def load_geojson(path: Path):
-    if not path.exists():
-        return None
-    try:
-        with path.open() as f:
-            return json.load(f)
-    except Exception:
-        return None
+def load_summary(model_type: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """Summary of the last exported CLI run: its stored artefact, else computed from ``df``."""
+    pcfg = engine._get_pollutant_config(model_type, config.SCENARIOS[config.BASELINE_SCENARIO])
+    stored = summary.load_summary(pcfg.output_summary_path)
+    if stored is not None:
+        return stored
+    return summary.summarize_result(model_type, '', df, df if model_type == 'fio' else None)
 
-def get_color(val, min_val, max_val, palette='risk'):
-    """Return color [r,g,b,a] based on value."""
-    # Normalize
-    if max_val == min_val:
-        norm = 0.5
-    else:
-        norm = np.clip((val - min_val) / (max_val - min_val), 0, 1)
-    
-    if palette == 'risk':
-        # Multi-stop: Blue (0) -> Green (0.25) -> Yellow (0.5) -> Orange (0.75) -> Red (1.0)
-        # This gives more resolution than simple 2-stop interpolation
-        # Dramatic color palette: Blue (Safe) -> Lime (Low) -> Yellow (Moderate) -> Orange (High) -> Deep Red (Critical)
-        stops = {
-            0.00: [0, 120, 255],    # Bright Blue (Safe)
-            0.25: [0, 255, 0],      # Lime Green (Low)
-            0.50: [255, 255, 0],    # Yellow (Moderate)
-            0.60: [255, 165, 0],    # Orange (High) - standard orange
-            0.90: [255, 69, 0],     # Orange-Red (Very High) - subtle transition
-            1.00: [200, 0, 0]       # Deep Red (Critical) - darker red for maximum
-        }
-        
-        # Find lower and upper stops
-        sorted_stops = sorted(stops.keys())
-        
-        # If norm is at or beyond max, use max color
-        if norm >= sorted_stops[-1]:
-            return stops[sorted_stops[-1]] + [200]
-        
-        # If norm is at or below min, use min color
-        if norm <= sorted_stops[0]:
-            return stops[sorted_stops[0]] + [200]
-        
-        # Find the two stops to interpolate between
-        lower = sorted_stops[0]
-        upper = sorted_stops[-1]
-        
-        for i in range(len(sorted_stops) - 1):
-            if sorted_stops[i] <= norm < sorted_stops[i + 1]:
-                lower = sorted_stops[i]
-                upper = sorted_stops[i + 1]
-                break
-                
-        # Interpolate
-        t = (norm - lower) / (upper - lower)
-        c1 = np.array(stops[lower])
-        c2 = np.array(stops[upper])
-        c = c1 + (c2 - c1) * t
-        return [int(c[0]), int(c[1]), int(c[2]), 200]
-
-    elif palette == 'nitrogen':
-        # Green → Yellow → Red gradient to match category emojis (🟢🟡🔴)
-        stops = {
-            0.00: [100, 200, 100],  # Light green (Low)
-            0.33: [50, 200, 50],    # Medium green
-            0.50: [255, 255, 0],    # Yellow (Moderate)
-            0.67: [255, 200, 0],    # Orange-yellow
-            1.00: [255, 0, 0]       # Red (High)
-        }
-        
-        sorted_stops = sorted(stops.keys())
-        if norm >= sorted_stops[-1]:
-            return stops[sorted_stops[-1]] + [200]
-        if norm <= sorted_stops[0]:
-            return stops[sorted_stops[0]] + [200]
-        
-        lower = sorted_stops[0]
-        upper = sorted_stops[-1]
-        for i in range(len(sorted_stops) - 1):
-            if sorted_stops[i] <= norm < sorted_stops[i + 1]:
-                lower = sorted_stops[i]
-                upper = sorted_stops[i + 1]
-                break
-        
-        t = (norm - lower) / (upper - lower)
-        c1 = np.array(stops[lower])
-        c2 = np.array(stops[upper])
-        c = c1 + (c2 - c1) * t
-        return [int(c[0]), int(c[1]), int(c[2]), 200]
-    
-    elif palette == 'phosphorus':
-        # Blue → Purple → Brown gradient to match category emojis (🔵🟣🟤)
-        stops = {
-            0.00: [100, 150, 255],  # Light blue (Low)
-            0.33: [50, 100, 255],   # Medium blue
-            0.50: [150, 50, 200],   # Purple (Moderate)
-            0.67: [120, 80, 120],   # Purple-brown
-            1.00: [139, 69, 19]     # Brown (High)
-        }
-        
-        sorted_stops = sorted(stops.keys())
-        if norm >= sorted_stops[-1]:
-            return stops[sorted_stops[-1]] + [200]
-        if norm <= sorted_stops[0]:
-            return stops[sorted_stops[0]] + [200]
-        
-        lower = sorted_stops[0]
-        upper = sorted_stops[-1]
-        for i in range(len(sorted_stops) - 1):
-            if sorted_stops[i] <= norm < sorted_stops[i + 1]:
-                lower = sorted_stops[i]
-                upper = sorted_stops[i + 1]
-                break
-        
-        t = (norm - lower) / (upper - lower)
-        c1 = np.array(stops[lower])
-        c2 = np.array(stops[upper])
-        c = c1 + (c2 - c1) * t
-        return [int(c[0]), int(c[1]), int(c[2]), 200]
-        
-    else:
-        return [100, 100, 100, 200]
+@st.cache_resource
+def get_engine_state():
+    """Resident model inputs (sanitation, boreholes, adjacency) for this process."""
+    return engine.load_engine_state()
 
-def build_wards_layer():
-    """Optional ward boundaries overlay with informative tooltip."""
-    geojson = load_geojson(config.WARDS_GEOJSON_PATH)
+@st.cache_resource
+def get_job_runner():
+    """Process-wide runner shared by all sessions (so identical runs coalesce)."""
+    return jobs.JobRunner(state=get_engine_state())
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _lod_pyramid(key: str, _points: pd.DataFrame):
+    values = {c: _points[c].values for c in _points.columns if c not in ('lat', 'long')}
+    return lod.build_pyramid(_points['lat'].values, _points['long'].values, values)
+
+def lod_cells(points: pd.DataFrame) -> pd.DataFrame:
+    """Bounded, deterministic map features for a point table (see app/lod.py).
+
+    ``points`` holds ``lat``/``long`` plus the value columns to aggregate.
+    """
+    key = hashlib.sha1(pd.util.hash_pandas_object(points, index=False).values).hexdigest()
+    return _lod_pyramid(key, points).select(config.MAP_MAX_FEATURES).copy()
+
+def scatter_layer(buffers: layers.PointBuffers):
+    """ScatterplotLayer over packed point buffers (see app/layers.py)."""
+    return pdk.Layer(
+        "ScatterplotLayer",
+        buffers.records(),
+        get_position=layers.GET_POSITION,
+        get_fill_color=layers.GET_FILL_COLOR,
+        get_radius=layers.GET_RADIUS,
+        pickable=False
+    )
+
+def heatmap_layer(buffers: layers.PointBuffers, **kwargs):
+    """HeatmapLayer over packed point buffers, weighted by ``buffers.weights``."""
+    return pdk.Layer(
+        "HeatmapLayer",
+        buffers.records(),
+        get_position=layers.GET_POSITION,
+        get_weight=layers.GET_WEIGHT,
+        **kwargs
+    )
+
+def map_zoom() -> float:
+    """Zoom chosen with the sidebar map zoom control."""
+    return float(st.session_state.get('map_zoom', INITIAL_ZOOM))
+
+def map_view_state():
+    return pdk.ViewState(latitude=-6.165, longitude=39.202, zoom=map_zoom())
+
+@st.cache_resource(show_spinner=False)
+def build_wards_layer(zoom: float = INITIAL_ZOOM):
+    """Optional ward boundaries overlay with informative tooltip.
+
+    Uses the simplified geometry level that matches ``zoom`` (see app/wards.py).
+    st.pydeck_chart does not report the live deck viewport back to the
+    script, so callers pass the sidebar zoom (``map_zoom``), which also sets
+    the map's view; zooming inside the map itself keeps the level.
+    """
+    try:
+        geojson = wards.load_ward_level(wards.level_for_zoom(zoom))
+    except (OSError, ValueError, KeyError):
+        geojson = None
     if not geojson:
         return None
     return pdk.Layer(
@@ -176,23 +140,29 @@ def build_wards_layer():
 
 # --- Views ---
 
-def view_pathogen_risk(map_style, viz_type="Scatterplot", extra_layers=None, tooltip=None):
+def view_pathogen_risk(map_style, viz_type="Scatterplot", extra_layers=None, tooltip=None, df=None, diff=None,
+                       run_summary=None):
     extra_layers = extra_layers or []
     st.header("🦠 Pathogen Risk")
     
-    df = load_data(config.FIO_CONCENTRATION_PATH)
+    # Latest in-memory run for this session, else the last exported CLI output
+    if df is None:
+        df = load_data(config.FIO_CONCENTRATION_PATH)
+        run_summary = load_summary('fio', df) if not df.empty else None
     if df.empty:
         st.warning("No data found. Run the FIO pipeline first.")
         return
+    by_type = run_summary['concentrations']['by_type']
 
     # Filters
-    btype = st.multiselect("Borehole Type", df['borehole_type'].unique(), default=df['borehole_type'].unique())
+    btype = st.multiselect("Borehole Type", list(by_type), default=list(by_type))
     df = df[df['borehole_type'].isin(btype)]
+    selected = [by_type[t] for t in btype]
     
-    # Borehole Counts
-    c_total = len(df)
-    c_gov = len(df[df['borehole_type'] == 'government'])
-    c_priv = len(df[df['borehole_type'] == 'private'])
+    # Borehole Counts (from the run summary, see app/summary.py)
+    c_total = sum(s['count'] for s in selected)
+    c_gov = by_type['government']['count'] if 'government' in btype else 0
+    c_priv = by_type['private']['count'] if 'private' in btype else 0
     
     m1, m2, m3 = st.columns(3)
     m1.metric("Total Boreholes", f"{c_total:,}")
@@ -202,119 +172,74 @@ def view_pathogen_risk(map_style, viz_type="Scatterplot", extra_layers=None, too
     st.markdown("---") # Separator
     
     # Stats: Risk Categories
-    if 'risk_score' in df.columns:
-        # Calculate categories
-        # Matched to new palette: Blue(0-25), Green(25-50), Yellow(50-60), Orange(60-90), Red(90+)
-        bins = [-1, 25, 50, 60, 90, 101]
-        labels = ['Safe', 'Moderate', 'High', 'Very High', 'Critical']
-        # Use a temporary column for counting
-        cats = pd.cut(df['risk_score'], bins=bins, labels=labels)
-        counts = cats.value_counts()
-        total = len(df)
+    if all('risk_buckets' in s for s in selected):
+        counts = {label: sum(s['risk_buckets'][label] for s in selected) for label in summary.RISK_LABELS}
+        total = c_total
+        metric_labels = ["🔵 Safe (0-25)", "🟢 Moderate (25-50)", "🟡 High (50-60)", "🟠 V. High (60-90)", "🔴 Critical (>90)"]
         
         cols = st.columns(5)
-        
-        # Safe (Blue)
-        c = counts.get('Safe', 0)
-        p = (c / total) * 100 if total > 0 else 0
-        cols[0].metric("🔵 Safe (0-25)", f"{c:,}", f"{p:.1f}%")
-        
-        # Moderate (Green)
-        c = counts.get('Moderate', 0)
-        p = (c / total) * 100 if total > 0 else 0
-        cols[1].metric("🟢 Moderate (25-50)", f"{c:,}", f"{p:.1f}%")
-        
-        # High (Yellow)
-        c = counts.get('High', 0)
-        p = (c / total) * 100 if total > 0 else 0
-        cols[2].metric("🟡 High (50-60)", f"{c:,}", f"{p:.1f}%")
-        
-        # Very High (Orange)
-        c = counts.get('Very High', 0)
-        p = (c / total) * 100 if total > 0 else 0
-        cols[3].metric("🟠 V. High (60-90)", f"{c:,}", f"{p:.1f}%")
-        
-        # Critical (Red)
-        c = counts.get('Critical', 0)
-        p = (c / total) * 100 if total > 0 else 0
-        cols[4].metric("🔴 Critical (>90)", f"{c:,}", f"{p:.1f}%")
-
-        # Use Risk Score for coloring
-        df['color'] = df['risk_score'].apply(lambda x: get_color(x, 0, 100, palette='risk'))
+        for col, label, metric_label in zip(cols, summary.RISK_LABELS, metric_labels):
+            c = counts[label]
+            p = (c / total) * 100 if total > 0 else 0
+            col.metric(metric_label, f"{c:,}", f"{p:.1f}%")
         
     else:
         # Fallback for old data
         c1, c2, c3 = st.columns(3)
-        c1.metric("Boreholes", len(df))
-        c2.metric("Avg Concentration", f"{df['concentration_CFU_per_100mL'].mean():.1f}")
-        c3.metric("High Conc (>100)", len(df[df['concentration_CFU_per_100mL'] > 100]))
-        
-        df['color'] = df['concentration_CFU_per_100mL'].apply(lambda x: get_color(np.log1p(x), 0, np.log1p(1000), palette='risk'))
+        c1.metric("Boreholes", c_total)
+        mean_conc = sum(s['concentration_mean'] * s['count'] for s in selected) / c_total if c_total else 0.0
+        c2.metric("Avg Concentration", f"{mean_conc:.1f}")
+        c3.metric("High Conc (>100)", sum(s['high_concentration'] for s in selected))
 
-    # Sort by risk score so high risk renders on top (z-order)
-    if 'risk_score' in df.columns:
-        df = df.sort_values('risk_score', ascending=True)
+    # Aggregate to quadtree cells and colour each by its worst borehole,
+    # sorted so high risk renders on top (z-order)
+    value_col = 'risk_score' if 'risk_score' in df.columns else 'concentration_CFU_per_100mL'
+    cells = lod_cells(df[['lat', 'long', value_col]]).sort_values(f'{value_col}_max', ascending=True)
+    if value_col == 'risk_score':
+        colors = colormap.map_values(cells['risk_score_max'].values, 0, 100, palette='risk')
     else:
-        df = df.sort_values('concentration_CFU_per_100mL', ascending=True)
+        colors = colormap.map_values(np.log1p(cells[f'{value_col}_max'].values), 0, np.log1p(1000), palette='risk')
 
-    # Fixed radius for equal visibility (100m = matches model capture zone)
-    df['radius'] = 100
+    # 100m radius (matches model capture zone), grown to cover coarser cells;
+    # cell totals keep the overall heatmap weight (risk score if available)
+    buffers = layers.point_buffers(
+        cells['lat'].values, cells['long'].values, colors,
+        weights=cells[f'{value_col}_sum'].values,
+        radii=np.maximum(100.0, cells['cell_size_m'].values / 2),
+    )
     
     if viz_type == "Heatmap":
-        # Use Risk Score for weight if available
-        weight_col = 'risk_score' if 'risk_score' in df.columns else 'concentration_CFU_per_100mL'
-        layer = pdk.Layer(
-            "HeatmapLayer",
-            df,
-            get_position=['long', 'lat'],
-            get_weight=weight_col,
-            radiusPixels=30,
-            intensity=1,
-            threshold=0.1
-        )
+        layer = heatmap_layer(buffers, radiusPixels=30, intensity=1, threshold=0.1)
     elif viz_type == "Risk Reduction (Impact)":
-        # Load Baseline
-        baseline_path = config.OUTPUT_DATA_DIR / 'baseline_risk.csv'
-        if not baseline_path.exists():
-            st.error("Baseline file not found. Run 'baseline_2025' first.")
+        # Per-borehole diff against the baseline run (app/scenario_diff.py)
+        if diff is None and config.FIO_SCENARIO_DIFF_PATH.exists():
+            diff = scenario_diff.ScenarioDiff.load(config.FIO_SCENARIO_DIFF_PATH, config.FIO_SCENARIO_DIFF_SUMMARY_PATH)
+        if diff is None:
+            st.error(f"Baseline risk not found. Run '{config.BASELINE_SCENARIO}' first.")
             return
-            
-        base_df = pd.read_csv(baseline_path)
-        
-        # Merge on FID
-        merged = df.merge(base_df[['fid', 'risk_score']], on='fid', suffixes=('', '_base'))
-        
-        # Calculate Improvement (Positive = Good)
-        merged['improvement'] = merged['risk_score_base'] - merged['risk_score']
-        
-        # Filter for positive improvement
-        improved = merged[merged['improvement'] > 0.1].copy()
-        
-        if improved.empty:
+
+        improved = diff.mask(btype)
+        if not improved.any():
             st.warning("No risk reduction detected in this scenario.")
             return
-            
-        st.metric("Total Risk Reduced", f"{improved['improvement'].sum():.1f} points")
-        
-        # Color: Green intensity based on improvement
-        # 0 -> Dark Green, 20+ -> Bright Neon Green
-        improved['color'] = improved['improvement'].apply(lambda x: [0, 255, 0, int(np.clip(x*10 + 50, 100, 255))])
-        
-        # Radius: Bigger improvement = Bigger bubble
-        improved['radius'] = improved['improvement'].apply(lambda x: np.clip(x * 10, 50, 300))
-        
-        layer = pdk.Layer(
-            "ScatterplotLayer",
-            improved,
-            get_position=['long', 'lat'],
-            get_fill_color='color',
-            get_radius='radius',
-            pickable=False
-        )
+
+        by_type = diff.summary.get('by_type', {})
+        reduced = sum(by_type[t]['risk_reduced'] for t in btype if t in by_type)
+        st.metric("Total Risk Reduced", f"{reduced:.1f} points")
+
+        # Green, brighter and bigger for larger improvements (0 -> dim, 20+ -> neon)
+        improvement = diff.improvement[improved]
+        colors = np.zeros((len(improvement), 4), dtype=np.uint8)
+        colors[:, 1] = 255
+        colors[:, 3] = np.clip(improvement * 10 + 50, 100, 255).astype(np.uint8)
+        layer = scatter_layer(layers.point_buffers(
+            diff.lat[improved], diff.long[improved], colors,
+            weights=improvement, radii=np.clip(improvement * 10, 50, 300),
+        ))
         
         deck_kwargs = dict(
             layers=[layer] + extra_layers,
-            initial_view_state=pdk.ViewState(latitude=-6.165, longitude=39.202, zoom=10),
+            initial_view_state=map_view_state(),
             map_style=map_style
         )
         if tooltip:
@@ -323,18 +248,11 @@ def view_pathogen_risk(map_style, viz_type="Scatterplot", extra_layers=None, too
         return
 
     else:
-        layer = pdk.Layer(
-            "ScatterplotLayer",
-            df,
-            get_position=['long', 'lat'],
-            get_fill_color='color',
-            get_radius='radius',
-            pickable=False
-        )
+        layer = scatter_layer(buffers)
     
     deck_kwargs = dict(
         layers=[layer] + extra_layers,
-        initial_view_state=pdk.ViewState(latitude=-6.165, longitude=39.202, zoom=10),
+        initial_view_state=map_view_state(),
         map_style=map_style
     )
     if tooltip:
@@ -342,41 +260,37 @@ def view_pathogen_risk(map_style, viz_type="Scatterplot", extra_layers=None, too
     st.pydeck_chart(pdk.Deck(**deck_kwargs))
     st.caption("Risk score is 0–100 = 20·log10(conc+1); each 10× jump ≈ +20 points. Buckets: 0–25 Safe, 25–50 Moderate, 50–60 High, 60–90 Very High, >90 Critical.")
 
-def view_nitrogen_load(map_style, viz_type="Scatterplot", extra_layers=None, tooltip=None):
+def view_nitrogen_load(map_style, viz_type="Scatterplot", extra_layers=None, tooltip=None, df=None, run_summary=None):
     extra_layers = extra_layers or []
     st.header("🌱 Nitrogen Load")
     
-    df = load_data(config.NET_NITROGEN_LOAD_PATH)
+    # Latest in-memory run for this session, else the last exported CLI output
+    if df is None:
+        df = load_data(config.NET_NITROGEN_LOAD_PATH)
+        run_summary = load_summary('nitrogen', df) if not df.empty else None
     if df.empty:
         st.warning("No data found. Run the Nitrogen pipeline first.")
         return
+    stats = run_summary['loads']
         
     # Stats - Total Load
-    total = df['nitrogen_load'].sum()/1000
+    total = stats['total']/1000
     st.metric("Total Nitrogen Load", f"{total:.1f} tonnes/yr")
     
     # Load Categories - Simpler 3-category system that handles edge cases
-    # Based on data tertiles (33rd, 67th percentiles)
-    q33 = df['nitrogen_load'].quantile(0.33)
-    q67 = df['nitrogen_load'].quantile(0.67)
+    # Based on data tertiles (33rd, 67th percentiles), precomputed per run
+    q33 = stats['quantiles']['0.33']
+    q67 = stats['quantiles']['0.67']
+    cats = stats['buckets']
+    total_points = stats['count']
     
     # Handle edge case where all values are very similar
-    if q33 == q67:
-        df['load_cat'] = 'Moderate'
-        cats = df['load_cat'].value_counts()
-        total_points = len(df)
-        
+    if stats['uniform']:
         cols = st.columns(3)
         cols[0].metric("🟢 Low", "0", "0.0%")
         cols[1].metric("🟡 Moderate (~uniform)", f"{total_points:,}", "100.0%")
         cols[2].metric("🔴 High", "0", "0.0%")
     else:
-        bins = [0, q33, q67, df['nitrogen_load'].max() + 1]
-        labels = ['Low', 'Moderate', 'High']
-        df['load_cat'] = pd.cut(df['nitrogen_load'], bins=bins, labels=labels)
-        cats = df['load_cat'].value_counts()
-        total_points = len(df)
-        
         cols = st.columns(3)
         
         # Low (Green)
@@ -396,32 +310,24 @@ def view_nitrogen_load(map_style, viz_type="Scatterplot", extra_layers=None, too
     
     # Map - Dynamic color scale based on data distribution
     # Use 95th percentile as max to show variation in most of the data
-    scale_max = max(df['nitrogen_load'].quantile(0.95), 0.1)  # Avoid divide by zero
-    df['color'] = df['nitrogen_load'].apply(lambda x: get_color(x, 0, scale_max, palette='nitrogen'))
+    scale_max = max(stats['quantiles']['0.95'], 0.1)  # Avoid divide by zero
+    # Aggregated cells: colour by the highest household load, weight by the cell total
+    cells = lod_cells(df[['lat', 'long', 'nitrogen_load']])
+    buffers = layers.point_buffers(
+        cells['lat'].values, cells['long'].values,
+        colormap.map_values(cells['nitrogen_load_max'].values, 0, scale_max, palette='nitrogen'),
+        weights=cells['nitrogen_load_sum'].values,
+        radii=np.maximum(100.0, cells['cell_size_m'].values / 2),
+    )
     
     if viz_type == "Heatmap":
-        layer = pdk.Layer(
-            "HeatmapLayer",
-            df,
-            get_position=['long', 'lat'],
-            get_weight='nitrogen_load',
-            radiusPixels=40,
-            intensity=1,
-            threshold=0.05
-        )
+        layer = heatmap_layer(buffers, radiusPixels=40, intensity=1, threshold=0.05)
     else:
-        layer = pdk.Layer(
-            "ScatterplotLayer",
-            df.sample(min(len(df), 20000)), # Sample for performance
-            get_position=['long', 'lat'],
-            get_fill_color='color',
-            get_radius=100,
-            pickable=False
-        )
+        layer = scatter_layer(buffers)
     
     deck_kwargs = dict(
         layers=[layer] + extra_layers,
-        initial_view_state=pdk.ViewState(latitude=-6.165, longitude=39.202, zoom=10),
+        initial_view_state=map_view_state(),
         map_style=map_style
     )
     if tooltip:
@@ -429,41 +335,37 @@ def view_nitrogen_load(map_style, viz_type="Scatterplot", extra_layers=None, too
     st.pydeck_chart(pdk.Deck(**deck_kwargs))
     st.caption("Buckets are based on this run’s 33rd/67th percentiles (kg/yr): Low ≤P33, Moderate P33–P67, High >P67. If values cluster tightly, everything shows “Moderate (~uniform)” to signal there’s no real gradient.")
 
-def view_phosphorus_load(map_style, viz_type="Scatterplot", extra_layers=None, tooltip=None):
+def view_phosphorus_load(map_style, viz_type="Scatterplot", extra_layers=None, tooltip=None, df=None, run_summary=None):
     extra_layers = extra_layers or []
     st.header("🧼 Phosphorus Load")
     
-    df = load_data(config.NET_PHOSPHORUS_LOAD_PATH)
+    # Latest in-memory run for this session, else the last exported CLI output
+    if df is None:
+        df = load_data(config.NET_PHOSPHORUS_LOAD_PATH)
+        run_summary = load_summary('phosphorus', df) if not df.empty else None
     if df.empty:
         st.warning("No data found. Run the Phosphorus pipeline first.")
         return
+    stats = run_summary['loads']
         
     # Stats - Total Load
-    total = df['phosphorus_load'].sum()/1000
+    total = stats['total']/1000
     st.metric("Total Phosphorus Load", f"{total:.1f} tonnes/yr")
     
     # Load Categories - Simpler 3-category system that handles edge cases
-    # Based on data tertiles (33rd, 67th percentiles)
-    q33 = df['phosphorus_load'].quantile(0.33)
-    q67 = df['phosphorus_load'].quantile(0.67)
+    # Based on data tertiles (33rd, 67th percentiles), precomputed per run
+    q33 = stats['quantiles']['0.33']
+    q67 = stats['quantiles']['0.67']
+    cats = stats['buckets']
+    total_points = stats['count']
     
     # Handle edge case where all values are very similar
-    if q33 == q67:
-        df['load_cat'] = 'Moderate'
-        cats = df['load_cat'].value_counts()
-        total_points = len(df)
-        
+    if stats['uniform']:
         cols = st.columns(3)
         cols[0].metric("🔵 Low", "0", "0.0%")
         cols[1].metric("🟣 Moderate (~uniform)", f"{total_points:,}", "100.0%")
         cols[2].metric("🟤 High", "0", "0.0%")
     else:
-        bins = [0, q33, q67, df['phosphorus_load'].max() + 1]
-        labels = ['Low', 'Moderate', 'High']
-        df['load_cat'] = pd.cut(df['phosphorus_load'], bins=bins, labels=labels)
-        cats = df['load_cat'].value_counts()
-        total_points = len(df)
-        
         cols = st.columns(3)
         
         # Low (Blue)
@@ -483,32 +385,24 @@ def view_phosphorus_load(map_style, viz_type="Scatterplot", extra_layers=None, t
     
     # Map - Dynamic color scale based on data distribution
     # Use 95th percentile as max to show variation in most of the data
-    scale_max = max(df['phosphorus_load'].quantile(0.95), 0.01)  # Avoid divide by zero
-    df['color'] = df['phosphorus_load'].apply(lambda x: get_color(x, 0, scale_max, palette='phosphorus'))
+    scale_max = max(stats['quantiles']['0.95'], 0.01)  # Avoid divide by zero
+    # Aggregated cells: colour by the highest household load, weight by the cell total
+    cells = lod_cells(df[['lat', 'long', 'phosphorus_load']])
+    buffers = layers.point_buffers(
+        cells['lat'].values, cells['long'].values,
+        colormap.map_values(cells['phosphorus_load_max'].values, 0, scale_max, palette='phosphorus'),
+        weights=cells['phosphorus_load_sum'].values,
+        radii=np.maximum(100.0, cells['cell_size_m'].values / 2),
+    )
     
     if viz_type == "Heatmap":
-        layer = pdk.Layer(
-            "HeatmapLayer",
-            df,
-            get_position=['long', 'lat'],
-            get_weight='phosphorus_load',
-            radiusPixels=40,
-            intensity=1,
-            threshold=0.05
-        )
+        layer = heatmap_layer(buffers, radiusPixels=40, intensity=1, threshold=0.05)
     else:
-        layer = pdk.Layer(
-            "ScatterplotLayer",
-            df.sample(min(len(df), 20000)), # Sample for performance
-            get_position=['long', 'lat'],
-            get_fill_color='color',
-            get_radius=100,
-            pickable=False
-        )
+        layer = scatter_layer(buffers)
     
     deck_kwargs = dict(
         layers=[layer] + extra_layers,
-        initial_view_state=pdk.ViewState(latitude=-6.165, longitude=39.202, zoom=10),
+        initial_view_state=map_view_state(),
         map_style=map_style
     )
     if tooltip:
@@ -519,7 +413,10 @@ def view_toilet_inventory(map_style, extra_layers=None, tooltip=None):
     extra_layers = extra_layers or []
     st.header("🚽 Toilet Inventory")
     
-    df = load_data(config.SANITATION_STANDARDIZED_PATH)
+    try:
+        df = get_engine_state().toilets.copy()  # uncoarsened: one row per toilet
+    except (FileNotFoundError, ValueError):
+        df = pd.DataFrame()
     if df.empty:
         st.warning("No data found.")
         return
@@ -538,20 +435,24 @@ def view_toilet_inventory(map_style, extra_layers=None, tooltip=None):
         3: [0, 0, 255, 200],    # Septic: Blue
         4: [255, 0, 0, 200]     # OD: Red
     }
-    df['color'] = df['toilet_category_id'].map(color_map)
-    
-    layer = pdk.Layer(
-        "ScatterplotLayer",
-        df.sample(min(len(df), 20000)),
-        get_position=['long', 'lat'],
-        get_fill_color='color',
-        get_radius=15,
-        pickable=False
+    # Aggregate per-category counts into cells; each cell shows its dominant type
+    points = df[['lat', 'long']].copy()
+    for cat_id in color_map:
+        points[f'cat_{cat_id}'] = (df['toilet_category_id'] == cat_id).astype(float)
+    cells = lod_cells(points)
+    cat_counts = cells[[f'cat_{cat_id}_sum' for cat_id in color_map]].values
+    palette = np.array(list(color_map.values()), dtype=np.uint8)
+    buffers = layers.point_buffers(
+        cells['lat'].values, cells['long'].values,
+        palette[cat_counts.argmax(axis=1)],
+        weights=cat_counts.sum(axis=1),
+        radii=np.maximum(15.0, cells['cell_size_m'].values / 2),
     )
+    layer = scatter_layer(buffers)
     
     deck_kwargs = dict(
         layers=[layer] + extra_layers,
-        initial_view_state=pdk.ViewState(latitude=-6.165, longitude=39.202, zoom=10),
+        initial_view_state=map_view_state(),
         map_style=map_style
     )
     if tooltip:
@@ -657,23 +558,44 @@ def main():
         'centralized_treatment_enabled': stone_town_sewer or selected_scenario.get('centralized_treatment_enabled', False)
     }
     
+    # Runs go to the shared background runner; the page keeps rendering the
+    # last finished result for this model while a new one computes.
+    runner = get_job_runner()
+    if 'jobs' not in st.session_state:
+        st.session_state.jobs = {}
+        st.session_state.results = {}
+
     # Auto-run when scenario changes (but not sliders)
     if 'last_scenario' not in st.session_state:
         st.session_state.last_scenario = scenario_name
         
     if st.session_state.last_scenario != scenario_name:
-        with st.spinner(f"Running {scenario_name}..."):
-            engine.run_pipeline(model_type, scenario_name, scenario_override)
+        job = runner.submit(model_type, scenario_name, scenario_override)
+        st.session_state.jobs[model_type] = job.job_id
         st.session_state.last_scenario = scenario_name
-        st.success(f"✅ {scenario_name} complete!")
-        st.experimental_rerun()
     
     # Manual run button (with custom slider values)
     if st.sidebar.button(f"▶️ Run with Custom Parameters"):
-        with st.spinner(f"Running custom scenario..."):
-            engine.run_pipeline(model_type, scenario_name, scenario_override)
-        st.success("Done!")
-        st.experimental_rerun()
+        job = runner.submit(model_type, scenario_name, scenario_override)
+        st.session_state.jobs[model_type] = job.job_id
+
+    job = runner.get(st.session_state.jobs.get(model_type, ''))
+    job_running = job is not None and not job.done()
+    if job_running:
+        st.sidebar.progress(job.progress, text=f"Running {job.scenario_name}: {job.message}")
+    elif job is not None:
+        if job.error is not None:
+            st.sidebar.error(f"Run failed: {job.error}")
+        else:
+            st.session_state.results[model_type] = (job.job_id, job.result())
+            st.sidebar.success(f"✅ {job.scenario_name} complete!")
+        del st.session_state.jobs[model_type]
+    result_id, result = st.session_state.results.get(model_type, (None, None))
+
+    # Results stay in memory; files are only written on request
+    if result is not None and st.sidebar.button("💾 Export results"):
+        paths = engine.write_pipeline_outputs(result, config.EXPORTS_OUTPUT_DIR / result_id)
+        st.sidebar.success(f"Saved to {next(iter(paths.values())).parent}")
 
 
     with st.sidebar.expander("Settings"):
@@ -685,12 +607,22 @@ def main():
         )
         
         st.markdown("**Visualization**")
+        viz_options = ["Scatterplot", "Heatmap"]
+        if view == "Pathogen Risk":
+            viz_options.append("Risk Reduction (Impact)")
         viz_type = st.selectbox(
             "Type",
-            ["Scatterplot", "Heatmap"],
+            viz_options,
             index=0,
             help="Scatterplot shows individual points. Heatmap shows density/intensity."
         )
+        st.slider(
+            "Map zoom",
+            *MAP_ZOOM_RANGE,
+            value=INITIAL_ZOOM,
+            key='map_zoom',
+            help="Initial map zoom; also picks the ward boundary detail level."
+        )
         show_wards = st.checkbox(
             "Show wards layer",
             value=False,
@@ -708,7 +640,7 @@ def main():
     extra_layers = []
     tooltip = None
     if show_wards:
-        wards_layer = build_wards_layer()
+        wards_layer = build_wards_layer(map_zoom())
         if wards_layer:
             extra_layers.append(wards_layer)
             tooltip = {"text": "Ward: {ward_name}\nDistrict: {dist_name}\nRegion: {reg_name}"}
@@ -716,15 +648,24 @@ def main():
             st.sidebar.warning("Wards GeoJSON missing or invalid.")
 
     if view == "Pathogen Risk":
-        view_pathogen_risk(current_style, viz_type, extra_layers, tooltip)
+        view_pathogen_risk(current_style, viz_type, extra_layers, tooltip,
+                           result.concentrations if result else None, result.diff if result else None,
+                           result.summary if result else None)
     elif view == "Nitrogen Load":
-        view_nitrogen_load(current_style, viz_type, extra_layers, tooltip)
+        view_nitrogen_load(current_style, viz_type, extra_layers, tooltip,
+                           result.loads if result else None, result.summary if result else None)
     elif view == "Phosphorus Load":
-        view_phosphorus_load(current_style, viz_type, extra_layers, tooltip)
+        view_phosphorus_load(current_style, viz_type, extra_layers, tooltip,
+                             result.loads if result else None, result.summary if result else None)
     elif view == "Toilet Inventory":
         view_toilet_inventory(current_style, extra_layers, tooltip) # Keep inventory as scatter for categorical clarity
     elif view == "Toilet Inventory":
         view_toilet_inventory(current_style, extra_layers, tooltip) # Keep inventory as scatter for categorical clarity
 
+    # Poll the background job until it finishes
+    if job_running:
+        time.sleep(0.5)
+        st.experimental_rerun()
+
 if __name__ == "__main__":
     main()
@@ -4,19 +4,28 @@ Handles:
 1. Data Loading & Standardization
 2. Intervention Application (Scenario Logic)
 3. Layer 1: Load Calculation (Polymorphic: FIO vs Nitrogen)
-4. Layer 2: Transport (Vectorized BallTree)
+4. Layer 2: Transport (Vectorized spatial index: BallTree or UTM KDTree)
 5. Layer 3: Concentration (Dilution)
 """
 
+import copy
 import logging
+import os
+import threading
+import time
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Dict, Any, Optional, Literal
-from sklearn.neighbors import BallTree
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Literal, Callable, Tuple
 
 from . import config
+from . import coarsen
+from . import protection
+from . import transport
+from . import scenario_diff
+from . import seasonal
+from . import summary as run_summary
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,6 +36,7 @@ class PollutantConfig:
     name: Literal['fio', 'nitrogen', 'phosphorus']
     output_load_path: Path
     output_conc_path: Optional[Path] = None
+    output_summary_path: Optional[Path] = None
     
     # FIO specific
     efio: float = 0.0
@@ -46,6 +56,7 @@ def _get_pollutant_config(model_type: str, scenario: Dict[str, Any]) -> Pollutan
             name='fio',
             output_load_path=config.FIO_LOAD_PATH,
             output_conc_path=config.FIO_CONCENTRATION_PATH,
+            output_summary_path=config.FIO_SUMMARY_PATH,
             efio=scenario.get('EFIO_override', config.EFIO_DEFAULT),
             decay_rate=scenario.get('ks_per_m', config.KS_PER_M_DEFAULT)
         )
@@ -53,6 +64,7 @@ def _get_pollutant_config(model_type: str, scenario: Dict[str, Any]) -> Pollutan
         return PollutantConfig(
             name='nitrogen',
             output_load_path=config.NET_NITROGEN_LOAD_PATH,
+            output_summary_path=config.NITROGEN_SUMMARY_PATH,
             protein_per_capita=scenario.get('protein_per_capita_override', config.PROTEIN_PER_CAPITA_DEFAULT),
             protein_conversion=scenario.get('protein_to_nitrogen_conversion_override', config.PROTEIN_TO_NITROGEN_CONVERSION)
         )
@@ -60,6 +72,7 @@ def _get_pollutant_config(model_type: str, scenario: Dict[str, Any]) -> Pollutan
         return PollutantConfig(
             name='phosphorus',
             output_load_path=config.NET_PHOSPHORUS_LOAD_PATH,
+            output_summary_path=config.PHOSPHORUS_SUMMARY_PATH,
             phosphorus_detergent_consumption_g=scenario.get(
                 'phosphorus_detergent_consumption_override',
                 config.PHOSPHORUS_DETERGENT_CONSUMPTION_G_PER_CAPITA
@@ -72,17 +85,44 @@ def _get_pollutant_config(model_type: str, scenario: Dict[str, Any]) -> Pollutan
     else:
         raise ValueError(f"Unknown model type: {model_type}")
 
-# --- Step 1: Standardization & Interventions ---
+@dataclass
+class TransportConfig:
+    """How Layer 2 transport is evaluated (all modes give the same loads)."""
+    mode: Literal['memory', 'tiled', 'parallel', 'far_field'] = 'memory'
+    memory_budget_mb: float = config.TRANSPORT_MEMORY_BUDGET_MB
+    workers: Optional[int] = config.TRANSPORT_WORKERS
+    far_field_tolerance: float = config.FAR_FIELD_TOLERANCE
 
-def load_and_standardize_sanitation() -> pd.DataFrame:
-    """Load raw sanitation data and standardize columns."""
-    if config.SANITATION_STANDARDIZED_PATH.exists():
-        logging.info(f"Loading standardized sanitation from {config.SANITATION_STANDARDIZED_PATH}")
-        return pd.read_csv(config.SANITATION_STANDARDIZED_PATH)
+def _get_transport_config(scenario: Dict[str, Any]) -> TransportConfig:
+    mode = scenario.get('transport_mode', config.TRANSPORT_MODE)
+    if mode not in ('memory', 'tiled', 'parallel', 'far_field'):
+        raise ValueError(f"Unknown transport mode: {mode}")
+    return TransportConfig(
+        mode=mode,
+        memory_budget_mb=scenario.get('transport_memory_budget_mb', config.TRANSPORT_MEMORY_BUDGET_MB),
+        workers=scenario.get('transport_workers', config.TRANSPORT_WORKERS),
+        far_field_tolerance=scenario.get('transport_far_field_tolerance', config.FAR_FIELD_TOLERANCE)
+    )
 
-    logging.info(f"Standardizing raw data from {config.SANITATION_RAW_PATH}")
-    df = pd.read_csv(config.SANITATION_RAW_PATH)
-    
+def _transport_radius(scenario: Dict[str, Any], btype: str, decay_rate: float) -> float:
+    """Search radius for ``btype``: from the kernel tolerance if set, else ``radius_by_type``."""
+    tolerance = scenario.get('kernel_tolerance', config.KERNEL_TOLERANCE)
+    if tolerance is not None:
+        return transport.kernel_radius(decay_rate, tolerance)
+    return scenario['radius_by_type'].get(btype, 35.0)
+
+def _write_csv_atomic(df: pd.DataFrame, path: Path):
+    """Write a CSV via a temp file + rename so readers never see a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+# --- Step 1: Standardization & Interventions ---
+
+def _standardize_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Rename, coerce coordinates and map efficiencies for one block of raw rows."""
     # Rename columns
     df = df.rename(columns={k: v for k, v in config.SANITATION_COLUMN_MAPPING.items() if k in df.columns})
     
@@ -99,15 +139,73 @@ def load_and_standardize_sanitation() -> pd.DataFrame:
     # Defaults
     df['household_population'] = df.get('household_population', config.HOUSEHOLD_POPULATION_DEFAULT)
     df['pathogen_containment_efficiency'] = df['toilet_category_id'].map(config.CONTAINMENT_EFFICIENCY_DEFAULT).fillna(0.0)
-    
-    # Save
-    config.SANITATION_STANDARDIZED_PATH.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(config.SANITATION_STANDARDIZED_PATH, index=False)
     return df
 
-def apply_interventions(df: pd.DataFrame, scenario: Dict[str, Any]) -> pd.DataFrame:
-    """Apply scenario interventions (population growth, toilet upgrades)."""
+def standardize_sanitation_streaming(raw_path: Optional[Path] = None, out_path: Optional[Path] = None,
+                                     chunksize: int = config.SANITATION_CHUNK_ROWS) -> Dict[str, float]:
+    """Standardize the raw sanitation CSV in bounded-memory chunks.
+
+    Chunks are appended to a temp file that replaces ``out_path`` once
+    complete. Returns row counts (read / written / dropped) and throughput.
+    """
+    raw_path = Path(raw_path or config.SANITATION_RAW_PATH)
+    out_path = Path(out_path or config.SANITATION_STANDARDIZED_PATH)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+
+    logging.info(f"Standardizing raw data from {raw_path} in chunks of {chunksize:,} rows")
+    start = time.perf_counter()
+    rows_in = rows_out = 0
+    try:
+        with tmp_path.open('w', newline='') as out:
+            for i, chunk in enumerate(pd.read_csv(raw_path, chunksize=chunksize)):
+                rows_in += len(chunk)
+                chunk = _standardize_chunk(chunk)
+                chunk.to_csv(out, index=False, header=(i == 0))
+                rows_out += len(chunk)
+                elapsed = time.perf_counter() - start
+                logging.info(f"  chunk {i + 1}: {rows_in:,} rows read, {rows_in - rows_out:,} dropped, "
+                             f"{rows_in / max(elapsed, 1e-9):,.0f} rows/s")
+        os.replace(tmp_path, out_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    elapsed = time.perf_counter() - start
+    stats = {'rows_read': rows_in, 'rows_written': rows_out, 'rows_dropped': rows_in - rows_out,
+             'seconds': elapsed, 'rows_per_second': rows_in / max(elapsed, 1e-9)}
+    logging.info(f"Standardized {rows_out:,}/{rows_in:,} rows ({stats['rows_dropped']:,} dropped without coordinates) "
+                 f"in {elapsed:.1f}s ({stats['rows_per_second']:,.0f} rows/s) -> {out_path}")
+    return stats
+
+def load_and_standardize_sanitation() -> pd.DataFrame:
+    """Load raw sanitation data and standardize columns."""
+    if not config.SANITATION_STANDARDIZED_PATH.exists():
+        standardize_sanitation_streaming()
+    logging.info(f"Loading standardized sanitation from {config.SANITATION_STANDARDIZED_PATH}")
+    return pd.read_csv(config.SANITATION_STANDARDIZED_PATH)
+
+def load_sanitation_sources(df: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, Optional[coarsen.Coarsening]]:
+    """Standardized sanitation rows, merged into super-sources when ``config.SOURCE_COARSEN_M`` is set."""
+    if df is None:
+        df = load_and_standardize_sanitation()
+    if config.SOURCE_COARSEN_M is None:
+        return df, None
+    return coarsen.coarsen_sources(df, config.SOURCE_COARSEN_M)
+
+def apply_interventions(df: pd.DataFrame, scenario: Dict[str, Any],
+                        protection_index: Optional[protection.ProtectionIndex] = None) -> pd.DataFrame:
+    """Apply scenario interventions (population growth, toilet upgrades).
+
+    Every output row carries ``source_index``: the position of the input row it
+    was derived from, so split rows can be mapped back to the original location.
+    Targeted protection uses ``protection_index`` (zones over the input rows);
+    without one it is loaded or built from the saved baseline risk.
+    """
+    base = df
     df = df.copy()
+    if 'source_index' not in df.columns:
+        df['source_index'] = np.arange(len(df))
+    base_source_index = df['source_index'].values
     
     # 1. Population Growth
     pop_factor = scenario.get('pop_factor', 1.0)
@@ -164,43 +262,34 @@ def apply_interventions(df: pd.DataFrame, scenario: Dict[str, Any]) -> pd.DataFr
     
     # Scenario 1: Targeted Protection (Top 5% Risk)
     if scenario.get('targeted_protection_enabled'):
-        # Load Baseline Risk if available
-        baseline_path = config.FIO_CONCENTRATION_PATH
-        if baseline_path.exists():
-            logging.info("Loading Baseline Risk for Targeted Protection...")
-            bdf = pd.read_csv(baseline_path)
-            if 'risk_score' in bdf.columns:
-                # Top 5% Risk
-                threshold = bdf['risk_score'].quantile(0.95)
-                high_risk_bh = bdf[bdf['risk_score'] >= threshold]
-                logging.info(f"Identified {len(high_risk_bh)} High-Risk Boreholes (Score > {threshold:.1f})")
-                
-                # Find toilets within 50m of these boreholes
-                from sklearn.neighbors import BallTree
-                
-                # Build Tree of Toilets
-                df_rad = np.deg2rad(df[['lat', 'long']].values)
-                bh_rad = np.deg2rad(high_risk_bh[['lat', 'long']].values)
-                
-                tree = BallTree(df_rad, metric='haversine')
-                
-                # Query radius (35m) - Matches Report Scenario 1
-                radius_rad = 35.0 / config.EARTH_RADIUS_M
-                indices = tree.query_radius(bh_rad, r=radius_rad)
-                
-                # Flatten indices
-                toilet_indices = np.unique(np.concatenate(indices))
-                
-                # Upgrade these toilets to Septic (3) with high efficiency (Well-managed)
-                if len(toilet_indices) > 0:
-                    logging.info(f"Upgrading {len(toilet_indices)} toilets near high-risk boreholes.")
-                    df.loc[toilet_indices, 'toilet_category_id'] = 3
-                    df.loc[toilet_indices, 'pathogen_containment_efficiency'] = 0.80 # Well-managed Septic (Report Scenario 2 target)
-            else:
-                logging.warning("Baseline file missing 'risk_score'. Skipping Targeted Protection.")
+        protection_index = protection_index or _protection_index(base)
+        if protection_index is not None:
+            percentile = scenario.get('targeted_protection_percentile', config.TARGETED_PROTECTION_PERCENTILE)
+            buffer_m = scenario.get('targeted_protection_buffer_m', config.TARGETED_PROTECTION_BUFFER_M)
+            logging.info(f"Identified {len(protection_index.high_risk(percentile))} High-Risk Boreholes "
+                         f"(top {1 - percentile:.0%} baseline risk)")
+            # Zones index the input rows; split rows follow their source row
+            protected = base_source_index[protection_index.select(percentile, buffer_m)]
+            mask = df['source_index'].isin(protected)
+            
+            # Upgrade these toilets to Septic (3) with high efficiency (Well-managed)
+            if mask.any():
+                logging.info(f"Upgrading {mask.sum()} toilets within {buffer_m:g}m of high-risk boreholes.")
+                df.loc[mask, 'toilet_category_id'] = 3
+                df.loc[mask, 'pathogen_containment_efficiency'] = 0.80 # Well-managed Septic (Report Scenario 2 target)
         else:
             logging.warning("Baseline results not found. Run 'baseline_2025' first.")
 
+    # Optimized upgrade list (see app/optimizer.py): input rows by source_index
+    upgrades = scenario.get('toilet_upgrades')
+    if upgrades:
+        target_eff = upgrades.get('efficiency', 0.80)
+        mask = df['source_index'].isin(upgrades['source_index']) & (df['pathogen_containment_efficiency'] < target_eff)
+        logging.info(f"Applying upgrade list: {mask.sum()} toilets to category {upgrades.get('toilet_category_id', 3)} "
+                     f"({target_eff:.0%} containment).")
+        df.loc[mask, 'toilet_category_id'] = upgrades.get('toilet_category_id', 3)
+        df.loc[mask, 'pathogen_containment_efficiency'] = target_eff
+
     # Scenario 3: Stone Town Sewer
     if scenario.get('stone_town_sewer_enabled'):
         # Stone Town Bounding Box (Approx)
@@ -225,6 +314,13 @@ def apply_interventions(df: pd.DataFrame, scenario: Dict[str, Any]) -> pd.DataFr
 
     return df[df['household_population'] > 0].reset_index(drop=True)
 
+def _protection_index(base: pd.DataFrame) -> Optional[protection.ProtectionIndex]:
+    """Protection zones over ``base`` rows from the saved baseline risk (``None`` without a baseline)."""
+    baseline = scenario_diff.BaselineRisk.load(config.BASELINE_RISK_PATH)
+    if baseline is None or baseline.latlon is None:
+        return None
+    return protection.load_or_build_protection_index(base[['lat', 'long']].values, baseline)
+
 # --- Step 2: Layer 1 Calculation ---
 
 def compute_load(df: pd.DataFrame, pcfg: PollutantConfig, save_output: bool = True) -> pd.DataFrame:
@@ -257,55 +353,150 @@ def compute_load(df: pd.DataFrame, pcfg: PollutantConfig, save_output: bool = Tr
     # Save intermediate (optional, skip during grid-search calibration to avoid I/O cost)
     if save_output:
         # TODO: drop columns that are not needed for the next step
-        df.to_csv(pcfg.output_load_path, index=False)
+        _write_csv_atomic(df, pcfg.output_load_path)
         logging.info(f"Saved Layer 1 load to {pcfg.output_load_path}")
     return df
 
 # --- Step 3: Layer 2 Transport (Vectorized) ---
 
-def run_transport(toilets: pd.DataFrame, boreholes: pd.DataFrame, pcfg: PollutantConfig, radius_m: float) -> pd.DataFrame:
-    """Link toilets to boreholes and compute decayed load using Vectorized BallTree."""
+def _merge_split_rows(toilets: pd.DataFrame) -> pd.DataFrame:
+    """One row per ``source_index`` with the summed load (split rows share their location)."""
+    if 'source_index' not in toilets.columns:
+        return toilets[['lat', 'long', 'load']]
+    return toilets.groupby('source_index', sort=True).agg(lat=('lat', 'first'), long=('long', 'first'),
+                                                          load=('load', 'sum'))
+
+def run_transport(toilets: pd.DataFrame, boreholes: pd.DataFrame, pcfg: PollutantConfig, radius_m: float,
+                  adjacency: Optional[transport.Adjacency] = None,
+                  tcfg: Optional[TransportConfig] = None) -> pd.DataFrame:
+    """Link toilets to boreholes and compute decayed load using Vectorized BallTree.
+
+    If a cached ``adjacency`` over the un-intervened sources is given, toilet
+    loads are summed back onto their ``source_index`` and no query is run.
+    With ``tcfg.mode == 'tiled'`` the query runs tile by tile under
+    ``tcfg.memory_budget_mb`` (see ``transport.accumulate_tiled``); with
+    ``'parallel'`` spatial shards run in a process pool
+    (``transport.accumulate_parallel``); with ``'far_field'`` distant sources
+    are aggregated into cells (``transport.accumulate_far_field``) and the
+    estimated error of each sum is kept in ``aggregated_load_error``.
+    """
     if pcfg.name != 'fio':
         logging.info("Skipping transport layer for non-FIO model (not required).")
         return pd.DataFrame()
 
     logging.info(f"Running Transport Layer (Radius: {radius_m}m, Decay: {pcfg.decay_rate})")
+    tcfg = tcfg or TransportConfig()
     
-    # Convert to radians for BallTree
-    t_rad = np.radians(toilets[['lat', 'long']].values)
-    b_rad = np.radians(boreholes[['lat', 'long']].values)
-    
-    tree = BallTree(t_rad, metric='haversine')
-    
-    # Query all boreholes at once (or in chunks if memory is tight, but 20k is fine)
-    # query_radius returns array of arrays of indices
-    radius_rad = radius_m / config.EARTH_RADIUS_M
-    indices, distances = tree.query_radius(b_rad, r=radius_rad, return_distance=True)
-    
-    # Vectorized accumulation
-    total_loads = np.zeros(len(boreholes))
-    
-    # Flatten for processing (this is still somewhat iterative but much faster than pure python loops)
-    # For true vectorization with variable length neighbors, we can use sparse matrices or simple iteration over the result arrays
-    # Given the density, simple iteration over the `indices` array (which is length N_boreholes) is fast enough in Python
-    # because the inner loop is avoided.
-    
-    toilet_loads = toilets['load'].values
+    if adjacency is None:
+        toilets = _merge_split_rows(toilets)
+
+    if tcfg.mode != 'memory' and adjacency is None:
+        args = (toilets[['lat', 'long']].values, toilets['load'].values, boreholes[['lat', 'long']].values,
+                radius_m, pcfg.decay_rate)
+        boreholes = boreholes.copy()
+        if tcfg.mode == 'tiled':
+            boreholes['aggregated_load'] = transport.accumulate_tiled(*args, memory_budget_mb=tcfg.memory_budget_mb)
+        elif tcfg.mode == 'far_field':
+            boreholes['aggregated_load'], boreholes['aggregated_load_error'] = transport.accumulate_far_field(
+                *args, tolerance=tcfg.far_field_tolerance
+            )
+        else:
+            boreholes['aggregated_load'] = transport.accumulate_parallel(*args, workers=tcfg.workers)
+        return boreholes
+
+    if adjacency is None:
+        adjacency = transport.build_adjacency(
+            toilets[['lat', 'long']].values, boreholes[['lat', 'long']].values, radius_m
+        )
+        source_loads = toilets['load'].values
+    else:
+        source_loads = np.bincount(
+            toilets['source_index'].values, weights=toilets['load'].values, minlength=adjacency.n_sources
+        )
     
-    for i, (t_indices, t_dists) in enumerate(zip(indices, distances)):
-        if len(t_indices) == 0:
-            continue
-            
-        dists_m = t_dists * config.EARTH_RADIUS_M
-        decay_factors = np.exp(-pcfg.decay_rate * dists_m)
-        
-        # Sum of (Load * Decay)
-        total_loads[i] = np.sum(toilet_loads[t_indices] * decay_factors)
-        
     boreholes = boreholes.copy()
-    boreholes['aggregated_load'] = total_loads
+    boreholes['aggregated_load'] = transport.accumulate(adjacency, source_loads, pcfg.decay_rate)
     return boreholes
 
+def run_attribution(toilets: pd.DataFrame, sources: pd.DataFrame, boreholes: pd.DataFrame, pcfg: PollutantConfig,
+                    radius_m: float, k: int, categories: np.ndarray, adjacency: Optional[transport.Adjacency] = None,
+                    tcfg: Optional[TransportConfig] = None) -> Tuple[pd.DataFrame, transport.Attribution]:
+    """``run_transport`` that also records the top-k contributing ``sources`` rows and per-category load.
+
+    ``toilets`` are the intervened rows (with ``source_index`` into
+    ``sources``). The attribution is collected in the same pass as the
+    transport sums in every ``tcfg.mode`` (see ``transport.attribute*``), and
+    ``aggregated_load`` is the sum of its category loads. ``categories`` are
+    the sorted ``toilet_category_id`` columns of the result.
+    """
+    logging.info(f"Running Transport Layer with top-{k} attribution (Radius: {radius_m}m, Decay: {pcfg.decay_rate})")
+    tcfg = tcfg or TransportConfig()
+    column = np.searchsorted(categories, toilets['toilet_category_id'].values)
+    category_loads = np.bincount(
+        toilets['source_index'].values * len(categories) + column, weights=toilets['load'].values,
+        minlength=len(sources) * len(categories)
+    ).reshape(len(sources), len(categories))
+
+    error = None
+    if adjacency is not None:
+        attribution = transport.attribute(adjacency, category_loads, pcfg.decay_rate, k)
+    else:
+        # Only sources that carry a toilet row, as in ``run_transport``
+        present = np.unique(toilets['source_index'].values)
+        latlon, loads = sources[['lat', 'long']].values[present], category_loads[present]
+        bh_latlon = boreholes[['lat', 'long']].values
+        args = (latlon, loads, bh_latlon, radius_m, pcfg.decay_rate, k)
+        if tcfg.mode == 'memory':
+            attribution = transport.attribute(transport.build_adjacency(latlon, bh_latlon, radius_m), loads,
+                                              pcfg.decay_rate, k)
+        elif tcfg.mode == 'tiled':
+            attribution = transport.attribute_tiled(*args, memory_budget_mb=tcfg.memory_budget_mb)
+        elif tcfg.mode == 'far_field':
+            attribution, error = transport.attribute_far_field(*args, tolerance=tcfg.far_field_tolerance)
+        else:
+            attribution = transport.attribute_parallel(*args, workers=tcfg.workers)
+        attribution.remap_sources(present)
+
+    boreholes = boreholes.copy()
+    boreholes['aggregated_load'] = attribution.category_loads.sum(axis=1)
+    if error is not None:
+        boreholes['aggregated_load_error'] = error
+    return boreholes, attribution
+
+def _attribution_frames(attribution: transport.Attribution, categories: np.ndarray, boreholes: pd.DataFrame,
+                        sources: pd.DataFrame, coarsened: bool = False) -> Dict[str, pd.DataFrame]:
+    """Long top-k table and per-borehole category shares for one borehole type.
+
+    With ``coarsened`` sources the top-k rows are merged super-sources, not
+    toilets: they are labelled ``source_kind='super_source'`` with their
+    ``n_toilets`` and carry no toilet ``id``.
+    """
+    rows, rank = np.nonzero(attribution.top_sources >= 0)
+    source_rows = attribution.top_sources[rows, rank]
+    loads = attribution.top_loads[rows, rank]
+    total = attribution.category_loads.sum(axis=1)[rows]  # the borehole's aggregated_load
+    top = pd.DataFrame({
+        'borehole_index': boreholes['borehole_index'].values[rows],
+        'borehole_type': boreholes['borehole_type'].values[rows],
+        'rank': rank + 1,
+        'source_index': source_rows,
+    })
+    for column in ('id', 'lat', 'long', 'toilet_category_id'):
+        if column in sources.columns and not (coarsened and column == 'id'):
+            top[column] = sources[column].values[source_rows]
+    if coarsened:
+        top['source_kind'] = 'super_source'
+        top['n_toilets'] = sources['n_sources'].values[source_rows]
+    top['decayed_load'] = loads
+    # Top-k loads are exact; far-field totals carry their tolerance, so cap the share at 1
+    top['load_share'] = np.minimum(np.divide(loads, total, out=np.zeros(len(loads)), where=total > 0), 1.0)
+
+    shares = pd.DataFrame({'borehole_index': boreholes['borehole_index'].values,
+                           'borehole_type': boreholes['borehole_type'].values})
+    for category, share in zip(categories, attribution.category_shares().T):
+        shares[f'share_category_{category}'] = share
+    return {'top_sources': top, 'category_shares': shares}
+
 # --- Step 4: Layer 3 Concentration ---
 
 def compute_concentration(boreholes: pd.DataFrame, flow_multiplier: float = 1.0) -> pd.DataFrame:
@@ -321,69 +512,375 @@ def compute_concentration(boreholes: pd.DataFrame, flow_multiplier: float = 1.0)
         boreholes['Q_L_per_day'] = 20000.0
         
     # Allow scenario-level flow scaling (e.g., when measured/assumed pumping rates are uncertain)
-    boreholes['concentration_CFU_per_100mL'] = (
-        boreholes['aggregated_load'] /
-        (boreholes['Q_L_per_day'] * max(flow_multiplier, 1e-6))
-    ) / 10.0
+    boreholes['concentration_CFU_per_100mL'] = concentration_from_load(
+        boreholes['aggregated_load'], boreholes['Q_L_per_day'], flow_multiplier
+    )
+    boreholes['risk_score'] = risk_from_concentration(boreholes['concentration_CFU_per_100mL'])
+    return boreholes
+
+def concentration_from_load(load, q_l_per_day, flow_multiplier=1.0):
+    """CFU/100mL from load (CFU/day) and abstraction (L/day); broadcasts over arrays."""
+    return (load / (q_l_per_day * np.maximum(flow_multiplier, 1e-6))) / 10.0
 
-    # Calculate Risk Score (0-100)
+def risk_from_concentration(concentration):
+    """Risk score (0-100)."""
     # Log-transform: 0 -> 0, 1 -> 20, 100 -> 60, 10000 -> 100
     # Formula: 20 * log10(conc + 1), capped at 100
-    boreholes['risk_score'] = 20 * np.log10(boreholes['concentration_CFU_per_100mL'] + 1)
-    boreholes['risk_score'] = boreholes['risk_score'].clip(0, 100)
-    return boreholes
+    return np.clip(20 * np.log10(concentration + 1), 0, 100)
+
+def compute_seasonal(concentrations: pd.DataFrame, scenario: Dict[str, Any],
+                     profile: Optional[pd.DataFrame] = None) -> seasonal.SeasonalResult:
+    """Monthly concentration and risk from a run's aggregated loads (no transport recompute).
+
+    Months with Q = 0 (well not pumping) get NaN concentration and risk.
+    """
+    q = seasonal.monthly_q(concentrations, scenario.get('monthly_q_factors', config.MONTHLY_Q_FACTORS), profile)
+    flow_multipliers = scenario.get('flow_multiplier_by_type', {'private': 1.0, 'government': 1.0})
+    flow = concentrations['borehole_type'].map(flow_multipliers).fillna(1.0).values
+    # One (12, n_boreholes) broadcast over the loads; non-pumping months have no concentration
+    pumping = q > 0
+    conc = np.where(pumping, concentration_from_load(concentrations['aggregated_load'].values,
+                                                     np.where(pumping, q, 1.0), flow), np.nan)
+    return seasonal.SeasonalResult(
+        borehole_index=concentrations['borehole_index'].values,
+        borehole_type=concentrations['borehole_type'].values,
+        q_l_per_day=q,
+        concentration=conc,
+        risk_score=risk_from_concentration(conc),
+        threshold=float(scenario.get('seasonal_exceedance_cfu', config.SEASONAL_EXCEEDANCE_CFU)),
+    )
 
 # --- Main Pipeline ---
 
-def run_pipeline(model_type: str, scenario_name: str = 'baseline_2025', scenario_override: Dict[str, Any] = None):
-    base_scenario = config.SCENARIOS.get(scenario_name, config.SCENARIOS['baseline_2025'])
-    
-    # Merge override if provided
+def resolve_scenario(scenario_name: str, scenario_override: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge a named scenario (baseline if unknown) with optional overrides."""
+    scenario = copy.deepcopy(config.SCENARIOS.get(scenario_name, config.SCENARIOS['baseline_2025']))
     if scenario_override:
-        scenario = base_scenario.copy()
         scenario.update(scenario_override)
-    else:
-        scenario = base_scenario
-        
+    return scenario
+
+BOREHOLE_SOURCES = (
+    ('private', config.PRIVATE_BOREHOLES_ENRICHED_PATH),
+    ('government', config.GOVERNMENT_BOREHOLES_ENRICHED_PATH),
+)
+
+class EngineState:
+    """Resident model inputs shared across runs (dashboard sessions, job workers).
+
+    The standardized sanitation table, borehole tables and per-radius
+    adjacency are loaded lazily on first use and then kept in memory.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._toilets: Optional[pd.DataFrame] = None
+        self._sanitation: Optional[pd.DataFrame] = None
+        self._coarsening: Optional[coarsen.Coarsening] = None
+        self._boreholes: Optional[Dict[str, pd.DataFrame]] = None
+        self._adjacency: Dict[Tuple[str, float], transport.Adjacency] = {}
+        self._baseline: Optional[scenario_diff.BaselineRisk] = None
+        self._protection: Optional[protection.ProtectionIndex] = None
+        self._toilet_protection: Optional[protection.ProtectionIndex] = None
+
+    @property
+    def sanitation(self) -> pd.DataFrame:
+        with self._lock:
+            if self._sanitation is None:
+                self._toilets = load_and_standardize_sanitation()
+                self._sanitation, self._coarsening = load_sanitation_sources(self._toilets)
+            return self._sanitation
+
+    @property
+    def toilets(self) -> pd.DataFrame:
+        """Uncoarsened standardized sanitation table (one row per toilet)."""
+        with self._lock:
+            self.sanitation
+            return self._toilets if self._toilets is not None else self._sanitation
+
+    @property
+    def coarsening(self) -> Optional[coarsen.Coarsening]:
+        """Mapping of the original sanitation rows onto ``sanitation`` (``None`` when not coarsened)."""
+        with self._lock:
+            self.sanitation
+            return self._coarsening
+
+    @property
+    def boreholes(self) -> Dict[str, pd.DataFrame]:
+        with self._lock:
+            if self._boreholes is None:
+                self._boreholes = {}
+                for btype, path in BOREHOLE_SOURCES:
+                    if not path.exists():
+                        logging.warning(f"Borehole file {path} not found. Skipping {btype}.")
+                        continue
+                    self._boreholes[btype] = pd.read_csv(path, low_memory=False)
+            return self._boreholes
+
+    def adjacency(self, btype: str, radius_m: float) -> transport.Adjacency:
+        """Neighbour lists from ``btype`` boreholes to the base sanitation rows."""
+        key = (btype, float(radius_m))
+        with self._lock:
+            if key not in self._adjacency:
+                logging.info(f"Building {btype} adjacency (Radius: {radius_m}m)")
+                self._adjacency[key] = transport.build_adjacency(
+                    self.sanitation[['lat', 'long']].values,
+                    self.boreholes[btype][['lat', 'long']].values,
+                    radius_m,
+                    persist=True
+                )
+            return self._adjacency[key]
+
+    def baseline_risk(self) -> Optional[scenario_diff.BaselineRisk]:
+        """Baseline FIO risk per borehole, computed on first use."""
+        with self._lock:
+            if self._baseline is None:
+                compute_pipeline('fio', config.BASELINE_SCENARIO, state=self)
+            return self._baseline
+
+    def store_baseline(self, baseline: scenario_diff.BaselineRisk):
+        with self._lock:
+            self._baseline = baseline
+            self._protection = None
+            self._toilet_protection = None
+
+    def protection_index(self, toilets: bool = False) -> Optional[protection.ProtectionIndex]:
+        """Targeted-protection zones over ``sanitation`` (or ``toilets``) for the current baseline."""
+        with self._lock:
+            if toilets and self.coarsening is not None:
+                # Kept in memory only: the saved index file holds the ``sanitation`` zones
+                if self._toilet_protection is None:
+                    baseline = self.baseline_risk()
+                    if baseline is None:
+                        return None
+                    self._toilet_protection = protection.build_protection_index(
+                        self.toilets[['lat', 'long']].values, baseline
+                    )
+                return self._toilet_protection
+            if self._protection is None:
+                baseline = self.baseline_risk()
+                if baseline is None:
+                    return None
+                self._protection = protection.load_or_build_protection_index(
+                    self.sanitation[['lat', 'long']].values, baseline
+                )
+            return self._protection
+
+def load_engine_state() -> EngineState:
+    """Create a lazily-populated resident state (see ``EngineState``)."""
+    return EngineState()
+
+@dataclass
+class PipelineResult:
+    """In-memory outputs of one pipeline run."""
+    model_type: str
+    scenario_name: str
+    scenario: Dict[str, Any]
+    loads: pd.DataFrame
+    concentrations: Optional[pd.DataFrame] = None
+    baseline: Optional[scenario_diff.BaselineRisk] = None  # set on baseline runs only
+    diff: Optional[scenario_diff.ScenarioDiff] = None
+    attribution: Dict[str, pd.DataFrame] = field(default_factory=dict)  # 'top_sources', 'category_shares'
+    seasonal: Optional['seasonal.SeasonalResult'] = None  # monthly results when enabled
+    summary: Dict[str, Any] = field(default_factory=dict)  # see app/summary.py
+    output_paths: Dict[str, Path] = field(default_factory=dict)
+
+def compute_pipeline(model_type: str, scenario_name: str = 'baseline_2025', scenario_override: Dict[str, Any] = None,
+                     state: Optional[EngineState] = None,
+                     progress: Optional[Callable[[float, str], None]] = None) -> PipelineResult:
+    """Run a pipeline fully in memory (no files written).
+
+    With a resident ``state`` the sanitation table, borehole tables and
+    transport adjacency are re-used instead of being re-read / re-queried.
+    ``progress`` receives ``(fraction, message)``.
+    """
+    def report(fraction: float, message: str):
+        if progress is not None:
+            progress(fraction, message)
+
+    scenario = resolve_scenario(scenario_name, scenario_override)
     pcfg = _get_pollutant_config(model_type, scenario)
+    tcfg = _get_transport_config(scenario)
     
     logging.info(f"Starting {model_type.upper()} Pipeline | Scenario: {scenario_name}")
     
     # 1. Load & Intervene
-    df = load_and_standardize_sanitation()
-    df = apply_interventions(df, scenario)
+    report(0.05, "Loading sanitation data")
+    # Coarsening only speeds up transport; Layer 1 loads, tertiles and counts stay per toilet
+    per_toilet = model_type != 'fio'
+    if state is not None:
+        base, coarsening = (state.toilets, None) if per_toilet else (state.sanitation, state.coarsening)
+    elif per_toilet:
+        base, coarsening = load_and_standardize_sanitation(), None
+    else:
+        base, coarsening = load_sanitation_sources()
+    report(0.15, "Applying interventions")
+    protection_index = None
+    if scenario.get('targeted_protection_enabled'):
+        protection_index = state.protection_index(toilets=per_toilet) if state is not None else _protection_index(base)
+    df = apply_interventions(base, scenario, protection_index=protection_index)
     
     # 2. Layer 1
-    df = compute_load(df, pcfg)
+    report(0.30, "Computing loads")
+    df = compute_load(df, pcfg, save_output=False)
+    result = PipelineResult(model_type=model_type, scenario_name=scenario_name, scenario=scenario, loads=df)
     
     if model_type != 'fio':
+        result.summary = run_summary.summarize_result(model_type, scenario_name, df)
         logging.info(f"{model_type.capitalize()} pipeline complete.")
-        return
+        report(1.0, "Done")
+        return result
 
     # 3. Layer 2 & 3 (FIO only)
     # Load boreholes (Private & Gov)
     # For simplicity, we process them together or separate. Let's do separate and concat.
     results = []
+    transport_info = {}
+    n_indexed = 0
+    attribution_k = scenario.get('attribution_top_k', config.ATTRIBUTION_TOP_K)
+    if attribution_k and coarsening is not None:
+        logging.warning(f"Attribution top-k lists super-sources merged within {coarsening.tolerance_m:g}m, "
+                        f"not individual toilets (SOURCE_COARSEN_M)")
+    attributions = []
+    categories = np.union1d(list(config.CONTAINMENT_EFFICIENCY_DEFAULT), df['toilet_category_id'].unique()).astype(int)
     flow_multipliers = scenario.get('flow_multiplier_by_type', {'private': 1.0, 'government': 1.0})
-    for btype, path in [('private', config.PRIVATE_BOREHOLES_ENRICHED_PATH), 
-                        ('government', config.GOVERNMENT_BOREHOLES_ENRICHED_PATH)]:
-        if not path.exists():
+    for i, (btype, path) in enumerate(BOREHOLE_SOURCES):
+        if state is not None:
+            if btype not in state.boreholes:
+                continue
+            bdf = state.boreholes[btype]
+        elif not path.exists():
             logging.warning(f"Borehole file {path} not found. Skipping {btype}.")
             continue
+        else:
+            bdf = pd.read_csv(path)
             
-        bdf = pd.read_csv(path)
-        radius = scenario['radius_by_type'].get(btype, 35.0)
+        report(0.40 + 0.5 * i / len(BOREHOLE_SOURCES), f"Transport for {btype} boreholes")
+        radius = _transport_radius(scenario, btype, pcfg.decay_rate)
+        truncated = transport.truncated_mass_fraction(pcfg.decay_rate, radius)
+        transport_info[btype] = {'radius_m': radius, 'truncated_mass_fraction': truncated}
+        logging.info(f"{btype.capitalize()} transport radius {radius:.1f}m leaves {truncated:.2%} of the kernel mass outside")
         flow_multiplier = flow_multipliers.get(btype, 1.0)
+        # A cached adjacency holds every pair in memory, so tiled/parallel runs query afresh.
+        # Otherwise query the un-intervened sources through the persisted index.
+        adjacency = None
+        if tcfg.mode == 'memory' and state is not None:
+            adjacency = state.adjacency(btype, radius)
+        elif tcfg.mode == 'memory':
+            adjacency = transport.build_adjacency(
+                base[['lat', 'long']].values, bdf[['lat', 'long']].values, radius, persist=True
+            )
         
-        bdf_linked = run_transport(df, bdf, pcfg, radius)
+        if attribution_k:
+            bdf_linked, attribution = run_attribution(df, base, bdf, pcfg, radius, attribution_k, categories,
+                                                      adjacency=adjacency, tcfg=tcfg)
+        else:
+            bdf_linked = run_transport(df, bdf, pcfg, radius, adjacency=adjacency, tcfg=tcfg)
+        if 'aggregated_load_error' in bdf_linked:
+            transport_info[btype]['far_field'] = _far_field_report(bdf_linked, tcfg.far_field_tolerance)
         bdf_conc = compute_concentration(bdf_linked, flow_multiplier=flow_multiplier)
         bdf_conc['borehole_type'] = btype
+        # Stable position across all borehole inputs, used to align scenario diffs
+        bdf_conc['borehole_index'] = np.arange(n_indexed, n_indexed + len(bdf_conc))
+        n_indexed += len(bdf_conc)
         results.append(bdf_conc)
+        if attribution_k:
+            attributions.append(_attribution_frames(attribution, categories, bdf_conc, base,
+                                                    coarsened=coarsening is not None))
         
     if results:
-        final_df = pd.concat(results, ignore_index=True)
-        # TODO: drop columns that are not needed for the next step
-        final_df.to_csv(pcfg.output_conc_path, index=False)
-        logging.info(f"Saved FIO concentrations to {pcfg.output_conc_path}")
+        result.concentrations = pd.concat(results, ignore_index=True)
+        if attributions:
+            result.attribution = {name: pd.concat([frames[name] for frames in attributions], ignore_index=True)
+                                  for name in ('top_sources', 'category_shares')}
+        _attach_scenario_diff(result, state)
+        if scenario.get('seasonal', config.SEASONAL_ENABLED):
+            result.seasonal = compute_seasonal(result.concentrations, scenario, seasonal.load_profile())
+            result.concentrations['exceedance_months'] = result.seasonal.exceedance_months()
     else:
         logging.warning("No borehole results generated.")
+    result.summary = run_summary.summarize_result(model_type, scenario_name, df, result.concentrations)
+    result.summary['transport'] = transport_info
+    if result.seasonal is not None:
+        result.summary['seasonal'] = result.seasonal.summary()
+    if coarsening is not None:
+        result.summary['coarsening'] = coarsening.report(pcfg.decay_rate)
+    report(1.0, "Done")
+    return result
+
+def _far_field_report(boreholes: pd.DataFrame, tolerance: float) -> Dict[str, float]:
+    """Estimated relative error of the far-field transport sums."""
+    loads = boreholes['aggregated_load'].values
+    errors = boreholes['aggregated_load_error'].values
+    relative = np.divide(errors, loads, out=np.zeros(len(loads)), where=loads > 0)
+    return {
+        'tolerance': tolerance,
+        'max_relative_error': float(relative.max()) if len(relative) else 0.0,
+        'mean_relative_error': float(relative.mean()) if len(relative) else 0.0,
+    }
+
+def _attach_scenario_diff(result: PipelineResult, state: Optional[EngineState]):
+    """Diff ``result`` against the baseline run (computed via ``state`` or read from disk)."""
+    if result.scenario == resolve_scenario(config.BASELINE_SCENARIO):
+        baseline = result.baseline = scenario_diff.BaselineRisk.from_concentrations(result.concentrations)
+        if state is not None:
+            state.store_baseline(baseline)
+    elif state is not None:
+        baseline = state.baseline_risk()
+    else:
+        baseline = scenario_diff.BaselineRisk.load(config.BASELINE_RISK_PATH)
+        if baseline is None:
+            logging.info(f"No baseline risk at {config.BASELINE_RISK_PATH}; run '{config.BASELINE_SCENARIO}' to enable scenario diffs.")
+            return
+    result.diff = scenario_diff.compute_diff(result.concentrations, baseline)
+
+def write_pipeline_outputs(result: PipelineResult, output_dir: Optional[Path] = None) -> Dict[str, Path]:
+    """Persist a ``PipelineResult`` (atomically) and return the paths written.
+
+    ``output_dir`` redirects outputs away from the shared ``data/output`` files.
+    """
+    pcfg = _get_pollutant_config(result.model_type, result.scenario)
+    load_path, conc_path = pcfg.output_load_path, pcfg.output_conc_path
+    if output_dir is not None:
+        load_path = Path(output_dir) / load_path.name
+        conc_path = Path(output_dir) / conc_path.name if conc_path else None
+
+    # TODO: drop columns that are not needed for the next step
+    _write_csv_atomic(result.loads, load_path)
+    logging.info(f"Saved Layer 1 load to {load_path}")
+    outputs = {'load': load_path}
+    if result.concentrations is not None:
+        _write_csv_atomic(result.concentrations, conc_path)
+        logging.info(f"Saved FIO concentrations to {conc_path}")
+        outputs['concentration'] = conc_path
+    if result.baseline is not None:
+        baseline_path = _redirect(config.BASELINE_RISK_PATH, output_dir)
+        outputs['baseline'] = result.baseline.save(baseline_path)
+    if result.attribution:
+        outputs['attribution'] = _redirect(config.FIO_ATTRIBUTION_PATH, output_dir)
+        outputs['attribution_categories'] = _redirect(config.FIO_ATTRIBUTION_CATEGORIES_PATH, output_dir)
+        _write_csv_atomic(result.attribution['top_sources'], outputs['attribution'])
+        _write_csv_atomic(result.attribution['category_shares'], outputs['attribution_categories'])
+        logging.info(f"Saved source attribution to {outputs['attribution']}")
+    if result.seasonal is not None:
+        outputs['seasonal'] = result.seasonal.save(_redirect(config.FIO_SEASONAL_PATH, output_dir))
+        logging.info(f"Saved monthly concentrations to {outputs['seasonal']}")
+    if result.diff is not None:
+        outputs['diff'], outputs['diff_summary'] = result.diff.save(
+            _redirect(config.FIO_SCENARIO_DIFF_PATH, output_dir),
+            _redirect(config.FIO_SCENARIO_DIFF_SUMMARY_PATH, output_dir),
+        )
+        logging.info(f"Saved scenario diff to {outputs['diff']}")
+    if result.summary:
+        outputs['summary'] = run_summary.write_summary(result.summary, _redirect(pcfg.output_summary_path, output_dir))
+    result.output_paths = outputs
+    return outputs
+
+def _redirect(path: Path, output_dir: Optional[Path]) -> Path:
+    return Path(output_dir) / path.name if output_dir is not None else path
+
+def run_pipeline(model_type: str, scenario_name: str = 'baseline_2025', scenario_override: Dict[str, Any] = None,
+                 output_dir: Optional[Path] = None,
+                 progress: Optional[Callable[[float, str], None]] = None) -> Dict[str, Path]:
+    """Run a full pipeline, write its outputs and return the paths written."""
+    result = compute_pipeline(model_type, scenario_name, scenario_override, progress=progress)
+    return write_pipeline_outputs(result, output_dir)
@@ -0,0 +1,151 @@
+"""Background job runner for dashboard pipeline runs.
+
+Scenario runs are submitted to a small thread pool so the Streamlit script
+keeps rendering while the model computes. Requests that resolve to the same
+model + scenario parameters while a run is still in flight are coalesced onto
+that job. Runs compute in memory (optionally against a resident
+``engine.EngineState``). Each job gets its own scratch directory under
+``config.JOBS_OUTPUT_DIR`` so concurrent runs never clobber each other; the
+scratch directory is deleted when the job drops out of the runner's history.
+Exporting a job writes under ``config.EXPORTS_OUTPUT_DIR`` instead, which is
+never pruned.
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import config, engine
+
+
+def scenario_hash(model_type: str, scenario: Dict[str, Any]) -> str:
+    """Stable hash of a fully resolved scenario (key order independent)."""
+    payload = json.dumps({'model': model_type, 'scenario': scenario}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class Job:
+    """A single submitted pipeline run and its progress."""
+    job_id: str
+    model_type: str
+    scenario_name: str
+    scenario_hash: str
+    output_dir: Path
+    export_dir: Path
+    progress: float = 0.0
+    message: str = 'Queued'
+    submitted_at: float = field(default_factory=time.time)
+    future: Optional[Future] = None
+
+    def report(self, fraction: float, message: str):
+        """Progress callback handed to ``engine.compute_pipeline``."""
+        self.progress = float(min(max(fraction, 0.0), 1.0))
+        self.message = message
+
+    @property
+    def status(self) -> str:
+        if self.future is None:
+            return 'queued'
+        if self.future.done():
+            return 'failed' if self.future.exception() is not None else 'done'
+        return 'running' if self.future.running() else 'queued'
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        return self.future.exception() if self.done() else None
+
+    def result(self, timeout: Optional[float] = None) -> engine.PipelineResult:
+        """In-memory outputs of the run (blocks until finished)."""
+        return self.future.result(timeout=timeout)
+
+    def export(self) -> Dict[str, Path]:
+        """Write the run's outputs (atomically) into this job's export directory."""
+        return engine.write_pipeline_outputs(self.result(), self.export_dir)
+
+
+class JobRunner:
+    """Thread-pool runner that coalesces identical in-flight scenario runs."""
+
+    def __init__(self, max_workers: int = config.JOB_MAX_WORKERS, output_root: Optional[Path] = None,
+                 state: Optional[engine.EngineState] = None, export_root: Optional[Path] = None):
+        self.output_root = Path(output_root or config.JOBS_OUTPUT_DIR)
+        self.export_root = Path(export_root or config.EXPORTS_OUTPUT_DIR)
+        self.state = state
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pipeline-job')
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[str, Job] = {}
+
+    def submit(self, model_type: str, scenario_name: str, scenario_override: Optional[Dict[str, Any]] = None) -> Job:
+        """Queue a run, or return the in-flight job for the same resolved scenario."""
+        scenario = engine.resolve_scenario(scenario_name, scenario_override)
+        digest = scenario_hash(model_type, scenario)
+
+        with self._lock:
+            existing = self._in_flight.get(digest)
+            if existing is not None and not existing.done():
+                logging.info(f"Coalescing {model_type} run for '{scenario_name}' onto job {existing.job_id}")
+                return existing
+
+            job_id = f"{model_type}-{digest[:12]}-{uuid.uuid4().hex[:6]}"
+            job = Job(
+                job_id=job_id,
+                model_type=model_type,
+                scenario_name=scenario_name,
+                scenario_hash=digest,
+                output_dir=self.output_root / job_id,
+                export_dir=self.export_root / job_id
+            )
+            self._jobs[job_id] = job
+            self._in_flight[digest] = job
+            pruned = self._prune_history()
+            job.future = self._executor.submit(self._run, job, scenario_override)
+        for old in pruned:
+            shutil.rmtree(old.output_dir, ignore_errors=True)
+        return job
+
+    def _run(self, job: Job, scenario_override: Optional[Dict[str, Any]]) -> engine.PipelineResult:
+        try:
+            return engine.compute_pipeline(
+                job.model_type,
+                job.scenario_name,
+                scenario_override,
+                state=self.state,
+                progress=job.report
+            )
+        except Exception:
+            logging.exception(f"Pipeline job {job.job_id} failed")
+            job.message = 'Failed'
+            raise
+        finally:
+            with self._lock:
+                if self._in_flight.get(job.scenario_hash) is job:
+                    del self._in_flight[job.scenario_hash]
+
+    def _prune_history(self) -> List[Job]:
+        """Forget the oldest finished jobs (and their in-memory results).
+
+        Returns the pruned jobs; the caller deletes their scratch output
+        directories once the lock is released. Exports are left alone.
+        """
+        finished = [job_id for job_id, job in self._jobs.items() if job.done()]
+        return [self._jobs.pop(job_id) for job_id in finished[:max(0, len(finished) - config.JOB_HISTORY_LIMIT)]]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,202 @@
+"""Fused accumulation kernels over CSR neighbour lists.
+
+The transport sum and the calibration neighbour features are a gather,
+``exp`` and sum over each borehole's ragged neighbour list. The ``numpy``
+backend evaluates them with whole-array temporaries and ``np.bincount``;
+the optional ``numba`` backend compiles one loop per borehole (in parallel
+over boreholes) with no intermediate arrays. Both add each row's pairs in
+list order, so they agree to the last few ulps of ``exp``.
+
+``decay_attribution`` also keeps each row's k largest single contributions
+in a fixed (n_rows, k) buffer while it sums the per-category loads: numba
+holds a k-entry buffer per row, numpy merges slabs of k pairs per row into
+the buffer with ``argpartition``. Neither sorts or stores all pairs.
+
+The backend is chosen at call time from ``config.ACCUMULATION_BACKEND``:
+``auto`` uses numba when it is installed, and a requested but missing numba
+falls back to numpy with a warning.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+from . import config
+
+try:
+    import numba
+except ImportError:  # optional dependency
+    numba = None
+
+BACKENDS = ('auto', 'numba', 'numpy')
+_warned_missing = False
+
+
+def available_backends() -> Tuple[str, ...]:
+    return ('numba', 'numpy') if numba is not None else ('numpy',)
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Concrete backend (``numba`` or ``numpy``) for a requested one (default from config)."""
+    global _warned_missing
+    backend = backend or config.ACCUMULATION_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend: {backend} (expected one of {BACKENDS})")
+    if backend == 'numpy':
+        return 'numpy'
+    if numba is not None:
+        return 'numba'
+    if backend == 'numba' and not _warned_missing:
+        logging.warning("Numba is not installed; using the NumPy transport kernels.")
+        _warned_missing = True
+    return 'numpy'
+
+
+def _row_ids(indptr: np.ndarray) -> np.ndarray:
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _decay_sum_numpy(indptr, indices, distances, loads, decay_rate):
+    contrib = loads[indices] * np.exp(-decay_rate * distances)
+    return np.bincount(_row_ids(indptr), weights=contrib, minlength=len(indptr) - 1)
+
+
+def _neighbor_features_numpy(indptr, indices, distances, loads, decay_rate):
+    rows = _row_ids(indptr)
+    n = len(indptr) - 1
+    gathered = loads[indices]
+    return (
+        np.diff(indptr).astype(float),
+        np.bincount(rows, weights=gathered, minlength=n),
+        np.bincount(rows, weights=gathered / (distances + 1.0), minlength=n),
+        np.bincount(rows, weights=gathered * np.exp(-decay_rate * distances), minlength=n),
+    )
+
+
+def _decay_attribution_numpy(indptr, indices, distances, loads, decay_rate, k):
+    n, n_categories = len(indptr) - 1, loads.shape[1]
+    sums = np.zeros((n, n_categories))
+    top_sources = np.full((n, k), -1, dtype=np.int64)
+    top_loads = np.zeros((n, k))
+    source_totals = loads.sum(axis=1)
+    degree = np.diff(indptr)
+    by_degree = np.argsort(-degree, kind='stable')
+    sorted_degree = degree[by_degree]
+    offsets = np.arange(k)
+    # Slab ``start`` holds pairs start .. start + k - 1 of every row that long
+    for start in range(0, int(sorted_degree[0]) if n else 0, k):
+        rows = by_degree[:np.searchsorted(-sorted_degree, -start, side='left')]
+        pos = indptr[rows, None] + start + offsets
+        valid = pos < indptr[rows + 1, None]
+        pos = np.where(valid, pos, indptr[rows, None])
+        src = indices[pos]
+        kernel = np.where(valid, np.exp(-decay_rate * distances[pos]), 0.0)
+        sums[rows] += np.einsum('rk,rkc->rc', kernel, loads[src])
+        contrib = kernel * source_totals[src]
+        cand_loads = np.concatenate([top_loads[rows], contrib], axis=1)
+        cand_sources = np.concatenate([top_sources[rows], np.where(contrib > 0, src, -1)], axis=1)
+        keep = np.argpartition(-cand_loads, k - 1, axis=1)[:, :k]
+        top_loads[rows] = np.take_along_axis(cand_loads, keep, axis=1)
+        top_sources[rows] = np.take_along_axis(cand_sources, keep, axis=1)
+    order = np.argsort(-top_loads, axis=1, kind='stable')
+    return sums, np.take_along_axis(top_sources, order, axis=1), np.take_along_axis(top_loads, order, axis=1)
+
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _decay_sum_numba(indptr, indices, distances, loads, decay_rate):
+        n = len(indptr) - 1
+        out = np.zeros(n)
+        for row in numba.prange(n):
+            total = 0.0
+            for p in range(indptr[row], indptr[row + 1]):
+                total += loads[indices[p]] * np.exp(-decay_rate * distances[p])
+            out[row] = total
+        return out
+
+    @numba.njit(parallel=True, cache=True)
+    def _neighbor_features_numba(indptr, indices, distances, loads, decay_rate):
+        n = len(indptr) - 1
+        count, load_sum, invd_sum, decay_sum = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+        for row in numba.prange(n):
+            s = i = d = 0.0
+            for p in range(indptr[row], indptr[row + 1]):
+                load = loads[indices[p]]
+                s += load
+                i += load / (distances[p] + 1.0)
+                d += load * np.exp(-decay_rate * distances[p])
+            count[row] = indptr[row + 1] - indptr[row]
+            load_sum[row], invd_sum[row], decay_sum[row] = s, i, d
+        return count, load_sum, invd_sum, decay_sum
+
+    @numba.njit(parallel=True, cache=True)
+    def _decay_attribution_numba(indptr, indices, distances, loads, decay_rate, k):
+        n, n_categories = len(indptr) - 1, loads.shape[1]
+        sums = np.zeros((n, n_categories))
+        top_sources = np.full((n, k), -1, dtype=np.int64)
+        top_loads = np.zeros((n, k))
+        for row in numba.prange(n):
+            best_src = np.full(k, -1, dtype=np.int64)
+            best = np.zeros(k)
+            low = 0  # slot of the smallest kept contribution
+            for p in range(indptr[row], indptr[row + 1]):
+                j = indices[p]
+                kernel = np.exp(-decay_rate * distances[p])
+                contrib = 0.0
+                for c in range(n_categories):
+                    sums[row, c] += loads[j, c] * kernel
+                    contrib += loads[j, c]
+                contrib *= kernel
+                if contrib > best[low]:
+                    best[low], best_src[low] = contrib, j
+                    for slot in range(k):
+                        if best[slot] < best[low]:
+                            low = slot
+            order = np.argsort(-best, kind='mergesort')
+            for r in range(k):
+                top_loads[row, r] = best[order[r]]
+                top_sources[row, r] = best_src[order[r]]
+        return sums, top_sources, top_loads
+
+
+def _arrays(indptr, indices, distances, loads):
+    return (np.ascontiguousarray(indptr, dtype=np.int64), np.ascontiguousarray(indices, dtype=np.int64),
+            np.ascontiguousarray(distances, dtype=np.float64), np.ascontiguousarray(loads, dtype=np.float64))
+
+
+def decay_sum(indptr: np.ndarray, indices: np.ndarray, distances: np.ndarray, loads: np.ndarray,
+              decay_rate: float, backend: Optional[str] = None) -> np.ndarray:
+    """Per row: sum of ``loads[j] * exp(-decay_rate * d)`` over the row's (j, d) pairs."""
+    args = _arrays(indptr, indices, distances, loads) + (float(decay_rate),)
+    if resolve_backend(backend) == 'numba':
+        return _decay_sum_numba(*args)
+    return _decay_sum_numpy(*args)
+
+
+def decay_attribution(indptr: np.ndarray, indices: np.ndarray, distances: np.ndarray, loads: np.ndarray,
+                      decay_rate: float, k: int, backend: Optional[str] = None) -> Tuple[np.ndarray, ...]:
+    """Per row: decayed load per ``loads`` column, and the k largest single-source contributions.
+
+    ``loads`` is (n_sources, n_categories); a source's contribution is its
+    summed load times the decay. Returns the (n_rows, n_categories) sums and
+    the (n_rows, k) source indices (-1 when empty) and contributions, by
+    decreasing contribution.
+    """
+    if k < 1:
+        raise ValueError(f"Attribution needs k >= 1, got {k}")
+    loads = np.asarray(loads, dtype=float)
+    loads = np.ascontiguousarray(loads[:, None] if loads.ndim == 1 else loads)
+    indptr, indices, distances, _ = _arrays(indptr, indices, distances, np.zeros(0))
+    if resolve_backend(backend) == 'numba':
+        return _decay_attribution_numba(indptr, indices, distances, loads, float(decay_rate), int(k))
+    return _decay_attribution_numpy(indptr, indices, distances, loads, float(decay_rate), int(k))
+
+
+def neighbor_features(indptr: np.ndarray, indices: np.ndarray, distances: np.ndarray, loads: np.ndarray,
+                      decay_rate: float, backend: Optional[str] = None) -> Tuple[np.ndarray, ...]:
+    """Per row: neighbour count, load sum, inverse-distance and decayed load sums."""
+    args = _arrays(indptr, indices, distances, loads) + (float(decay_rate),)
+    if resolve_backend(backend) == 'numba':
+        return _neighbor_features_numba(*args)
+    return _neighbor_features_numpy(*args)
@@ -0,0 +1,80 @@
+"""Columnar point buffers for the dashboard map layers.
+
+Views used to hand pydeck whole DataFrames, so every rerun serialised each
+column (full float64 reprs, a Python list per row for the colour) into the
+deck JSON. Here a layer is described by packed arrays instead: float32
+positions, uint8 RGBA colours and float32 weights/radii. ``records`` turns
+them into the leanest rows the JSON transport accepts - one scalar per
+channel, positions rounded to ~1 m - which the layer accessors reassemble
+(``[x, y]``, ``[r, g, b, a]``) on the client.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+POSITION_DECIMALS = 5  # ~1 m, below float32 precision at these longitudes
+VALUE_DECIMALS = 3
+
+GET_POSITION = '[x, y]'
+GET_FILL_COLOR = '[r, g, b, a]'
+GET_RADIUS = 's'
+GET_WEIGHT = 'w'
+
+
+@dataclass
+class PointBuffers:
+    positions: np.ndarray  # (N, 2) float32 long/lat
+    colors: np.ndarray     # (N, 4) uint8 RGBA
+    weights: np.ndarray    # (N,) float32
+    radii: np.ndarray      # (N,) float32 metres
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.positions, self.colors, self.weights, self.radii))
+
+    def records(self) -> List[Dict]:
+        """Per-point rows for JSON transports, one scalar per attribute."""
+        xy = np.round(self.positions.astype(np.float64), POSITION_DECIMALS)
+        columns = {
+            'x': xy[:, 0].tolist(),
+            'y': xy[:, 1].tolist(),
+            'r': self.colors[:, 0].tolist(),
+            'g': self.colors[:, 1].tolist(),
+            'b': self.colors[:, 2].tolist(),
+            'a': self.colors[:, 3].tolist(),
+            'w': np.round(self.weights.astype(np.float64), VALUE_DECIMALS).tolist(),
+            's': np.round(self.radii.astype(np.float64), 1).tolist(),
+        }
+        keys = list(columns)
+        return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def point_buffers(lat, lon, colors, weights=None, radii=None) -> PointBuffers:
+    """Pack point attributes into contiguous typed arrays.
+
+    ``colors`` is an (N, 4) array as returned by ``colormap.map_values``;
+    missing ``weights`` default to 1 and missing ``radii`` to 0.
+    """
+    lat = np.asarray(lat, dtype=np.float32)
+    lon = np.asarray(lon, dtype=np.float32)
+    n = len(lat)
+    positions = np.empty((n, 2), dtype=np.float32)
+    positions[:, 0] = lon
+    positions[:, 1] = lat
+    return PointBuffers(
+        positions=positions,
+        colors=np.ascontiguousarray(colors, dtype=np.uint8).reshape(n, 4),
+        weights=_column(weights, n, 1.0),
+        radii=_column(radii, n, 0.0),
+    )
+
+
+def _column(values: Optional[np.ndarray], n: int, default: float) -> np.ndarray:
+    if values is None:
+        return np.full(n, default, dtype=np.float32)
+    return np.ascontiguousarray(values, dtype=np.float32).reshape(n)
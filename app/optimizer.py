@@ -0,0 +1,209 @@
+"""Budget-constrained toilet upgrade selection.
+
+Concentrations are linear in source loads: ``c = A @ load`` with the sparse
+influence matrix ``A[b, s] = exp(-k d_bs) / (Q_b * flow_multiplier * 10)``
+over the transport adjacency. Upgrading source ``s`` lowers its load by
+``delta_s``, so borehole ``b`` improves by ``A[b, s] * delta_s``. Objectives:
+
+- ``exposure``: total concentration reduction over all boreholes.
+- ``high_risk``: reduction of each borehole's excess over the concentration
+  at ``config.OPTIMIZER_RISK_THRESHOLD`` (capped at that excess), i.e. how
+  far high-risk wells are pulled towards the threshold.
+
+Both are monotone submodular, so lazy greedy on gain per unit cost (with a
+priority queue of stale upper bounds) picks the same toilets as plain
+greedy while re-evaluating only the few candidates that reach the top.
+The resulting ``UpgradePlan`` feeds ``apply_interventions`` through the
+``toilet_upgrades`` scenario key.
+"""
+
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from . import config
+from . import engine
+from . import transport
+
+OBJECTIVES = ('exposure', 'high_risk')
+
+
+@dataclass
+class UpgradePlan:
+    """Sources (base sanitation rows) to upgrade, in selection order."""
+    source_index: np.ndarray
+    marginal_gain: np.ndarray  # objective gain of each pick when it was chosen
+    cost: np.ndarray
+    objective: str
+    budget: float
+    toilet_category_id: int = 3
+    efficiency: float = 0.80
+    summary: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def total_gain(self) -> float:
+        return float(self.marginal_gain.sum())
+
+    def scenario_override(self) -> Dict[str, Any]:
+        """Scenario override applying this plan (see ``engine.apply_interventions``)."""
+        return {'toilet_upgrades': {'source_index': self.source_index.tolist(),
+                                    'toilet_category_id': self.toilet_category_id,
+                                    'efficiency': self.efficiency}}
+
+    def to_frame(self, sanitation: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        df = pd.DataFrame({'source_index': self.source_index, 'marginal_gain': self.marginal_gain,
+                           'cost': self.cost, 'cumulative_cost': np.cumsum(self.cost)})
+        if sanitation is not None:
+            rows = sanitation.iloc[self.source_index]
+            for column in ('id', 'lat', 'long', 'toilet_category_id'):
+                if column in rows.columns:
+                    df[column] = rows[column].values
+        return df
+
+
+def influence_matrix(result: 'engine.PipelineResult', sanitation: pd.DataFrame,
+                     state: Optional['engine.EngineState'] = None) -> sparse.csc_matrix:
+    """Borehole x source concentration per unit load for an FIO run (rows follow ``borehole_index``)."""
+    scenario = result.scenario
+    pcfg = engine._get_pollutant_config('fio', scenario)
+    flow_multipliers = scenario.get('flow_multiplier_by_type', {'private': 1.0, 'government': 1.0})
+    conc = result.concentrations.sort_values('borehole_index')
+    blocks = []
+    for btype, _ in engine.BOREHOLE_SOURCES:
+        part = conc[conc['borehole_type'] == btype]
+        if part.empty:
+            continue
+        radius = engine._transport_radius(scenario, btype, pcfg.decay_rate)
+        if state is not None:
+            adjacency = state.adjacency(btype, radius)
+        else:
+            adjacency = transport.build_adjacency(sanitation[['lat', 'long']].values, part[['lat', 'long']].values,
+                                                  radius, persist=True)
+        scale = 1.0 / (part['Q_L_per_day'].values * max(flow_multipliers.get(btype, 1.0), 1e-6) * 10.0)
+        data = np.exp(-pcfg.decay_rate * adjacency.distances_m) * scale[adjacency.row_ids()]
+        blocks.append(sparse.csr_matrix((data, adjacency.indices, adjacency.indptr),
+                                        shape=(adjacency.n_boreholes, len(sanitation))))
+    return sparse.vstack(blocks).tocsc()
+
+
+def lazy_greedy(influence: sparse.csc_matrix, delta: np.ndarray, cost: np.ndarray, budget: float,
+                cap: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick sources maximising ``sum_b min(sum_s A[b, s] * delta_s, cap_b)`` within ``budget``.
+
+    Returns the picked sources in order and their marginal gains. Lazy
+    evaluation is exact because gains only shrink as caps are used up; the
+    best single source is returned instead if it beats the greedy set.
+    """
+    influence = sparse.csc_matrix(influence)
+    n_sources = influence.shape[1]
+    indptr, rows = influence.indptr, influence.indices
+    cols = np.repeat(np.arange(n_sources), np.diff(indptr))
+    effect = influence.data * np.asarray(delta, dtype=float)[cols]
+    residual = np.full(influence.shape[0], np.inf) if cap is None else np.asarray(cap, dtype=float).copy()
+    cost = np.asarray(cost, dtype=float)
+
+    gain0 = np.bincount(cols, weights=np.minimum(effect, residual[rows]), minlength=n_sources)
+    candidates = np.flatnonzero((gain0 > 0) & (cost > 0) & (cost <= budget))
+    heap = list(zip((-gain0[candidates] / cost[candidates]).tolist(), candidates.tolist()))
+    heapq.heapify(heap)
+
+    picked: List[int] = []
+    gains: List[float] = []
+    spent = 0.0
+    while heap:
+        _, s = heapq.heappop(heap)
+        if cost[s] > budget - spent:
+            continue
+        lo, hi = indptr[s], indptr[s + 1]
+        gain = float(np.minimum(effect[lo:hi], residual[rows[lo:hi]]).sum())
+        if gain <= 0:
+            continue
+        ratio = gain / cost[s]
+        if heap and ratio < -heap[0][0]:
+            heapq.heappush(heap, (-ratio, s))  # stale: re-queue with its current gain
+            continue
+        residual[rows[lo:hi]] = np.maximum(residual[rows[lo:hi]] - effect[lo:hi], 0.0)
+        picked.append(s)
+        gains.append(gain)
+        spent += cost[s]
+
+    if len(candidates) and gain0[candidates].max() > sum(gains):
+        best = candidates[np.argmax(gain0[candidates])]
+        return np.array([best]), np.array([gain0[best]])
+    return np.array(picked, dtype=np.int64), np.array(gains)
+
+
+def optimize_upgrades(budget: float, objective: str = 'high_risk', costs: Optional[Dict[int, float]] = None,
+                      scenario_name: str = config.BASELINE_SCENARIO,
+                      scenario_override: Optional[Dict[str, Any]] = None,
+                      state: Optional['engine.EngineState'] = None,
+                      toilet_category_id: int = 3, efficiency: float = 0.80) -> UpgradePlan:
+    """Choose toilets to upgrade to ``efficiency`` under ``budget``.
+
+    ``costs`` maps the current ``toilet_category_id`` to the cost of
+    upgrading one toilet (default 1, so ``budget`` counts toilets). Plans
+    price and list individual toilets, so coarsened sources are rejected.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective} (expected one of {OBJECTIVES})")
+    if (state.coarsening is not None) if state is not None else config.SOURCE_COARSEN_M is not None:
+        raise ValueError("Upgrade plans need the uncoarsened sanitation table (SOURCE_COARSEN_M=None).")
+    result = engine.compute_pipeline('fio', scenario_name, scenario_override, state=state)
+    if result.concentrations is None:
+        raise ValueError("No borehole results to optimise against.")
+    sanitation = state.sanitation if state is not None else engine.load_sanitation_sources()[0]
+
+    start = time.perf_counter()
+    influence = influence_matrix(result, sanitation, state)
+    # Load removed by upgrading each source row (split rows share their source_index)
+    pcfg = engine._get_pollutant_config('fio', result.scenario)
+    loads = result.loads
+    gain_per_row = loads['household_population'].values * pcfg.efio * np.maximum(
+        efficiency - loads['pathogen_containment_efficiency'].values, 0.0)
+    delta = np.bincount(loads['source_index'].values, weights=gain_per_row, minlength=len(sanitation))
+    cost_map = costs or {}
+    cost = sanitation['toilet_category_id'].map(lambda c: cost_map.get(int(c), 1.0)).values.astype(float)
+
+    conc = result.concentrations.sort_values('borehole_index')['concentration_CFU_per_100mL'].values
+    threshold_conc = 10 ** (config.OPTIMIZER_RISK_THRESHOLD / 20) - 1
+    cap = np.maximum(conc - threshold_conc, 0.0) if objective == 'high_risk' else None
+    picked, gains = lazy_greedy(influence, delta, cost, budget, cap)
+
+    after = conc - influence[:, picked] @ delta[picked] if len(picked) else conc
+    summary = {
+        'objective': objective,
+        'budget': budget,
+        'spent': float(cost[picked].sum()),
+        'toilets': int(len(picked)),
+        'candidates': int(((influence.getnnz(axis=0) > 0) & (delta > 0)).sum()),
+        'total_gain': float(gains.sum()),
+        'high_risk_before': int((conc > threshold_conc).sum()),
+        'high_risk_after': int((after > threshold_conc + 1e-9).sum()),
+        'seconds': time.perf_counter() - start,
+    }
+    logging.info(f"Optimized upgrades ({objective}): {summary['toilets']:,} toilets of {summary['candidates']:,} "
+                 f"candidates for {summary['spent']:g}/{budget:g} budget; high-risk wells "
+                 f"{summary['high_risk_before']} -> {summary['high_risk_after']} in {summary['seconds']:.2f}s")
+    return UpgradePlan(source_index=picked, marginal_gain=gains, cost=cost[picked], objective=objective,
+                       budget=budget, toilet_category_id=toilet_category_id, efficiency=efficiency, summary=summary)
+
+
+def save_plan(plan: UpgradePlan, sanitation: Optional[pd.DataFrame] = None,
+              path: Optional[Path] = None) -> Path:
+    path = Path(path or config.OPTIMIZED_UPGRADES_PATH)
+    engine._write_csv_atomic(plan.to_frame(sanitation), path)
+    return path
+
+
+def load_plan_override(path: Path, toilet_category_id: int = 3, efficiency: float = 0.80) -> Dict[str, Any]:
+    """``toilet_upgrades`` scenario override from a saved plan CSV."""
+    source_index = pd.read_csv(path)['source_index'].astype(int).tolist()
+    return {'toilet_upgrades': {'source_index': source_index, 'toilet_category_id': toilet_category_id,
+                                'efficiency': efficiency}}
@@ -0,0 +1,114 @@
+"""Targeted borehole protection: baseline risk ranking + protection zones.
+
+Scenario 1 upgrades every toilet within a buffer of the highest-risk
+boreholes of the baseline run. The baseline risk per ``borehole_index`` and
+each borehole's zone (sanitation rows within ``config.PROTECTION_MAX_BUFFER_M``,
+with distances) are built once per baseline run, kept by ``EngineState``
+and saved to ``config.PROTECTION_INDEX_PATH``; any percentile and buffer up
+to the maximum is then a lookup instead of a CSV read and a tree query.
+"""
+
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from . import config
+from . import spatial_index
+from . import transport
+from .scenario_diff import BaselineRisk
+
+
+@dataclass
+class ProtectionIndex:
+    """Baseline risk per borehole and borehole -> sanitation row zones."""
+    risk_score: np.ndarray       # baseline risk per borehole_index (NaN if missing)
+    zones: transport.Adjacency   # borehole_index -> sanitation rows within zones.radius_m
+    key: str
+
+    def high_risk(self, percentile: float = config.TARGETED_PROTECTION_PERCENTILE) -> np.ndarray:
+        """``borehole_index`` of boreholes at or above the baseline risk ``percentile`` (0-1)."""
+        valid = ~np.isnan(self.risk_score)
+        if not valid.any():
+            return np.zeros(0, dtype=np.int64)
+        threshold = np.quantile(self.risk_score[valid], percentile)
+        return np.flatnonzero(valid & (self.risk_score >= threshold))
+
+    def select(self, percentile: float = config.TARGETED_PROTECTION_PERCENTILE,
+               buffer_m: float = config.TARGETED_PROTECTION_BUFFER_M) -> np.ndarray:
+        """Sanitation rows within ``buffer_m`` of the boreholes at or above ``percentile``."""
+        if buffer_m > self.zones.radius_m:
+            raise ValueError(f"Protection buffer {buffer_m}m exceeds the cached zones ({self.zones.radius_m}m)")
+        boreholes = np.zeros(self.zones.n_boreholes, dtype=bool)
+        boreholes[self.high_risk(percentile)] = True
+        keep = boreholes[self.zones.row_ids()] & (self.zones.distances_m <= buffer_m)
+        return np.unique(self.zones.indices[keep])
+
+    def save(self, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.stem}.{os.getpid()}.tmp.npz')
+        np.savez(tmp, risk_score=self.risk_score, indptr=self.zones.indptr, indices=self.zones.indices,
+                 distances_m=self.zones.distances_m, n_sources=self.zones.n_sources,
+                 radius_m=self.zones.radius_m, key=self.key)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['ProtectionIndex']:
+        if not Path(path).exists():
+            return None
+        with np.load(path) as data:
+            zones = transport.Adjacency(indptr=data['indptr'], indices=data['indices'],
+                                        distances_m=data['distances_m'], n_sources=int(data['n_sources']),
+                                        radius_m=float(data['radius_m']))
+            return cls(risk_score=data['risk_score'], zones=zones, key=str(data['key']))
+
+
+def protection_key(sanitation_latlon: np.ndarray, baseline: BaselineRisk, max_buffer_m: float) -> str:
+    """Fingerprint of the sanitation locations, baseline risk and zone radius."""
+    digest = hashlib.sha1(spatial_index.fingerprint(sanitation_latlon, config.SPATIAL_INDEX_BACKEND).encode())
+    digest.update(f'{max_buffer_m}:'.encode())
+    digest.update(np.ascontiguousarray(baseline.risk_score, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(baseline.latlon, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:20]
+
+
+def build_protection_index(sanitation_latlon: np.ndarray, baseline: BaselineRisk,
+                           max_buffer_m: Optional[float] = None) -> ProtectionIndex:
+    """Zones of every baseline borehole over ``sanitation_latlon``, up to ``max_buffer_m``."""
+    max_buffer_m = max_buffer_m or config.PROTECTION_MAX_BUFFER_M
+    if baseline.latlon is None:
+        raise ValueError("Baseline risk has no borehole locations; re-run the baseline scenario.")
+    located = ~np.isnan(baseline.latlon).any(axis=1)
+    zones = transport.build_adjacency(sanitation_latlon, np.where(located[:, None], baseline.latlon, 0.0),
+                                      max_buffer_m, persist=True)
+    # Boreholes missing from the baseline get empty zones
+    counts = np.where(located, np.diff(zones.indptr), 0)
+    keep = np.repeat(located, np.diff(zones.indptr))
+    zones = transport.Adjacency(indptr=np.concatenate([[0], np.cumsum(counts)]), indices=zones.indices[keep],
+                                distances_m=zones.distances_m[keep], n_sources=zones.n_sources, radius_m=max_buffer_m)
+    return ProtectionIndex(risk_score=np.asarray(baseline.risk_score, dtype=float), zones=zones,
+                           key=protection_key(sanitation_latlon, baseline, max_buffer_m))
+
+
+def load_or_build_protection_index(sanitation_latlon: np.ndarray, baseline: BaselineRisk,
+                                   max_buffer_m: Optional[float] = None,
+                                   path: Optional[Path] = None) -> ProtectionIndex:
+    """Protection index from ``path`` if it matches the inputs, else built and saved there."""
+    max_buffer_m = max_buffer_m or config.PROTECTION_MAX_BUFFER_M
+    path = Path(path or config.PROTECTION_INDEX_PATH)
+    sanitation_latlon = np.asarray(sanitation_latlon, dtype=float).reshape(-1, 2)
+    key = protection_key(sanitation_latlon, baseline, max_buffer_m)
+    cached = ProtectionIndex.load(path)
+    if cached is not None and cached.key == key:
+        return cached
+    index = build_protection_index(sanitation_latlon, baseline, max_buffer_m)
+    index.save(path)
+    logging.info(f"Built protection zones ({index.zones.n_pairs:,} borehole/toilet pairs within "
+                 f"{max_buffer_m:g}m) -> {path}")
+    return index
@@ -0,0 +1,146 @@
+"""Per-borehole scenario diffs against the baseline run.
+
+Borehole rows carry a stable integer ``borehole_index`` (position across the
+private + government inputs), so a scenario is compared to the baseline by
+plain array indexing instead of a join. A diff keeps the baseline and
+scenario risk arrays, their difference and summary totals per borehole type;
+it is stored as an ``.npz`` (arrays) plus a small ``.json`` (summary).
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import config
+
+IMPROVEMENT_THRESHOLD = 0.1  # risk points; smaller changes count as unchanged
+ARRAY_FIELDS = ('borehole_index', 'borehole_type', 'lat', 'long',
+                'risk_base', 'risk_score', 'improvement', 'concentration_delta')
+
+
+@dataclass
+class BaselineRisk:
+    """Baseline risk, concentration and borehole lat/long, indexed by ``borehole_index``."""
+    risk_score: np.ndarray
+    concentration: np.ndarray
+    latlon: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_concentrations(cls, df: pd.DataFrame) -> 'BaselineRisk':
+        n = int(df['borehole_index'].max()) + 1 if len(df) else 0
+        risk = np.full(n, np.nan)
+        conc = np.full(n, np.nan)
+        idx = df['borehole_index'].values
+        latlon = np.full((n, 2), np.nan)
+        risk[idx] = df['risk_score'].values
+        conc[idx] = df['concentration_CFU_per_100mL'].values
+        latlon[idx] = df[['lat', 'long']].values
+        return cls(risk_score=risk, concentration=conc, latlon=latlon)
+
+    def save(self, path: Path) -> Path:
+        arrays = {'risk_score': self.risk_score, 'concentration': self.concentration}
+        if self.latlon is not None:
+            arrays['latlon'] = self.latlon
+        _savez_atomic(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path: Path = config.BASELINE_RISK_PATH) -> Optional['BaselineRisk']:
+        if not Path(path).exists():
+            return None
+        with np.load(path) as data:
+            return cls(risk_score=data['risk_score'], concentration=data['concentration'],
+                       latlon=data['latlon'] if 'latlon' in data.files else None)
+
+
+@dataclass
+class ScenarioDiff:
+    """Scenario minus baseline per borehole (``improvement`` > 0 is less risk)."""
+    borehole_index: np.ndarray
+    borehole_type: np.ndarray
+    lat: np.ndarray
+    long: np.ndarray
+    risk_base: np.ndarray
+    risk_score: np.ndarray
+    improvement: np.ndarray
+    concentration_delta: np.ndarray
+    summary: Dict = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.borehole_index)
+
+    def mask(self, borehole_types=None, min_improvement: float = IMPROVEMENT_THRESHOLD) -> np.ndarray:
+        """Boreholes of the given types whose risk dropped by more than ``min_improvement``."""
+        keep = self.improvement > min_improvement
+        if borehole_types is not None:
+            keep &= np.isin(self.borehole_type, list(borehole_types))
+        return keep
+
+    def save(self, npz_path: Path, summary_path: Path) -> Tuple[Path, Path]:
+        _savez_atomic(npz_path, **{name: getattr(self, name) for name in ARRAY_FIELDS})
+        tmp = summary_path.with_name(f'.{summary_path.name}.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(self.summary, indent=2))
+        os.replace(tmp, summary_path)
+        return npz_path, summary_path
+
+    @classmethod
+    def load(cls, npz_path: Path, summary_path: Optional[Path] = None) -> 'ScenarioDiff':
+        with np.load(npz_path) as data:
+            arrays = {name: data[name] for name in ARRAY_FIELDS}
+        summary = json.loads(Path(summary_path).read_text()) if summary_path else {}
+        return cls(summary=summary, **arrays)
+
+
+def compute_diff(concentrations: pd.DataFrame, baseline: BaselineRisk) -> Optional[ScenarioDiff]:
+    """Align a scenario's borehole results with the baseline by ``borehole_index``."""
+    idx = concentrations['borehole_index'].values
+    if len(idx) and idx.max() >= len(baseline.risk_score):
+        logging.warning("Baseline does not cover all boreholes (inputs changed?); skipping scenario diff.")
+        return None
+    risk = concentrations['risk_score'].values.astype(np.float32)
+    risk_base = baseline.risk_score[idx].astype(np.float32)
+    diff = ScenarioDiff(
+        borehole_index=idx.astype(np.int32),
+        borehole_type=concentrations['borehole_type'].values.astype(str),
+        lat=concentrations['lat'].values.astype(np.float32),
+        long=concentrations['long'].values.astype(np.float32),
+        risk_base=risk_base,
+        risk_score=risk,
+        improvement=risk_base - risk,
+        concentration_delta=(concentrations['concentration_CFU_per_100mL'].values
+                             - baseline.concentration[idx]).astype(np.float32),
+    )
+    diff.summary = summarize(diff)
+    return diff
+
+
+def summarize(diff: ScenarioDiff) -> Dict:
+    """Totals per borehole type (and ``all``) for the impact panels."""
+    def totals(sel: np.ndarray) -> Dict:
+        improvement = diff.improvement[sel]
+        improved = improvement > IMPROVEMENT_THRESHOLD
+        return {
+            'boreholes': int(sel.sum()),
+            'improved': int(improved.sum()),
+            'worsened': int((improvement < -IMPROVEMENT_THRESHOLD).sum()),
+            'risk_reduced': float(improvement[improved].sum()),
+            'mean_risk_base': float(np.nanmean(diff.risk_base[sel])) if sel.any() else 0.0,
+            'mean_risk_score': float(np.nanmean(diff.risk_score[sel])) if sel.any() else 0.0,
+        }
+
+    by_type = {btype: totals(diff.borehole_type == btype) for btype in np.unique(diff.borehole_type)}
+    return {'threshold': IMPROVEMENT_THRESHOLD, 'all': totals(np.ones(len(diff), dtype=bool)), 'by_type': by_type}
+
+
+def _savez_atomic(path: Path, **arrays):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.stem}.{os.getpid()}.tmp.npz')
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
@@ -0,0 +1,120 @@
+"""Seasonal abstraction rates: monthly concentrations from one transport run.
+
+Aggregated load does not depend on pumping, so each month's concentration
+is the run's ``aggregated_load`` diluted by that month's abstraction rate
+(``engine.compute_seasonal`` does all 12 months in one broadcast). Monthly Q
+per borehole comes from ``Q_L_per_day_01`` .. ``Q_L_per_day_12`` columns on
+the borehole tables or the profile CSV at ``config.MONTHLY_Q_PROFILE_PATH``
+(keyed by ``borehole_index``); months without a profile value use
+``Q_L_per_day`` scaled by the scenario's ``monthly_q_factors``. A monthly
+Q of 0 means the well is not pumped that month: it has no concentration
+and is left out of the exceedance counts and means.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import config
+
+MONTHS = np.arange(1, 13)
+MONTH_COLUMNS = [f'Q_L_per_day_{m:02d}' for m in MONTHS]
+
+
+def load_profile(path: Optional[Path] = None) -> Optional[pd.DataFrame]:
+    """Monthly Q profile (``borehole_index`` + month columns), or ``None`` if there is none."""
+    path = Path(path or config.MONTHLY_Q_PROFILE_PATH)
+    if not path.exists():
+        return None
+    profile = pd.read_csv(path)
+    missing = [c for c in ['borehole_index'] + MONTH_COLUMNS if c not in profile.columns]
+    if missing:
+        raise ValueError(f"Monthly Q profile {path} is missing columns: {missing}")
+    return profile
+
+
+def monthly_q(boreholes: pd.DataFrame, factors: Sequence[float],
+              profile: Optional[pd.DataFrame] = None) -> np.ndarray:
+    """(12, n_boreholes) abstraction rate in L/day."""
+    factors = np.asarray(factors, dtype=float)
+    if factors.shape != (12,):
+        raise ValueError(f"Expected 12 monthly Q factors, got {factors.shape}")
+    q = np.outer(factors, boreholes['Q_L_per_day'].values.astype(float))
+    if all(c in boreholes.columns for c in MONTH_COLUMNS):
+        given = boreholes[MONTH_COLUMNS].values.T.astype(float)
+        q = np.where(np.isnan(given), q, given)
+    if profile is not None:
+        given = profile.set_index('borehole_index').reindex(boreholes['borehole_index'])[MONTH_COLUMNS]
+        given = given.values.T.astype(float)
+        q = np.where(np.isnan(given), q, given)
+    if (q < 0).any():
+        raise ValueError("Monthly abstraction rates must be non-negative.")
+    return q
+
+
+@dataclass
+class SeasonalResult:
+    """Monthly concentration and risk per borehole (rows follow the run's concentrations)."""
+    borehole_index: np.ndarray
+    borehole_type: np.ndarray
+    q_l_per_day: np.ndarray     # (12, n_boreholes)
+    concentration: np.ndarray   # (12, n_boreholes) CFU/100mL, NaN when not pumping
+    risk_score: np.ndarray      # (12, n_boreholes), NaN when not pumping
+    threshold: float            # CFU/100mL counted as an exceedance
+
+    def pumping_months(self) -> np.ndarray:
+        """Months per year each borehole is pumped (Q > 0)."""
+        return (self.q_l_per_day > 0).sum(axis=0)
+
+    def exceedance_months(self) -> np.ndarray:
+        """Pumped months per year each borehole exceeds ``threshold``."""
+        return (self.concentration > self.threshold).sum(axis=0)  # NaN (not pumping) never exceeds
+
+    def summary(self) -> Dict:
+        """Annual exceedance-frequency statistics over pumped months, overall and per borehole type."""
+        pumping = self.q_l_per_day > 0
+        exceeding = self.concentration > self.threshold
+        months = exceeding.sum(axis=0)
+        pumped = pumping.sum(axis=0)
+        conc = np.where(pumping, self.concentration, 0.0)
+
+        def stats(mask: np.ndarray) -> Dict:
+            n = int(mask.sum())
+            active = mask & (pumped > 0)
+            by_month = pumping[:, mask].sum(axis=1)
+            return {
+                'count': n,
+                'wells_never_pumping': int(n - active.sum()),
+                # Share of each well's pumped months above the threshold, averaged over wells
+                'mean_exceedance_frequency': float((months[active] / pumped[active]).mean()) if active.any() else 0.0,
+                'wells_exceeding_any_month': int((months[mask] > 0).sum()),
+                'wells_exceeding_all_months': int((months[active] == pumped[active]).sum()),
+                'exceedance_months_histogram': np.bincount(months[mask], minlength=13).tolist(),
+                'pumping_by_month': by_month.tolist(),
+                'exceeding_by_month': exceeding[:, mask].sum(axis=1).tolist(),
+                'concentration_mean_by_month': (conc[:, mask].sum(axis=1) / np.maximum(by_month, 1)).tolist(),
+            }
+
+        return {
+            'threshold_cfu_per_100ml': self.threshold,
+            'all': stats(np.ones(len(months), dtype=bool)),
+            'by_type': {btype: stats(self.borehole_type == btype) for btype in sorted(set(self.borehole_type))},
+        }
+
+    def save(self, path: Path) -> Path:
+        """Month x borehole arrays (float32) as a compressed npz."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.stem}.{os.getpid()}.tmp.npz')
+        np.savez_compressed(tmp, months=MONTHS, borehole_index=self.borehole_index,
+                            borehole_type=self.borehole_type.astype(str),
+                            q_l_per_day=self.q_l_per_day.astype(np.float32),
+                            concentration=self.concentration.astype(np.float32),
+                            pumping_months=self.pumping_months(), exceedance_months=self.exceedance_months(),
+                            threshold=self.threshold)
+        os.replace(tmp, path)
+        return path
@@ -0,0 +1,105 @@
+"""Per-run summary statistics for the dashboard metrics panels.
+
+Each pipeline run reduces its row-level outputs once to a small JSON-able
+dict: risk bucket counts per borehole type, load quantiles and tertile
+bucket counts, totals and histograms. The panels render from the summary
+instead of re-running ``pd.cut`` / ``quantile`` over the full frames.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Matched to the risk palette: Blue(0-25), Green(25-50), Yellow(50-60), Orange(60-90), Red(90+)
+RISK_BINS = [-1, 25, 50, 60, 90, 101]
+RISK_LABELS = ['Safe', 'Moderate', 'High', 'Very High', 'Critical']
+LOAD_QUANTILES = (0.33, 0.67, 0.95)
+LOAD_LABELS = ['Low', 'Moderate', 'High']
+HIGH_CONCENTRATION = 100.0  # CFU/100mL
+HISTOGRAM_BINS = 20
+
+
+def _histogram(values: np.ndarray, lo: float, hi: float) -> Dict:
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS, range=(lo, hi if hi > lo else lo + 1.0))
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+def _cut_counts(values: np.ndarray, edges) -> list:
+    """Counts per right-closed bin ``(edges[i], edges[i + 1]]``, as ``pd.cut`` buckets them."""
+    idx = np.searchsorted(np.asarray(edges, dtype=float), values, side='left')
+    return np.bincount(idx, minlength=len(edges) + 1)[1:len(edges)].tolist()
+
+
+def summarize_concentrations(df: pd.DataFrame) -> Dict:
+    """Borehole counts, risk buckets and histograms per borehole type."""
+    def stats(part: pd.DataFrame) -> Dict:
+        conc = part['concentration_CFU_per_100mL'].values
+        out = {
+            'count': int(len(part)),
+            'concentration_mean': float(conc.mean()) if len(conc) else 0.0,
+            'high_concentration': int((conc > HIGH_CONCENTRATION).sum()),
+        }
+        if 'risk_score' in part.columns:
+            risk = part['risk_score'].values
+            out['risk_buckets'] = dict(zip(RISK_LABELS, _cut_counts(risk, RISK_BINS)))
+            out['risk_histogram'] = _histogram(risk, 0.0, 100.0)
+        return out
+
+    return {
+        'all': stats(df),
+        'by_type': {btype: stats(part) for btype, part in df.groupby('borehole_type', sort=True)},
+    }
+
+
+def summarize_loads(df: pd.DataFrame, column: str) -> Dict:
+    """Total, quantiles, tertile buckets and histogram of a load column (kg/yr)."""
+    values = df[column].values
+    quantiles = {f'{q:g}': float(np.quantile(values, q)) if len(values) else 0.0 for q in LOAD_QUANTILES}
+    q33, q67 = quantiles['0.33'], quantiles['0.67']
+    vmax = float(values.max()) if len(values) else 0.0
+    if q33 == q67:
+        # Values cluster tightly: everything counts as Moderate
+        buckets = {'Low': 0, 'Moderate': int(len(values)), 'High': 0}
+    else:
+        buckets = dict(zip(LOAD_LABELS, _cut_counts(values, [0, q33, q67, vmax + 1])))
+    return {
+        'column': column,
+        'count': int(len(values)),
+        'total': float(values.sum()),
+        'max': vmax,
+        'quantiles': quantiles,
+        'uniform': q33 == q67,
+        'buckets': buckets,
+        'histogram': _histogram(values, 0.0, vmax),
+    }
+
+
+def summarize_result(model_type: str, scenario_name: str, loads: pd.DataFrame,
+                     concentrations: Optional[pd.DataFrame] = None) -> Dict:
+    """Summary of one pipeline run's outputs."""
+    summary = {'model_type': model_type, 'scenario_name': scenario_name}
+    if model_type in ('nitrogen', 'phosphorus'):
+        summary['loads'] = summarize_loads(loads, f'{model_type}_load')
+    if concentrations is not None:
+        summary['concentrations'] = summarize_concentrations(concentrations)
+    return summary
+
+
+def write_summary(summary: Dict, path: Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(summary, indent=2))
+    os.replace(tmp, path)
+    return path
+
+
+def load_summary(path: Path) -> Optional[Dict]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
@@ -0,0 +1,350 @@
+"""Offline tile pyramid export for scenario results.
+
+Builds a Web Mercator ``{z}/{x}/{y}.bin`` pyramid that field tablets can
+serve as static files. Each tile is a compact little-endian binary:
+
+    b'ZTL1' | uint32 header length | JSON header | 4-byte aligned arrays
+
+The JSON header holds the tile's summary aggregates and, per layer, the
+feature count and ``[field, dtype, offset, nbytes]`` entries of its arrays
+(offsets relative to the start of the array block). Coordinates are
+quantized to ``extent`` units inside the tile, as in MVT. Layers:
+
+- ``boreholes``: x, y (uint16), risk_score, concentration (float32), type (uint8)
+- ``toilets``: per-bin aggregates on a ``TILE_GRID`` x ``TILE_GRID`` grid:
+  bin (uint16), count per category 1-4 (uint32), load sum (float32)
+- ``wards``: vertices of ward rings clipped to the tile (+buffer): x, y (int16)
+- ``ward_rings``: ring end offsets into ``wards`` (uint32) and the ward of
+  each ring (uint16, indexing ``wards_index.json``)
+
+Tiles are encoded in a process pool. A ``manifest.json`` records a hash of
+every tile's inputs so re-exports only rewrite tiles whose inputs changed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from . import summary as run_summary
+
+MAGIC = b'ZTL1'
+BOREHOLE_TYPES = {'private': 0, 'government': 1}
+# Same buckets as the dashboard summaries, keyed in snake case ('very_high')
+RISK_LABELS = [label.lower().replace(' ', '_') for label in run_summary.RISK_LABELS]
+
+TileKey = Tuple[int, int, int]
+
+
+def mercator_pixels(lat, lon, zoom: int, extent: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Global Web Mercator pixel coordinates at ``zoom`` (``extent`` units per tile)."""
+    lat = np.clip(np.asarray(lat, dtype=float), -85.05112878, 85.05112878)
+    lon = np.asarray(lon, dtype=float)
+    scale = extent * 2 ** zoom
+    x = (lon + 180.0) / 360.0 * scale
+    lat_rad = np.radians(lat)
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * scale
+    return x, y
+
+
+# --- Encoding ---
+
+def encode_tile(header: Dict, layers: Dict[str, Dict[str, np.ndarray]]) -> bytes:
+    """Serialize a header dict plus named layers of equal-length arrays."""
+    blocks = []
+    offset = 0
+    header = dict(header, layers={})
+    for name, fields in layers.items():
+        count = len(next(iter(fields.values()))) if fields else 0
+        entries = []
+        for field_name, arr in fields.items():
+            arr = np.ascontiguousarray(arr)
+            data = arr.astype(arr.dtype.newbyteorder('<'), copy=False).tobytes()
+            entries.append([field_name, arr.dtype.str.lstrip('<>|='), offset, len(data)])
+            pad = (-len(data)) % 4
+            blocks.append(data + b'\0' * pad)
+            offset += len(data) + pad
+        header['layers'][name] = {'count': count, 'fields': entries}
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * ((-len(header_bytes) - 8) % 4)
+    return MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes + b''.join(blocks)
+
+
+def decode_tile(data: bytes) -> Tuple[Dict, Dict[str, Dict[str, np.ndarray]]]:
+    """Inverse of ``encode_tile``."""
+    if data[:4] != MAGIC:
+        raise ValueError("Not a tile file")
+    (header_len,) = struct.unpack('<I', data[4:8])
+    header = json.loads(data[8:8 + header_len])
+    base = 8 + header_len
+    layers = {}
+    for name, layer in header['layers'].items():
+        layers[name] = {
+            field_name: np.frombuffer(data, dtype=np.dtype(dtype).newbyteorder('<'),
+                                      count=nbytes // np.dtype(dtype).itemsize, offset=base + offset)
+            for field_name, dtype, offset, nbytes in layer['fields']
+        }
+    return header, layers
+
+
+def read_tile(path: Path):
+    return decode_tile(Path(path).read_bytes())
+
+
+# --- Per-tile work (runs in worker processes) ---
+
+def _clip_ring(ring: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    """Sutherland-Hodgman clip of a closed ring to the square [lo, hi]^2."""
+    pts = ring
+    for axis, bound, keep_greater in ((0, lo, True), (0, hi, False), (1, lo, True), (1, hi, False)):
+        if len(pts) == 0:
+            break
+        nxt = np.roll(pts, -1, axis=0)
+        inside = pts[:, axis] >= bound if keep_greater else pts[:, axis] <= bound
+        crossing = inside != np.roll(inside, -1)
+        delta = nxt[:, axis] - pts[:, axis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(crossing, (bound - pts[:, axis]) / delta, 0.0)
+        inter = pts + t[:, None] * (nxt - pts)
+        pts = np.stack([pts, inter], axis=1).reshape(-1, 2)[np.stack([inside, crossing], axis=1).reshape(-1)]
+    return pts
+
+
+def _build_tile(task: Dict) -> Tuple[TileKey, bytes]:
+    z, x, y = task['key']
+    extent, grid, buffer = task['extent'], task['grid'], task['buffer']
+    origin = np.array([x * extent, y * extent], dtype=float)
+    summary = {}
+
+    bh = task['boreholes']
+    bx = np.clip(bh['px'] - origin[0], 0, extent - 1).astype(np.uint16)
+    by = np.clip(bh['py'] - origin[1], 0, extent - 1).astype(np.uint16)
+    risk = bh['risk_score'].astype(np.float32)
+    summary['boreholes'] = int(len(risk))
+    if len(risk):
+        summary['risk_max'] = float(risk.max())
+        summary['risk_mean'] = float(risk.mean())
+        summary['risk_buckets'] = dict(zip(RISK_LABELS, run_summary._cut_counts(bh['risk_score'], run_summary.RISK_BINS)))
+
+    tl = task['toilets']
+    cell = extent / grid
+    gx = np.clip(((tl['px'] - origin[0]) // cell).astype(np.int64), 0, grid - 1)
+    gy = np.clip(((tl['py'] - origin[1]) // cell).astype(np.int64), 0, grid - 1)
+    bins, inverse = np.unique(gy * grid + gx, return_inverse=True)
+    cat_counts = {
+        f'cat_{c}': np.bincount(inverse, weights=tl['count'] * (tl['category'] == c),
+                                minlength=len(bins)).astype(np.uint32)
+        for c in (1, 2, 3, 4)
+    }
+    load_sum = np.bincount(inverse, weights=tl['load'], minlength=len(bins)).astype(np.float32)
+    summary['toilets'] = int(tl['count'].sum())
+    summary['toilet_load'] = float(tl['load'].sum())
+    summary['toilet_categories'] = {k: int(v.sum()) for k, v in cat_counts.items()}
+
+    xs, ys, ring_offsets, ring_ward = [], [], [0], []
+    for ward_idx, ring in task['rings']:
+        clipped = _clip_ring(ring - origin, -buffer, extent + buffer)
+        if len(clipped) < 3:
+            continue
+        xs.append(clipped[:, 0])
+        ys.append(clipped[:, 1])
+        ring_offsets.append(ring_offsets[-1] + len(clipped))
+        ring_ward.append(ward_idx)
+    summary['wards'] = len(set(ring_ward))
+
+    layers = {
+        'boreholes': {
+            'x': bx, 'y': by,
+            'risk_score': risk,
+            'concentration': bh['concentration'].astype(np.float32),
+            'type': bh['type'].astype(np.uint8),
+        },
+        'toilets': {'bin': bins.astype(np.uint16), **cat_counts, 'load': load_sum},
+        'wards': {
+            'x': np.rint(np.concatenate(xs)).astype(np.int16) if xs else np.zeros(0, np.int16),
+            'y': np.rint(np.concatenate(ys)).astype(np.int16) if ys else np.zeros(0, np.int16),
+        },
+        'ward_rings': {
+            'ring_offsets': np.array(ring_offsets[1:], dtype=np.uint32),
+            'ring_ward': np.array(ring_ward, dtype=np.uint16),
+        },
+    }
+    header = {'z': z, 'x': x, 'y': y, 'extent': extent, 'grid': grid, 'summary': summary}
+    return task['key'], encode_tile(header, layers)
+
+
+# --- Partitioning ---
+
+def _partition(px: np.ndarray, py: np.ndarray, extent: int) -> Dict[Tuple[int, int], np.ndarray]:
+    """Row indices per (tile x, tile y), via one sort."""
+    tx = (px // extent).astype(np.int64)
+    ty = (py // extent).astype(np.int64)
+    keys = tx * (1 << 32) + ty
+    order = np.argsort(keys, kind='stable')
+    uniq, starts = np.unique(keys[order], return_index=True)
+    bounds = np.append(starts, len(order))
+    return {(int(k >> 32), int(k & 0xFFFFFFFF)): order[bounds[i]:bounds[i + 1]] for i, k in enumerate(uniq)}
+
+
+def _ward_rings(wards_geojson: Optional[Dict]) -> Tuple[List[Tuple[int, np.ndarray]], List[Dict]]:
+    rings, index = [], []
+    if not wards_geojson:
+        return rings, index
+    for ward_idx, feature in enumerate(wards_geojson.get('features', [])):
+        props = feature.get('properties') or {}
+        index.append({k: props.get(k) for k in ('ward_name', 'dist_name', 'reg_name', 'ward_code')})
+        geom = feature.get('geometry') or {}
+        polygons = geom.get('coordinates', [])
+        if geom.get('type') == 'Polygon':
+            polygons = [polygons]
+        for polygon in polygons:
+            for ring in polygon:
+                rings.append((ward_idx, np.asarray(ring, dtype=float)[:, :2]))
+    return rings, index
+
+
+def _input_hash(task: Dict) -> str:
+    h = hashlib.sha1()
+    h.update(repr((task['key'], task['extent'], task['grid'], task['buffer'])).encode())
+    for group in ('boreholes', 'toilets'):
+        for name in sorted(task[group]):
+            h.update(np.ascontiguousarray(task[group][name]).tobytes())
+    for ward_idx, ring in task['rings']:
+        h.update(struct.pack('<I', ward_idx))
+        h.update(np.ascontiguousarray(ring).tobytes())
+    return h.hexdigest()
+
+
+def _merge_split_rows(toilets: pd.DataFrame) -> pd.DataFrame:
+    """One row per toilet source: split rows summed, first (original) row's category.
+
+    ``n_sources`` (coarsened super-sources) becomes the row's toilet count.
+    """
+    if 'n_sources' in toilets.columns:
+        toilets = toilets.assign(count=toilets['n_sources'])
+    else:
+        toilets = toilets.assign(count=1)
+    if 'source_index' not in toilets.columns:
+        return toilets[['lat', 'long', 'toilet_category_id', 'load', 'count']]
+    return toilets.groupby('source_index', sort=True).agg(
+        lat=('lat', 'first'), long=('long', 'first'), toilet_category_id=('toilet_category_id', 'first'),
+        load=('load', 'sum'), count=('count', 'first')
+    )
+
+
+def export_tiles(boreholes: pd.DataFrame, toilets: pd.DataFrame, wards_geojson: Optional[Dict],
+                 out_dir: Path,
+                 min_zoom: int = config.TILE_MIN_ZOOM,
+                 max_zoom: int = config.TILE_MAX_ZOOM,
+                 workers: Optional[int] = config.TILE_EXPORT_WORKERS) -> Dict[str, int]:
+    """Write (or incrementally update) a tile pyramid under ``out_dir``.
+
+    ``boreholes`` needs lat, long, risk_score, concentration_CFU_per_100mL and
+    borehole_type; ``toilets`` needs lat, long, toilet_category_id and load
+    (intervention rows split from one toilet share its ``source_index`` and
+    are counted once). Returns counts of tiles written, unchanged and removed.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / 'manifest.json'
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    old_tiles = manifest.get('tiles', {})
+    extent, grid, buffer = config.TILE_EXTENT, config.TILE_GRID, config.TILE_BUFFER
+
+    bh_lat, bh_lon = boreholes['lat'].values, boreholes['long'].values
+    bh_risk = boreholes['risk_score'].values
+    bh_conc = boreholes['concentration_CFU_per_100mL'].values
+    bh_type = boreholes['borehole_type'].map(BOREHOLE_TYPES).fillna(255).values
+    toilets = _merge_split_rows(toilets)
+    tl_lat, tl_lon = toilets['lat'].values, toilets['long'].values
+    tl_cat = toilets['toilet_category_id'].values
+    tl_load = toilets['load'].values
+    tl_count = toilets['count'].values
+    rings, ward_index = _ward_rings(wards_geojson)
+
+    tasks = []
+    for z in range(min_zoom, max_zoom + 1):
+        bpx, bpy = mercator_pixels(bh_lat, bh_lon, z, extent)
+        tpx, tpy = mercator_pixels(tl_lat, tl_lon, z, extent)
+        bh_tiles = _partition(bpx, bpy, extent)
+        tl_tiles = _partition(tpx, tpy, extent)
+
+        ring_tiles: Dict[Tuple[int, int], List[Tuple[int, np.ndarray]]] = {}
+        for ward_idx, ring in rings:
+            rx, ry = mercator_pixels(ring[:, 1], ring[:, 0], z, extent)
+            ring_px = np.column_stack([rx, ry])
+            x0, y0 = ((ring_px.min(axis=0) - buffer) // extent).astype(int)
+            x1, y1 = ((ring_px.max(axis=0) + buffer) // extent).astype(int)
+            for tx in range(x0, x1 + 1):
+                for ty in range(y0, y1 + 1):
+                    ring_tiles.setdefault((tx, ty), []).append((ward_idx, ring_px))
+
+        empty = np.zeros(0, dtype=np.int64)
+        for txy in sorted(set(bh_tiles) | set(tl_tiles) | set(ring_tiles)):
+            b_idx = bh_tiles.get(txy, empty)
+            t_idx = tl_tiles.get(txy, empty)
+            tasks.append({
+                'key': (z, txy[0], txy[1]),
+                'extent': extent, 'grid': grid, 'buffer': buffer,
+                'boreholes': {
+                    'px': bpx[b_idx], 'py': bpy[b_idx], 'risk_score': bh_risk[b_idx],
+                    'concentration': bh_conc[b_idx], 'type': bh_type[b_idx],
+                },
+                'toilets': {'px': tpx[t_idx], 'py': tpy[t_idx], 'category': tl_cat[t_idx], 'load': tl_load[t_idx],
+                            'count': tl_count[t_idx]},
+                'rings': ring_tiles.get(txy, []),
+            })
+
+    new_tiles = {}
+    changed = []
+    for task in tasks:
+        name = '{}/{}/{}.bin'.format(*task['key'])
+        new_tiles[name] = _input_hash(task)
+        if old_tiles.get(name) != new_tiles[name] or not (out_dir / name).exists():
+            changed.append(task)
+
+    logging.info(f"Tile export: {len(tasks)} tiles (z{min_zoom}-{max_zoom}), {len(changed)} to (re)write")
+    parallel = workers != 1 and len(changed) > 1
+    executor = ProcessPoolExecutor(max_workers=workers) if parallel else None
+    try:
+        if parallel:
+            chunksize = max(1, len(changed) // (4 * (workers or os.cpu_count() or 1)))
+            encoded = executor.map(_build_tile, changed, chunksize=chunksize)
+        else:
+            encoded = map(_build_tile, changed)
+        for (z, x, y), data in encoded:
+            path = out_dir / str(z) / str(x) / f'{y}.bin'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f'.{path.name}.tmp')
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    removed = 0
+    for name in set(old_tiles) - set(new_tiles):
+        (out_dir / name).unlink(missing_ok=True)
+        removed += 1
+
+    (out_dir / 'wards_index.json').write_text(json.dumps(ward_index))
+    manifest = {
+        'format': MAGIC.decode(), 'extent': extent, 'grid': grid,
+        'min_zoom': min_zoom, 'max_zoom': max_zoom,
+        'borehole_types': BOREHOLE_TYPES, 'tiles': new_tiles,
+    }
+    tmp_manifest = manifest_path.with_name('.manifest.json.tmp')
+    tmp_manifest.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(tmp_manifest, manifest_path)
+
+    stats = {'written': len(changed), 'unchanged': len(tasks) - len(changed), 'removed': removed}
+    logging.info(f"Tile export complete: {stats}")
+    return stats
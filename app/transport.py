@@ -0,0 +1,666 @@
+"""Layer 2 transport primitives: neighbour adjacency + decay accumulation.
+
+The borehole -> source neighbour lists returned by a radius query are kept in
+CSR layout (``indptr`` / ``indices`` / ``distances_m``) so they can be cached
+and re-used across runs whose sources share the same locations (e.g. all
+dashboard scenarios derived from the same standardized sanitation table).
+"""
+
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.neighbors import KDTree
+
+from . import config
+from . import kernels
+from . import spatial_index
+
+
+@dataclass
+class Adjacency:
+    """Borehole -> source neighbour lists within ``radius_m`` (CSR layout)."""
+    indptr: np.ndarray       # (n_boreholes + 1,) offsets into indices/distances_m
+    indices: np.ndarray      # source row of each borehole/source pair
+    distances_m: np.ndarray  # great-circle distance of each pair (metres)
+    n_sources: int
+    radius_m: float
+
+    @property
+    def n_boreholes(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def n_pairs(self) -> int:
+        return len(self.indices)
+
+    def row_ids(self) -> np.ndarray:
+        """Borehole row of each pair (expanded form of ``indptr``)."""
+        return np.repeat(np.arange(self.n_boreholes), np.diff(self.indptr))
+
+
+def build_adjacency(source_latlon: np.ndarray, borehole_latlon: np.ndarray, radius_m: float,
+                    backend: Optional[str] = None, persist: bool = False) -> Adjacency:
+    """Query all sources within ``radius_m`` of each borehole (see ``spatial_index``).
+
+    ``persist`` re-uses (or saves) a memory-mapped index of the sources; use it
+    for stable source sets such as the standardized sanitation table.
+    """
+    source_latlon = np.asarray(source_latlon, dtype=float).reshape(-1, 2)
+    borehole_latlon = np.asarray(borehole_latlon, dtype=float).reshape(-1, 2)
+    if len(source_latlon) == 0 or len(borehole_latlon) == 0:
+        return Adjacency(
+            indptr=np.zeros(len(borehole_latlon) + 1, dtype=np.int64),
+            indices=np.zeros(0, dtype=np.int64),
+            distances_m=np.zeros(0),
+            n_sources=len(source_latlon),
+            radius_m=radius_m
+        )
+
+    if persist:
+        index = spatial_index.load_or_build_index(source_latlon, backend)
+    else:
+        index = spatial_index.build_index(source_latlon, backend)
+    indices, distances = index.query_radius(borehole_latlon, radius_m, return_distance=True)
+    indptr, flat_idx, flat_dist = spatial_index.flatten(indices, distances)
+    return Adjacency(indptr=indptr, indices=flat_idx, distances_m=flat_dist,
+                     n_sources=len(source_latlon), radius_m=radius_m)
+
+
+def accumulate(adjacency: Adjacency, source_loads: np.ndarray, decay_rate: float,
+               backend: Optional[str] = None) -> np.ndarray:
+    """Sum of ``load * exp(-decay_rate * distance)`` over each borehole's neighbours.
+
+    ``backend`` selects the kernel (see ``kernels``; default from config).
+    """
+    return kernels.decay_sum(adjacency.indptr, adjacency.indices, adjacency.distances_m, source_loads,
+                             decay_rate, backend=backend)
+
+
+# --- Tiled (out-of-core) evaluation ---
+#
+# The in-memory path materialises every borehole/source pair at once, which
+# grows with density * radius^2. The tiled path splits the borehole extent
+# into quadtree tiles, each processed against only the sources inside the
+# tile grown by a halo of ``radius_m`` (so no pair is lost), and splits a tile
+# further while its estimated pair memory exceeds the budget.
+
+PAIR_BYTES = 24    # pair index + distance + per-pair temporaries
+SOURCE_BYTES = 48  # lat/long copy + tree node overhead per source in a tile
+
+
+def _halo_deg(radius_m: float, lat_max: float):
+    """Latitude / longitude margins (degrees) covering ``radius_m`` up to ``|lat| = lat_max``.
+
+    Padded by 1% so the margin also covers ellipsoidal (``utm`` backend) distances.
+    """
+    dlat = np.degrees(1.01 * radius_m / config.EARTH_RADIUS_M)
+    dlon = dlat / max(np.cos(np.radians(min(abs(lat_max) + dlat, 89.0))), 1e-6)
+    return dlat * (1 + 1e-9) + 1e-12, dlon * (1 + 1e-9) + 1e-12
+
+
+def estimate_pairs(source_latlon: np.ndarray, borehole_latlon: np.ndarray, radius_m: float) -> np.ndarray:
+    """Approximate neighbour count per borehole from a radius-sized grid of source counts.
+
+    Sources in the 3x3 cells around a borehole are scaled by the share of
+    that block covered by the query circle (pi / 9), which tracks clustered
+    data far better than a uniform-density guess.
+    """
+    if len(source_latlon) == 0 or len(borehole_latlon) == 0:
+        return np.zeros(len(borehole_latlon))
+    lat_max = max(np.abs(source_latlon[:, 0]).max(), np.abs(borehole_latlon[:, 0]).max())
+    dlat, dlon = _halo_deg(radius_m, lat_max)
+
+    def cell_keys(latlon, dx=0, dy=0):
+        iy = np.floor(latlon[:, 0] / dlat).astype(np.int64) + dy
+        ix = np.floor(latlon[:, 1] / dlon).astype(np.int64) + dx
+        return ix * (2 ** 32) + iy
+
+    keys, counts = np.unique(cell_keys(source_latlon), return_counts=True)
+    estimate = np.zeros(len(borehole_latlon))
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            query = cell_keys(borehole_latlon, dx, dy)
+            pos = np.clip(np.searchsorted(keys, query), 0, len(keys) - 1)
+            estimate += np.where(keys[pos] == query, counts[pos], 0)
+    return estimate * np.pi / 9
+
+
+def plan_tiles(source_latlon: np.ndarray, borehole_latlon: np.ndarray, radius_m: float,
+               memory_budget_bytes: float):
+    """Yield ``(borehole_rows, source_rows)`` per tile, each within the memory budget if possible."""
+    source_latlon = np.asarray(source_latlon, dtype=float).reshape(-1, 2)
+    borehole_latlon = np.asarray(borehole_latlon, dtype=float).reshape(-1, 2)
+    pairs = estimate_pairs(source_latlon, borehole_latlon, radius_m)
+
+    stack = [(np.arange(len(borehole_latlon)), np.arange(len(source_latlon)))]
+    while stack:
+        bh_rows, candidates = stack.pop()
+        if len(bh_rows) == 0:
+            continue
+        bh = borehole_latlon[bh_rows]
+        lat_lo, lon_lo = bh.min(axis=0)
+        lat_hi, lon_hi = bh.max(axis=0)
+        dlat, dlon = _halo_deg(radius_m, max(abs(lat_lo), abs(lat_hi)))
+        src = source_latlon[candidates]
+        inside = ((src[:, 0] >= lat_lo - dlat) & (src[:, 0] <= lat_hi + dlat) &
+                  (src[:, 1] >= lon_lo - dlon) & (src[:, 1] <= lon_hi + dlon))
+        src_rows = candidates[inside]
+
+        est_bytes = pairs[bh_rows].sum() * PAIR_BYTES + len(src_rows) * SOURCE_BYTES
+        splittable = len(bh_rows) > 1 and max(lat_hi - lat_lo, lon_hi - lon_lo) > dlat
+        if est_bytes <= memory_budget_bytes or not splittable:
+            yield bh_rows, src_rows
+            continue
+
+        lat_mid, lon_mid = (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
+        north, east = bh[:, 0] > lat_mid, bh[:, 1] > lon_mid
+        for quadrant in (~north & ~east, ~north & east, north & ~east, north & east):
+            stack.append((bh_rows[quadrant], src_rows))
+
+
+def accumulate_tiled(source_latlon: np.ndarray, source_loads: np.ndarray, borehole_latlon: np.ndarray,
+                     radius_m: float, decay_rate: float,
+                     memory_budget_mb: float = config.TRANSPORT_MEMORY_BUDGET_MB) -> np.ndarray:
+    """``accumulate(build_adjacency(...))`` evaluated tile by tile under a memory budget.
+
+    Every borehole belongs to exactly one tile and sees every source within
+    ``radius_m`` (halo), so the sums match the in-memory path up to
+    floating-point summation order.
+    """
+    source_latlon = np.asarray(source_latlon, dtype=float).reshape(-1, 2)
+    borehole_latlon = np.asarray(borehole_latlon, dtype=float).reshape(-1, 2)
+    source_loads = np.asarray(source_loads, dtype=float)
+    totals = np.zeros(len(borehole_latlon))
+    n_tiles = n_pairs = peak_pairs = 0
+    for bh_rows, src_rows in plan_tiles(source_latlon, borehole_latlon, radius_m, memory_budget_mb * 2 ** 20):
+        adjacency = build_adjacency(source_latlon[src_rows], borehole_latlon[bh_rows], radius_m)
+        totals[bh_rows] = accumulate(adjacency, source_loads[src_rows], decay_rate)
+        n_tiles += 1
+        n_pairs += adjacency.n_pairs
+        peak_pairs = max(peak_pairs, adjacency.n_pairs)
+    logging.info(f"Tiled transport: {n_tiles} tiles, {n_pairs:,} pairs "
+                 f"(peak {peak_pairs:,} pairs ~{peak_pairs * PAIR_BYTES / 2 ** 20:.1f} MB per tile)")
+    return totals
+
+
+# --- Process-pool evaluation over spatial shards ---
+#
+# Boreholes are cut into longitude strips holding roughly equal estimated
+# pair counts. Source coordinates and loads are written once to a temporary
+# ``.npy`` that workers memory-map read-only (shared through the page cache),
+# and each worker only touches the sources inside its strip's halo. Every
+# borehole belongs to exactly one shard and the shard layout does not depend
+# on the worker count, so results are identical for any number of workers.
+
+def spatial_shards(source_latlon: np.ndarray, borehole_latlon: np.ndarray, radius_m: float,
+                   n_shards: int) -> List[np.ndarray]:
+    """Borehole rows per longitude strip, balanced by estimated pair count."""
+    order = np.lexsort((borehole_latlon[:, 0], borehole_latlon[:, 1]))
+    weight = estimate_pairs(source_latlon, borehole_latlon, radius_m)[order] + 1.0
+    cum = np.cumsum(weight)
+    cuts = np.searchsorted(cum, cum[-1] * np.arange(1, n_shards) / n_shards) if len(cum) else []
+    return [rows for rows in np.split(order, np.unique(cuts)) if len(rows)]
+
+
+def _accumulate_shard(sources: np.ndarray, borehole_latlon: np.ndarray, radius_m: float,
+                      decay_rate: float, k: Optional[int] = None):
+    """Decayed load sums for one shard; ``sources`` holds lat, long and load column(s).
+
+    With ``k`` the shard's ``Attribution`` is returned instead, with source
+    rows indexing ``sources``.
+    """
+    lat_lo, lon_lo = borehole_latlon.min(axis=0)
+    lat_hi, lon_hi = borehole_latlon.max(axis=0)
+    dlat, dlon = _halo_deg(radius_m, max(abs(lat_lo), abs(lat_hi)))
+    inside = ((sources[:, 0] >= lat_lo - dlat) & (sources[:, 0] <= lat_hi + dlat) &
+              (sources[:, 1] >= lon_lo - dlon) & (sources[:, 1] <= lon_hi + dlon))
+    local = sources[inside]
+    adjacency = build_adjacency(local[:, :2], borehole_latlon, radius_m)
+    if k is None:
+        return accumulate(adjacency, local[:, 2], decay_rate)
+    return attribute(adjacency, local[:, 2:], decay_rate, k).remap_sources(np.flatnonzero(inside))
+
+
+def _shard_worker(sources_path: str, borehole_latlon: np.ndarray, radius_m: float,
+                  decay_rate: float, k: Optional[int] = None) -> Tuple[object, float]:
+    start = time.process_time()
+    sources = np.load(sources_path, mmap_mode='r')
+    result = _accumulate_shard(sources, borehole_latlon, radius_m, decay_rate, k)
+    return result, time.process_time() - start
+
+
+def _run_shards(sources: np.ndarray, borehole_latlon: np.ndarray, radius_m: float, decay_rate: float,
+                workers: Optional[int], n_shards: int, k: Optional[int] = None) -> List[Tuple[np.ndarray, object]]:
+    """``(borehole_rows, shard result)`` for every spatial shard, computed in a process pool."""
+    workers = workers or os.cpu_count() or 1
+    if len(sources) == 0 or len(borehole_latlon) == 0:
+        return []
+
+    shards = spatial_shards(sources[:, :2], borehole_latlon, radius_m, n_shards)
+    start = time.perf_counter()
+    busy = 0.0
+    out = []
+    with tempfile.TemporaryDirectory(prefix='transport-') as tmp:
+        sources_path = os.path.join(tmp, 'sources.npy')
+        np.save(sources_path, sources)
+        if workers == 1:
+            results = (_shard_worker(sources_path, borehole_latlon[rows], radius_m, decay_rate, k) for rows in shards)
+            for rows, (result, seconds) in zip(shards, results):
+                out.append((rows, result))
+                busy += seconds
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+                futures = [executor.submit(_shard_worker, sources_path, borehole_latlon[rows], radius_m, decay_rate, k)
+                           for rows in shards]
+                # Reduce in shard order; each borehole is written by exactly one shard
+                for rows, future in zip(shards, futures):
+                    result, seconds = future.result()
+                    out.append((rows, result))
+                    busy += seconds
+
+    # Speedup: CPU seconds spent in shards over wall time of the whole run
+    wall = time.perf_counter() - start
+    speedup = busy / wall if wall > 0 else 1.0
+    logging.info(f"Parallel transport: {len(shards)} shards on {workers} workers in {wall:.2f}s "
+                 f"(speedup {speedup:.1f}x, efficiency {speedup / workers:.0%})")
+    return out
+
+
+def accumulate_parallel(source_latlon: np.ndarray, source_loads: np.ndarray, borehole_latlon: np.ndarray,
+                        radius_m: float, decay_rate: float, workers: Optional[int] = config.TRANSPORT_WORKERS,
+                        n_shards: int = config.TRANSPORT_SHARDS) -> np.ndarray:
+    """``accumulate(build_adjacency(...))`` evaluated over spatial shards in a process pool."""
+    source_latlon = np.asarray(source_latlon, dtype=float).reshape(-1, 2)
+    borehole_latlon = np.asarray(borehole_latlon, dtype=float).reshape(-1, 2)
+    totals = np.zeros(len(borehole_latlon))
+    sources = np.column_stack([source_latlon, np.asarray(source_loads, dtype=float).reshape(-1)])
+    for rows, sums in _run_shards(sources, borehole_latlon, radius_m, decay_rate, workers, n_shards):
+        totals[rows] = sums
+    return totals
+
+
+# --- Source attribution ---
+#
+# Attribution is the transport pass itself, run with per-category loads:
+# alongside each borehole's decayed load per toilet category it keeps the k
+# largest single-source contributions in a fixed (n_boreholes, k) buffer
+# (``kernels.decay_attribution``), so the category sums add up to the
+# transport sum and no second query or full sort of the pairs is needed.
+# The tiled, parallel and far-field variants mirror their ``accumulate_*``
+# counterparts tile by tile / shard by shard / cell by cell.
+
+@dataclass
+class Attribution:
+    """Top-k contributing sources and decayed load per category of each borehole."""
+    top_sources: np.ndarray     # (n_boreholes, k) source rows by decreasing contribution, -1 if none
+    top_loads: np.ndarray       # (n_boreholes, k) decayed load from each of those sources
+    category_loads: np.ndarray  # (n_boreholes, n_categories) decayed load per category column
+
+    @classmethod
+    def empty(cls, n_boreholes: int, k: int, n_categories: int) -> 'Attribution':
+        return cls(top_sources=np.full((n_boreholes, k), -1, dtype=np.int64), top_loads=np.zeros((n_boreholes, k)),
+                   category_loads=np.zeros((n_boreholes, n_categories)))
+
+    def remap_sources(self, rows: np.ndarray) -> 'Attribution':
+        """Map ``top_sources`` from positions in ``rows`` to the values of ``rows`` (in place)."""
+        found = self.top_sources >= 0
+        self.top_sources[found] = np.asarray(rows)[self.top_sources[found]]
+        return self
+
+    def category_shares(self) -> np.ndarray:
+        total = self.category_loads.sum(axis=1, keepdims=True)
+        return np.divide(self.category_loads, total, out=np.zeros_like(self.category_loads), where=total > 0)
+
+
+def _load_columns(loads: np.ndarray) -> np.ndarray:
+    """(n_sources, n_categories) float loads; a 1-D vector is one category."""
+    loads = np.asarray(loads, dtype=float)
+    return loads[:, None] if loads.ndim == 1 else loads
+
+
+def decay_matrix(adjacency: Adjacency, decay_rate: float) -> sparse.csr_matrix:
+    """Borehole x source matrix of ``exp(-decay_rate * distance)``; ``decay_matrix @ loads`` is ``accumulate``."""
+    return sparse.csr_matrix((np.exp(-decay_rate * adjacency.distances_m), adjacency.indices, adjacency.indptr),
+                             shape=(adjacency.n_boreholes, adjacency.n_sources))
+
+
+def attribute(adjacency: Adjacency, category_loads: np.ndarray, decay_rate: float, k: int,
+              backend: Optional[str] = None) -> Attribution:
+    """Attribution over an adjacency; ``category_loads`` is (n_sources, n_categories)."""
+    category_loads = _load_columns(category_loads)
+    sums, top_sources, top_loads = kernels.decay_attribution(
+        adjacency.indptr, adjacency.indices, adjacency.distances_m, category_loads, decay_rate, k, backend=backend
+    )
+    return Attribution(top_sources=top_sources, top_loads=top_loads, category_loads=sums)
+
+
+def attribute_tiled(source_latlon: np.ndarray, category_loads: np.ndarray, borehole_latlon: np.ndarray,
+                    radius_m: float, decay_rate: float, k: int,
+                    memory_budget_mb: float = config.TRANSPORT_MEMORY_BUDGET_MB) -> Attribution:
+    """``attribute(build_adjacency(...))`` evaluated tile by tile under a memory budget."""
+    source_latlon = np.asarray(source_latlon, dtype=float).reshape(-1, 2)
+    borehole_latlon = np.asarray(borehole_latlon, dtype=float).reshape(-1, 2)
+    category_loads = _load_columns(category_loads)
+    out = Attribution.empty(len(borehole_latlon), k, category_loads.shape[1])
+    n_tiles = n_pairs = 0
+    for bh_rows, src_rows in plan_tiles(source_latlon, borehole_latlon, radius_m, memory_budget_mb * 2 ** 20):
+        adjacency = build_adjacency(source_latlon[src_rows], borehole_latlon[bh_rows], radius_m)
+        tile = attribute(adjacency, category_loads[src_rows], decay_rate, k).remap_sources(src_rows)
+        out.top_sources[bh_rows] = tile.top_sources
+        out.top_loads[bh_rows] = tile.top_loads
+        out.category_loads[bh_rows] = tile.category_loads
+        n_tiles += 1
+        n_pairs += adjacency.n_pairs
+    logging.info(f"Tiled attribution: {n_tiles} tiles, {n_pairs:,} pairs")
+    return out
+
+
+def attribute_parallel(source_latlon: np.ndarray, category_loads: np.ndarray, borehole_latlon: np.ndarray,
+                       radius_m: float, decay_rate: float, k: int, workers: Optional[int] = config.TRANSPORT_WORKERS,
+                       n_shards: int = config.TRANSPORT_SHARDS) -> Attribution:
+    """``attribute(build_adjacency(...))`` evaluated over spatial shards in a process pool."""
+    source_latlon = np.asarray(source_latlon, dtype=float).reshape(-1, 2)
+    borehole_latlon = np.asarray(borehole_latlon, dtype=float).reshape(-1, 2)
+    category_loads = _load_columns(category_loads)
+    out = Attribution.empty(len(borehole_latlon), k, category_loads.shape[1])
+    sources = np.column_stack([source_latlon, category_loads])
+    for rows, shard in _run_shards(sources, borehole_latlon, radius_m, decay_rate, workers, n_shards, k):
+        out.top_sources[rows] = shard.top_sources
+        out.top_loads[rows] = shard.top_loads
+        out.category_loads[rows] = shard.category_loads
+    return out
+
+
+# --- Kernel truncation ---
+#
+# For sources spread evenly around a borehole, the share of the decay
+# kernel's mass beyond radius R is
+#   int_R^inf e^(-k r) 2 pi r dr / int_0^inf e^(-k r) 2 pi r dr = e^(-kR) (1 + kR),
+# so a relative error tolerance fixes kR, and the radius follows from k.
+
+def truncated_mass_fraction(decay_rate: float, radius_m: float) -> float:
+    """Share of the exp(-k r) kernel mass (uniform sources) lying beyond ``radius_m``."""
+    x = decay_rate * radius_m
+    return float(np.exp(-x) * (1.0 + x))
+
+
+def kernel_radius(decay_rate: float, tolerance: float,
+                  min_radius_m: float = config.KERNEL_RADIUS_MIN_M,
+                  max_radius_m: float = config.KERNEL_RADIUS_MAX_M) -> float:
+    """Smallest radius whose truncated kernel mass is at most ``tolerance`` (clipped to the bounds)."""
+    if not 0.0 < tolerance < 1.0:
+        raise ValueError(f"Kernel tolerance must be in (0, 1), got {tolerance}")
+    if decay_rate <= 0.0:
+        return max_radius_m
+    # Solve log(1 + x) - x = log(tolerance) for x = kR by bisection (monotone in x)
+    target = np.log(tolerance)
+    lo, hi = 0.0, 1.0
+    while np.log1p(hi) - hi > target:
+        hi *= 2.0
+    for _ in range(100):
+        mid = 0.5 * (lo + hi)
+        if np.log1p(mid) - mid > target:
+            lo = mid
+        else:
+            hi = mid
+    return float(np.clip(hi / decay_rate, min_radius_m, max_radius_m))
+
+
+# --- Far-field (Barnes-Hut style) approximation ---
+#
+# Sources are grouped into a pyramid of grid cells in metric coordinates
+# (leaves of ``config.FAR_FIELD_LEAF_M``, doubling per level up to the
+# radius). Each borehole walks the pyramid top-down: a cell lying wholly
+# inside the radius is replaced by its total load at the load-weighted
+# centroid when that is accurate enough, otherwise it is opened, and opened
+# leaves are summed exactly. Expanding exp(-k d_i) around the centroid at
+# distance d, the first-order term cancels and the relative error of a cell
+# is about (k^2 + k / d) * m2 / 2, with m2 the load-weighted mean squared
+# offset from the centroid - so cells close to the well are always opened.
+
+def _metric_coords(latlon: np.ndarray, backend: Optional[str] = None) -> np.ndarray:
+    """Points in metres: on the sphere (x, y, z) for ``haversine``, UTM (x, y) for ``utm``."""
+    backend = backend or config.SPATIAL_INDEX_BACKEND
+    if backend == 'utm':
+        return spatial_index.project_utm(latlon)
+    if backend != 'haversine':
+        raise ValueError(f"Unknown spatial index backend: {backend} (expected one of {spatial_index.BACKENDS})")
+    lat, lon = np.radians(latlon[:, 0]), np.radians(latlon[:, 1])
+    return config.EARTH_RADIUS_M * np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _exact_distance(chord_m: np.ndarray, backend: Optional[str] = None) -> np.ndarray:
+    """Backend distance from a metric-coordinate distance (great-circle arc from the sphere chord)."""
+    if (backend or config.SPATIAL_INDEX_BACKEND) == 'utm':
+        return chord_m
+    return 2 * config.EARTH_RADIUS_M * np.arcsin(np.minimum(chord_m / (2 * config.EARTH_RADIUS_M), 1.0))
+
+
+def _expand(indptr: np.ndarray, items: np.ndarray, rows: np.ndarray, nodes: np.ndarray):
+    """``(row, item)`` for every item of every node, from a CSR ``indptr`` / ``items`` layout."""
+    counts = indptr[nodes + 1] - indptr[nodes]
+    total = int(counts.sum())
+    offsets = np.repeat(indptr[nodes] - (np.cumsum(counts) - counts), counts)
+    return np.repeat(rows, counts), items[offsets + np.arange(total)]
+
+
+class FarFieldTree:
+    """Grid pyramid over fixed source positions; loads are supplied per evaluation."""
+
+    def __init__(self, source_latlon: np.ndarray, top_m: float, leaf_m: float = config.FAR_FIELD_LEAF_M,
+                 backend: Optional[str] = None):
+        self.backend = backend or config.SPATIAL_INDEX_BACKEND
+        coords = _metric_coords(np.asarray(source_latlon, dtype=float).reshape(-1, 2), self.backend)
+        self.origin = coords.mean(axis=0) if len(coords) else np.zeros(coords.shape[1])
+        self.coords = coords - self.origin
+        self.n_sources = len(coords)
+
+        # cells[l]: cell of each source at level l; children[l]: CSR of level l-1 cells per level l cell
+        keys = np.floor(self.coords / leaf_m).astype(np.int64)
+        cell = self._cell_ids(keys)
+        self.cells = [cell]
+        self.n_cells = [int(cell.max()) + 1 if self.n_sources else 0]
+        self.children = [None]
+        size = leaf_m
+        while size < top_m and self.n_cells[-1] > 1:
+            keys = np.floor_divide(keys, 2)
+            size *= 2
+            parent = self._cell_ids(keys)
+            n_parents = int(parent.max()) + 1
+            parent_of_cell = np.empty(self.n_cells[-1], dtype=np.int64)
+            parent_of_cell[self.cells[-1]] = parent
+            self.children.append(self._csr(parent_of_cell, n_parents))
+            self.cells.append(parent)
+            self.n_cells.append(n_parents)
+        self.leaf_sources = self._csr(self.cells[0], self.n_cells[0])
+
+    @staticmethod
+    def _cell_ids(keys: np.ndarray) -> np.ndarray:
+        """Dense ids of the distinct integer grid keys (one row per source)."""
+        if len(keys) == 0:
+            return np.zeros(0, dtype=np.int64)
+        shifted = keys - keys.min(axis=0)
+        flat = np.ravel_multi_index(shifted.T, tuple(shifted.max(axis=0) + 1))
+        return np.unique(flat, return_inverse=True)[1].reshape(-1)
+
+    @staticmethod
+    def _csr(owner: np.ndarray, n_owners: int):
+        order = np.argsort(owner, kind='stable')
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(owner, minlength=n_owners))])
+        return indptr, order
+
+    def moments(self, loads: np.ndarray):
+        """Per level: total load, centroid, mean squared offset and extent (max offset) of each cell."""
+        w = np.asarray(loads, dtype=float)
+        sq = (self.coords ** 2).sum(axis=1)
+        out = []
+        for cell, n in zip(self.cells, self.n_cells):
+            total = np.bincount(cell, weights=w, minlength=n)
+            count = np.bincount(cell, minlength=n)
+            weighted = total > 0
+            centroid = np.empty((n, self.coords.shape[1]))
+            for dim in range(self.coords.shape[1]):
+                x = self.coords[:, dim]
+                wx = np.bincount(cell, weights=w * x, minlength=n)
+                mean = np.bincount(cell, weights=x, minlength=n) / count
+                centroid[:, dim] = np.where(weighted, wx / np.where(weighted, total, 1.0), mean)
+            m2 = np.where(weighted, np.bincount(cell, weights=w * sq, minlength=n) / np.where(weighted, total, 1.0)
+                          - (centroid ** 2).sum(axis=1), 0.0)
+            extent = np.zeros(n)
+            np.maximum.at(extent, cell, np.sqrt(((self.coords - centroid[cell]) ** 2).sum(axis=1)))
+            out.append((total, centroid, np.maximum(m2, 0.0), extent))
+        return out
+
+
+def _top_pairs(rows: np.ndarray, sources: np.ndarray, distances: np.ndarray, loads: np.ndarray, decay_rate: float,
+               k: int, n_boreholes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k ``(source, contribution)`` per borehole over unordered ``(row, source, distance)`` pairs."""
+    indptr, order = FarFieldTree._csr(rows, n_boreholes)
+    _, top_sources, top_loads = kernels.decay_attribution(indptr, sources[order], distances[order], loads[:, None],
+                                                          decay_rate, k)
+    return top_sources, top_loads
+
+
+def _far_field(source_latlon: np.ndarray, category_loads: np.ndarray, borehole_latlon: np.ndarray,
+               radius_m: float, decay_rate: float, tolerance: float, tree: Optional[FarFieldTree],
+               k: Optional[int] = None):
+    """Far-field sums per ``category_loads`` column, their estimated errors and (with ``k``) the top-k sources.
+
+    Only the sum over all columns drives cell acceptance, so the column sums
+    add up to the single-column result. For the top-k, each borehole's k-th
+    best contribution is bounded from below by its exact pairs and by every
+    accepted cell's largest source placed at the cell's farthest extent; a
+    cell is opened afterwards only if that source at its nearest extent could
+    beat the bound, so the top-k are exact.
+    """
+    n_boreholes, n_categories = len(borehole_latlon), category_loads.shape[1]
+    sums, errors = np.zeros((n_boreholes, n_categories)), np.zeros(n_boreholes)
+    top = None if k is None else Attribution.empty(n_boreholes, k, n_categories)
+    if len(source_latlon) == 0 or n_boreholes == 0:
+        return sums, errors, top
+
+    loads = category_loads.sum(axis=1)
+    tree = tree or FarFieldTree(source_latlon, top_m=radius_m)
+    levels = tree.moments(loads)
+    category_totals = [np.column_stack([np.bincount(cell, weights=category_loads[:, c], minlength=n)
+                                        for c in range(n_categories)])
+                       for cell, n in zip(tree.cells, tree.n_cells)]
+    largest = []
+    if k is not None:
+        for cell, n in zip(tree.cells, tree.n_cells):
+            largest.append(np.zeros(n))
+            np.maximum.at(largest[-1], cell, loads)
+    bh = _metric_coords(borehole_latlon, tree.backend) - tree.origin
+    decay = decay_rate
+
+    # Seed with top-level cells that may reach within the radius
+    top_total, top_centroid, _, top_extent = levels[-1]
+    seeds = KDTree(top_centroid).query_radius(bh, r=radius_m + top_extent.max())
+    indptr, cells = spatial_index.flatten(seeds)
+    rows = np.repeat(np.arange(n_boreholes), np.diff(indptr))
+
+    n_terms = n_exact = 0
+    accepted = []  # (level, rows, cells, bound) of aggregated cells, for the top-k
+    for level in range(len(levels) - 1, -1, -1):
+        total, centroid, m2, extent = levels[level]
+        d = np.sqrt(((bh[rows] - centroid[cells]) ** 2).sum(axis=1))
+        h = extent[cells]
+        reach = d - h <= radius_m
+        rows, cells, d, h = rows[reach], cells[reach], d[reach], h[reach]
+
+        rel = np.where(total[cells] > 0, (decay * decay + decay / np.maximum(d, 1e-9)) * m2[cells] / 2, 0.0)
+        accept = (d + h <= radius_m) & (d > 2 * h) & (rel <= tolerance)
+        kernel = np.exp(-decay * d[accept])
+        for c in range(n_categories):
+            sums[:, c] += np.bincount(rows[accept], weights=category_totals[level][cells[accept], c] * kernel,
+                                      minlength=n_boreholes)
+        errors += np.bincount(rows[accept], weights=total[cells[accept]] * kernel * rel[accept], minlength=n_boreholes)
+        n_terms += int(accept.sum())
+        if k is not None:
+            peak = largest[level][cells[accept]]
+            accepted.append((level, rows[accept], cells[accept], peak * np.exp(-decay * (d[accept] - h[accept])),
+                             peak * np.exp(-decay * _exact_distance(d[accept] + h[accept], tree.backend))))
+
+        rows, cells = rows[~accept], cells[~accept]
+        if level > 0:
+            rows, cells = _expand(*tree.children[level], rows, cells)
+            continue
+        # Opened leaves: exact sums over their sources
+        rows, sources = _expand(*tree.leaf_sources, rows, cells)
+        dist = _exact_distance(np.sqrt(((bh[rows] - tree.coords[sources]) ** 2).sum(axis=1)), tree.backend)
+        inside = dist <= radius_m
+        rows, sources, dist = rows[inside], sources[inside], dist[inside]
+        kernel = np.exp(-decay * dist)
+        for c in range(n_categories):
+            sums[:, c] += np.bincount(rows, weights=category_loads[sources, c] * kernel, minlength=n_boreholes)
+        n_exact += len(rows)
+
+    relative = np.divide(errors, sums.sum(axis=1), out=np.zeros(n_boreholes), where=sums.sum(axis=1) > 0)
+    logging.info(f"Far-field transport: {n_terms:,} cell terms + {n_exact:,} exact pairs over {tree.n_sources:,} sources "
+                 f"({len(levels)} levels); estimated relative error max {relative.max():.2e}, "
+                 f"mean {relative.mean():.2e} (tolerance {tolerance:g})")
+    if k is None:
+        return sums, errors, None
+
+    top.category_loads = sums
+    # Lower bound on each borehole's k-th best contribution (cells offer one source each)
+    floor_rows = np.concatenate([rows] + [entry[1] for entry in accepted])
+    floor_values = np.concatenate([loads[sources] * np.exp(-decay * dist)] + [entry[4] for entry in accepted])
+    kth = _top_pairs(floor_rows, np.arange(len(floor_rows)), np.zeros(len(floor_rows)), floor_values, 0.0, k,
+                     n_boreholes)[1][:, -1]
+    pairs = [(rows, sources, dist)]
+    n_opened = 0
+    for level, cell_rows, cell_ids, bound, _ in accepted:
+        beat = bound >= kth[cell_rows]
+        cell_rows, cell_ids = cell_rows[beat], cell_ids[beat]
+        n_opened += len(cell_ids)
+        for lower in range(level, 0, -1):
+            cell_rows, cell_ids = _expand(*tree.children[lower], cell_rows, cell_ids)
+        cell_rows, cell_sources = _expand(*tree.leaf_sources, cell_rows, cell_ids)
+        cell_dist = _exact_distance(np.sqrt(((bh[cell_rows] - tree.coords[cell_sources]) ** 2).sum(axis=1)),
+                                    tree.backend)
+        inside = cell_dist <= radius_m
+        pairs.append((cell_rows[inside], cell_sources[inside], cell_dist[inside]))
+    top.top_sources, top.top_loads = _top_pairs(*(np.concatenate(p) for p in zip(*pairs)), loads, decay, k,
+                                                n_boreholes)
+    logging.info(f"Far-field attribution: re-opened {n_opened:,} of {n_terms:,} aggregated cells for the top-{k}")
+    return sums, errors, top
+
+
+def accumulate_far_field(source_latlon: np.ndarray, source_loads: np.ndarray, borehole_latlon: np.ndarray,
+                         radius_m: float, decay_rate: float, tolerance: float = config.FAR_FIELD_TOLERANCE,
+                         tree: Optional[FarFieldTree] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Approximate ``accumulate(build_adjacency(...))`` with far sources aggregated into cells.
+
+    Each aggregated cell is kept within a relative error of ``tolerance``, so
+    every borehole sum is too (to second order). Returns the sums and the
+    estimated absolute error of each.
+    """
+    source_latlon = np.asarray(source_latlon, dtype=float).reshape(-1, 2)
+    borehole_latlon = np.asarray(borehole_latlon, dtype=float).reshape(-1, 2)
+    loads = np.asarray(source_loads, dtype=float).reshape(-1, 1)
+    sums, errors, _ = _far_field(source_latlon, loads, borehole_latlon, radius_m, decay_rate, tolerance, tree)
+    return sums[:, 0], errors
+
+
+def attribute_far_field(source_latlon: np.ndarray, category_loads: np.ndarray, borehole_latlon: np.ndarray,
+                        radius_m: float, decay_rate: float, k: int, tolerance: float = config.FAR_FIELD_TOLERANCE,
+                        tree: Optional[FarFieldTree] = None) -> Tuple[Attribution, np.ndarray]:
+    """Attribution in the far-field pass: approximate category loads, exact top-k.
+
+    The category loads sum to ``accumulate_far_field``; returns the
+    attribution and the estimated absolute error of each borehole sum.
+    """
+    source_latlon = np.asarray(source_latlon, dtype=float).reshape(-1, 2)
+    borehole_latlon = np.asarray(borehole_latlon, dtype=float).reshape(-1, 2)
+    category_loads = _load_columns(category_loads)
+    _, errors, attribution = _far_field(source_latlon, category_loads, borehole_latlon, radius_m, decay_rate,
+                                        tolerance, tree, k)
+    return attribution, errors
@@ -0,0 +1,191 @@
+"""Simplified ward geometry for the dashboard overlay.
+
+``wards.geojson`` is ~2 MB and was embedded in every rerun that showed the
+wards layer. ``prepare_ward_levels`` writes compact, simplified copies at a
+few tolerances; the dashboard picks the level matching the map zoom.
+
+Simplification is topology preserving: ring boundaries are split into arcs
+at junction vertices (where neighbouring wards meet) and each shared arc is
+simplified once with Douglas-Peucker, so adjacent wards keep an identical
+border and no gaps or overlaps appear.
+"""
+
+import json
+import logging
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import config
+
+METERS_PER_DEGREE = 2 * math.pi * config.EARTH_RADIUS_M / 360.0
+KEEP_PROPERTIES = ('ward_name', 'dist_name', 'reg_name')
+COORD_DECIMALS = 6  # ~0.1 m
+
+
+def level_path(tolerance_m: float) -> Path:
+    return config.DERIVED_DATA_DIR / f'wards_simplified_{tolerance_m:g}m.geojson'
+
+
+def level_for_zoom(zoom: float, latitude: float = -6.165,
+                   tolerances: Sequence[float] = config.WARD_SIMPLIFY_TOLERANCES_M) -> float:
+    """Coarsest tolerance that stays below one screen pixel at ``zoom``."""
+    pixel_m = 156543.03 * math.cos(math.radians(latitude)) / (2 ** zoom)
+    fitting = [t for t in tolerances if t <= pixel_m]
+    return max(fitting) if fitting else min(tolerances)
+
+
+def _douglas_peucker(xy: np.ndarray, tolerance: float, keep_one: bool = False) -> np.ndarray:
+    """Indices of arc vertices kept by Douglas-Peucker (endpoints always kept).
+
+    ``keep_one`` forces the interior vertex farthest from the chord to stay,
+    so rings made of only one or two arcs cannot collapse to a line.
+    """
+    n = len(xy)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1]] = True
+    first = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a, b = xy[i], xy[j]
+        pts = xy[i + 1:j]
+        ab = b - a
+        denom = float(ab @ ab)
+        if denom == 0.0:
+            dist = np.hypot(*(pts - a).T)
+        else:
+            t = np.clip(((pts - a) @ ab) / denom, 0.0, 1.0)
+            dist = np.hypot(*(pts - (a + t[:, None] * ab)).T)
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance or (first and keep_one):
+            keep[i + 1 + k] = True
+            stack.append((i, i + 1 + k))
+            stack.append((i + 1 + k, j))
+        first = False
+    return np.flatnonzero(keep)
+
+
+def _vertex_keys(ring: np.ndarray) -> List[Tuple[int, int]]:
+    q = np.rint(ring * 1e7).astype(np.int64)
+    return list(map(tuple, q))
+
+
+def simplify_geojson(geojson: Dict, tolerance_m: float) -> Dict:
+    """Topology-preserving simplification of all polygon rings in ``geojson``."""
+    # Collect open rings (closing vertex dropped) with their location in the collection
+    rings = []  # (feature_idx, polygon_idx, ring_idx, coords)
+    for f_idx, feature in enumerate(geojson['features']):
+        geom = feature['geometry']
+        polygons = geom['coordinates'] if geom['type'] == 'MultiPolygon' else [geom['coordinates']]
+        for p_idx, polygon in enumerate(polygons):
+            for r_idx, ring in enumerate(polygon):
+                coords = np.asarray(ring, dtype=float)[:, :2]
+                if len(coords) > 1 and np.array_equal(coords[0], coords[-1]):
+                    coords = coords[:-1]
+                rings.append((f_idx, p_idx, r_idx, coords))
+
+    # Junctions: vertices whose neighbours differ between the rings using them
+    neighbours: Dict[Tuple[int, int], set] = {}
+    ring_keys = []
+    for *_, coords in rings:
+        keys = _vertex_keys(coords)
+        ring_keys.append(keys)
+        n = len(keys)
+        for i, key in enumerate(keys):
+            neighbours.setdefault(key, set()).update((keys[i - 1], keys[(i + 1) % n]))
+    junction = {key for key, nbrs in neighbours.items() if len(nbrs) > 2}
+
+    # Split rings into arcs at junctions. Rings with fewer than two junctions
+    # are also cut at the vertex farthest from the anchor (the junction, or the
+    # smallest vertex key) - a choice independent of where the ring starts.
+    lat0 = np.mean([c[:, 1].mean() for *_, c in rings]) if rings else 0.0
+    scale = np.array([METERS_PER_DEGREE * math.cos(math.radians(lat0)), METERS_PER_DEGREE])
+    ring_arcs = []
+    for (*_, coords), keys in zip(rings, ring_keys):
+        n = len(keys)
+        cuts = [i for i, key in enumerate(keys) if key in junction]
+        if len(cuts) < 2:
+            anchor = cuts[0] if cuts else min(range(n), key=keys.__getitem__)
+            far = int(np.argmax(np.hypot(*((coords - coords[anchor]) * scale).T)))
+            cuts = sorted({anchor, far})
+        arcs = []
+        for a, b in zip(cuts, cuts[1:] + [cuts[0] + n]):
+            idx = np.arange(a, b + 1) % n
+            arcs.append(idx)
+        ring_arcs.append(arcs)
+
+    def canonical(keys_seq):
+        fwd = tuple(keys_seq)
+        rev = fwd[::-1]
+        return (fwd, False) if fwd <= rev else (rev, True)
+
+    # Rings with fewer than three arcs need an interior vertex kept on every arc
+    keep_one = set()
+    for (*_, coords), keys, arcs in zip(rings, ring_keys, ring_arcs):
+        if len(arcs) < 3:
+            for idx in arcs:
+                keep_one.add(canonical([keys[i] for i in idx])[0])
+
+    simplified_arcs: Dict[tuple, np.ndarray] = {}
+    new_rings = []
+    for (*_, coords), keys, arcs in zip(rings, ring_keys, ring_arcs):
+        parts = []
+        for idx in arcs:
+            key, reversed_ = canonical([keys[i] for i in idx])
+            if key not in simplified_arcs:
+                arc = coords[idx][::-1] if reversed_ else coords[idx]
+                kept = _douglas_peucker(arc * scale, tolerance_m, keep_one=key in keep_one)
+                simplified_arcs[key] = arc[kept]
+            arc = simplified_arcs[key]
+            parts.append((arc[::-1] if reversed_ else arc)[:-1])
+        ring = np.concatenate(parts)
+        new_rings.append(np.vstack([ring, ring[:1]]))
+
+    # Rebuild a compact feature collection
+    out_features = []
+    for feature in geojson['features']:
+        props = feature.get('properties') or {}
+        out_features.append({
+            'type': 'Feature',
+            'properties': {k: props.get(k) for k in KEEP_PROPERTIES},
+            'geometry': {'type': 'MultiPolygon', 'coordinates': []},
+        })
+    for (f_idx, p_idx, r_idx, _), ring in zip(rings, new_rings):
+        polygons = out_features[f_idx]['geometry']['coordinates']
+        while len(polygons) <= p_idx:
+            polygons.append([])
+        polygons[p_idx].append(np.round(ring, COORD_DECIMALS).tolist())
+    return {'type': 'FeatureCollection', 'features': out_features}
+
+
+def prepare_ward_levels(source: Path = config.WARDS_GEOJSON_PATH,
+                        tolerances: Sequence[float] = config.WARD_SIMPLIFY_TOLERANCES_M) -> Dict[float, Path]:
+    """Write one simplified GeoJSON per tolerance; returns ``{tolerance: path}``."""
+    with Path(source).open() as f:
+        geojson = json.load(f)
+    paths = {}
+    for tolerance in tolerances:
+        simplified = simplify_geojson(geojson, tolerance)
+        path = level_path(tolerance)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(simplified, separators=(',', ':')))
+        n_vertices = sum(len(r) for f in simplified['features'] for p in f['geometry']['coordinates'] for r in p)
+        logging.info(f"Wards @ {tolerance:g} m: {n_vertices} vertices, {path.stat().st_size / 1024:.0f} KB -> {path}")
+        paths[tolerance] = path
+    return paths
+
+
+def load_ward_level(tolerance_m: float) -> Optional[Dict]:
+    """Simplified wards for ``tolerance_m``, generated on first use."""
+    path = level_path(tolerance_m)
+    if not path.exists():
+        if not config.WARDS_GEOJSON_PATH.exists():
+            return None
+        prepare_ward_levels(tolerances=[tolerance_m])
+    with path.open() as f:
+        return json.load(f)
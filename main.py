@@ -12,16 +12,67 @@ def main():
     pipe_parser = subparsers.add_parser('pipeline', help='Run the model pipeline')
     pipe_parser.add_argument('--model', choices=['fio', 'nitrogen', 'phosphorus'], required=True, help='Model type to run')
     pipe_parser.add_argument('--scenario', default='baseline_2025', help='Scenario name')
+    pipe_parser.add_argument('--kernel-tolerance', type=float, default=None,
+                             help='Derive the transport radius so at most this share of kernel mass is truncated')
+    pipe_parser.add_argument('--transport-mode', choices=['memory', 'tiled', 'parallel', 'far_field'], default=None,
+                             help='Layer 2 evaluation (default: config.TRANSPORT_MODE)')
+    pipe_parser.add_argument('--far-field-tolerance', type=float, default=None,
+                             help="Max estimated relative error of 'far_field' transport sums")
+    pipe_parser.add_argument('--upgrades', default=None, help="Upgrade list CSV from 'optimize' to apply")
+    pipe_parser.add_argument('--attribution-top-k', type=int, default=None,
+                             help='Write the top-k contributing toilets and category shares per borehole')
+    pipe_parser.add_argument('--seasonal', action='store_true',
+                             help='Also compute monthly concentrations from monthly abstraction rates')
     
     # Dashboard Command
     dash_parser = subparsers.add_parser('dashboard', help='Launch the dashboard')
 
     # Calibration Command
     calib_parser = subparsers.add_parser('calibration', help='Run the calibration suite')
+    calib_parser.add_argument('--fit-efficiencies', action='store_true',
+                              help='Fit per-category containment efficiencies at the best grid parameters')
     
     # 4. Compare Subcommand
     parser_compare = subparsers.add_parser('compare', help='Compare scenarios and generate charts')
 
+    # 5. Offline tile export
+    tiles_parser = subparsers.add_parser('export-tiles', help='Export a static map tile pyramid for a scenario')
+    tiles_parser.add_argument('--scenario', default='baseline_2025', help='Scenario name')
+    tiles_parser.add_argument('--out', default=None, help='Output directory (default: data/output/tiles/<scenario>)')
+    tiles_parser.add_argument('--min-zoom', type=int, default=config.TILE_MIN_ZOOM)
+    tiles_parser.add_argument('--max-zoom', type=int, default=config.TILE_MAX_ZOOM)
+    tiles_parser.add_argument('--workers', type=int, default=config.TILE_EXPORT_WORKERS, help='Tile encoding processes')
+
+    # 6. Simplified ward geometry for the dashboard overlay
+    subparsers.add_parser('prepare-wards', help='Write simplified ward geometry levels for the dashboard')
+
+    # 7. Streaming standardization of the raw sanitation file
+    std_parser = subparsers.add_parser('standardize', help='Standardize raw sanitation data in bounded-memory chunks')
+    std_parser.add_argument('--input', default=None, help='Raw sanitation CSV (default: data/input/sanitation_type.csv)')
+    std_parser.add_argument('--output', default=None, help='Standardized CSV (default: data/derived/sanitation_standardized.csv)')
+    std_parser.add_argument('--chunksize', type=int, default=config.SANITATION_CHUNK_ROWS, help='Rows per chunk')
+
+    # 8. Budget-constrained upgrade optimizer
+    opt_parser = subparsers.add_parser('optimize', help='Choose toilets to upgrade under a budget')
+    opt_parser.add_argument('--budget', type=float, required=True, help='Toilets (or cost units with --cost)')
+    opt_parser.add_argument('--objective', choices=['high_risk', 'exposure'], default='high_risk')
+    opt_parser.add_argument('--scenario', default=config.BASELINE_SCENARIO, help='Scenario to improve on')
+    opt_parser.add_argument('--cost', action='append', default=[], metavar='CATEGORY=COST',
+                            help='Upgrade cost per toilet category (repeatable; default 1)')
+    opt_parser.add_argument('--out', default=None, help='Upgrade list CSV (default: data/output/optimized_upgrades.csv)')
+
+    # 9. Multi-year projections
+    proj_parser = subparsers.add_parser('project', help='Project FIO concentrations year by year')
+    proj_parser.add_argument('--scenario', default=config.BASELINE_SCENARIO, help='Scenario for the static settings')
+    proj_parser.add_argument('--start-year', type=int, default=config.PROJECTION_START_YEAR)
+    proj_parser.add_argument('--end-year', type=int, default=config.PROJECTION_END_YEAR)
+    proj_parser.add_argument('--annual-growth', type=float, default=config.PROJECTION_ANNUAL_GROWTH,
+                             help='Compound population growth per year (e.g. 0.03)')
+    proj_parser.add_argument('--rollout', action='append', default=[], metavar='KEY=START:END',
+                             help='Linear rollout of an intervention percentage over the projection '
+                                  '(e.g. od_reduction_percent=0:95; repeatable)')
+    proj_parser.add_argument('--out', default=None, help='Projection npz (default: data/output/fio_projection.npz)')
+
     args = parser.parse_args()
     
     if args.command == 'pipeline':
@@ -33,6 +84,20 @@ def main():
             if not overrides:
                 logging.warning(f"Scenario '{args.scenario}' not found. Using defaults.")
         
+        if args.kernel_tolerance is not None:
+            overrides = {**overrides, 'kernel_tolerance': args.kernel_tolerance}
+        if args.transport_mode is not None:
+            overrides = {**overrides, 'transport_mode': args.transport_mode}
+        if args.far_field_tolerance is not None:
+            overrides = {**overrides, 'transport_far_field_tolerance': args.far_field_tolerance}
+        if args.attribution_top_k:
+            overrides = {**overrides, 'attribution_top_k': args.attribution_top_k}
+        if args.seasonal:
+            overrides = {**overrides, 'seasonal': True}
+        if args.upgrades:
+            from app.optimizer import load_plan_override
+            overrides = {**overrides, **load_plan_override(args.upgrades)}
+        
         run_pipeline(args.model, scenario_name=args.scenario, scenario_override=overrides)
             
     elif args.command == 'dashboard':
@@ -48,6 +113,18 @@ def main():
         
         # 2. Print Scorecard
         print_calibration_report(best)
+
+        if args.fit_efficiencies:
+            import json
+            from app.calibrate_runner import _prepare_inputs, build_category_basis, fit_category_efficiencies
+            sanitation, gov_boreholes, scenario_base = _prepare_inputs()
+            basis = build_category_basis(sanitation, gov_boreholes, scenario_base, best['efio'], best['ks'],
+                                         best['radius_g'], best['flow_multiplier'])
+            fit = fit_category_efficiencies(basis)
+            fit_path = config.OUTPUT_DATA_DIR / "calibration_efficiency_fit.json"
+            with open(fit_path, "w") as f:
+                json.dump(fit, f, indent=2)
+            print(f"Fitted efficiencies {fit['efficiency']} saved to {fit_path}")
         
         # 3. Run RF CV (Data-Driven Ceiling)
         print("\nRunning data-driven RF CV (upper bound on trend signal)...")
@@ -68,6 +145,61 @@ def main():
     elif args.command == 'compare':
         from app.analysis_runner import run_comparison
         run_comparison()
+
+    elif args.command == 'export-tiles':
+        import json
+        from pathlib import Path
+        from app.engine import compute_pipeline
+        from app.tiles import export_tiles
+
+        result = compute_pipeline('fio', scenario_name=args.scenario)
+        wards = None
+        if config.WARDS_GEOJSON_PATH.exists():
+            with config.WARDS_GEOJSON_PATH.open() as f:
+                wards = json.load(f)
+        out_dir = Path(args.out) if args.out else config.TILES_OUTPUT_DIR / args.scenario
+        stats = export_tiles(result.concentrations, result.loads, wards, out_dir,
+                             min_zoom=args.min_zoom, max_zoom=args.max_zoom, workers=args.workers)
+        print(f"Tiles in {out_dir}: {stats['written']} written, {stats['unchanged']} unchanged, {stats['removed']} removed")
+        
+    elif args.command == 'prepare-wards':
+        from app.wards import prepare_ward_levels
+        for tolerance, path in prepare_ward_levels().items():
+            print(f"{tolerance:g} m -> {path}")
+        
+    elif args.command == 'standardize':
+        stats = engine.standardize_sanitation_streaming(args.input, args.output, chunksize=args.chunksize)
+        print(f"{stats['rows_written']:,} rows written, {stats['rows_dropped']:,} dropped, "
+              f"{stats['rows_per_second']:,.0f} rows/s")
+
+    elif args.command == 'optimize':
+        from app import optimizer
+        costs = {int(k): float(v) for k, v in (item.split('=', 1) for item in args.cost)}
+        state = engine.load_engine_state()
+        plan = optimizer.optimize_upgrades(args.budget, objective=args.objective, costs=costs,
+                                           scenario_name=args.scenario, state=state)
+        path = optimizer.save_plan(plan, state.sanitation, args.out)
+        print(f"{plan.summary['toilets']:,} toilets selected; high-risk wells "
+              f"{plan.summary['high_risk_before']} -> {plan.summary['high_risk_after']}. "
+              f"Upgrade list: {path} (apply with: pipeline --model fio --upgrades {path})")
+
+
+    elif args.command == 'project':
+        from app import projection
+        from app.summary import HIGH_CONCENTRATION
+        years = range(args.start_year, args.end_year + 1)
+        rollouts = {}
+        for item in args.rollout:
+            key, span = item.split('=', 1)
+            start, end = (float(v) for v in span.split(':', 1))
+            rollouts[key] = projection.ramp(years, start, end)
+        schedule = projection.make_schedule(years, annual_growth=args.annual_growth, **rollouts)
+        result = projection.project(schedule, scenario_name=args.scenario, state=engine.load_engine_state())
+        paths = result.save(args.out)
+        for year in result.summary:
+            print(f"{year['year']}: mean {year['all']['concentration_mean']:.1f} CFU/100mL, "
+                  f"{year['all']['high_concentration']:,} wells above {HIGH_CONCENTRATION:g}")
+        print(f"Projection saved to {paths['projection']} (summary: {paths['summary']})")
         
     else:
         parser.print_help()
@@ -1,8 +1,9 @@
+import copy
 import unittest
 import pandas as pd
 import numpy as np
 from app.calibration_engine import CalibrationEngine
-from app import config
+from app import calibrate_runner, config
 
 class TestCalibrationEngine(unittest.TestCase):
     def setUp(self):
@@ -37,5 +38,54 @@ class TestCalibrationEngine(unittest.TestCase):
         self.assertIn('rmse_log', metrics)
         self.assertIn('correlation', metrics)
 
+class TestCategoryBasis(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        n = 4000
+        self.sanitation = pd.DataFrame({
+            'lat': rng.uniform(-6.2, -6.19, n),
+            'long': rng.uniform(39.2, 39.21, n),
+            'toilet_category_id': rng.choice([1, 2, 3, 4], size=n),
+            'household_population': rng.integers(3, 12, size=n).astype(float),
+        })
+        self.sanitation['pathogen_containment_efficiency'] = self.sanitation['toilet_category_id'].map(
+            config.CONTAINMENT_EFFICIENCY_DEFAULT)
+        self.boreholes = pd.DataFrame({
+            'lat': rng.uniform(-6.2, -6.19, 50),
+            'long': rng.uniform(39.2, 39.21, 50),
+            'Q_L_per_day': rng.uniform(1e4, 5e4, 50),
+        })
+        self.scenario = copy.deepcopy(config.SCENARIOS['baseline_2025'])
+        self.basis = calibrate_runner.build_category_basis(self.sanitation, self.boreholes, self.scenario,
+                                                           1e7, 0.05, 100.0, 10.0)
+
+    def test_matches_full_run(self):
+        eff = {1: 0.9, 2: 0.3, 3: 0.6, 4: 0.0}
+        sanitation = self.sanitation.assign(
+            pathogen_containment_efficiency=self.sanitation['toilet_category_id'].map(eff))
+        expected = calibrate_runner._run_model_once(sanitation, self.boreholes, self.scenario,
+                                                    1e7, 0.05, 100.0, 10.0)
+        np.testing.assert_allclose(self.basis.concentrations(eff),
+                                   expected['concentration_CFU_per_100mL'].values, rtol=1e-10)
+        stacked = self.basis.concentrations(np.array([[0.9, 0.3, 0.6, 0.0], [0.99, 0.1, 0.5, 0.0]]))
+        np.testing.assert_allclose(stacked[0], self.basis.concentrations(eff))
+
+    def test_fit_recovers_efficiencies(self):
+        eff = {1: 0.95, 2: 0.2, 3: 0.5, 4: 0.1}
+        fit = self.basis.fit(self.basis.concentrations(eff))
+        for category, value in eff.items():
+            self.assertAlmostEqual(fit['efficiency'][category], value, places=6)
+
+    def test_fit_needs_observations(self):
+        with self.assertRaises(ValueError):
+            self.basis.fit(np.full(len(self.boreholes), np.nan))
+
+    def test_tiled_basis_matches_memory(self):
+        scenario = {**self.scenario, 'transport_mode': 'tiled'}
+        tiled = calibrate_runner.build_category_basis(self.sanitation, self.boreholes, scenario,
+                                                      1e7, 0.05, 100.0, 10.0)
+        np.testing.assert_allclose(tiled.basis, self.basis.basis, rtol=1e-10)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,106 @@
+"""Tests for merging co-located sanitation sources."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from app import coarsen, config, engine, transport
+
+
+def _toilets(n=2000, seed=5):
+    rng = np.random.default_rng(seed)
+    centers = np.column_stack([rng.uniform(-6.2, -6.1, 20), rng.uniform(39.2, 39.3, 20)])
+    latlon = centers[rng.integers(0, 20, n)] + rng.normal(scale=0.0002, size=(n, 2))
+    latlon[: n // 4] = latlon[n // 4: n // 2]  # exact duplicates
+    category = rng.integers(1, 5, n)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'lat': latlon[:, 0],
+        'long': latlon[:, 1],
+        'toilet_category_id': category,
+        'pathogen_containment_efficiency': np.choose(category - 1, [0.5, 0.1, 0.3, 0.0]),
+        'household_population': rng.integers(1, 12, n).astype(float),
+    })
+
+
+class TestCoarsenSources(unittest.TestCase):
+
+    def setUp(self):
+        self.df = _toilets()
+
+    def test_identical_coordinates_only(self):
+        coarse, mapping = coarsen.coarsen_sources(self.df, 0.0)
+        self.assertLess(len(coarse), len(self.df))
+        self.assertEqual(mapping.max_displacement_m, 0.0)
+        self.assertAlmostEqual(coarse['household_population'].sum(), self.df['household_population'].sum())
+        self.assertEqual(coarse['n_sources'].sum(), len(self.df))
+
+    def test_groups_keep_category_and_population(self):
+        coarse, mapping = coarsen.coarsen_sources(self.df, 25.0)
+        self.assertEqual(len(mapping.group), len(self.df))
+        np.testing.assert_array_equal(coarse['toilet_category_id'].values[mapping.group],
+                                      self.df['toilet_category_id'].values)
+        pop = np.bincount(mapping.group, weights=self.df['household_population'].values)
+        np.testing.assert_allclose(coarse['household_population'].values, pop)
+        members = mapping.members(0)
+        self.assertTrue(np.all(mapping.group[members] == 0))
+
+    def test_transport_within_reported_bound(self):
+        boreholes = self.df[['lat', 'long']].values[::97] + 0.0003
+        radius, decay = 5000.0, 0.01  # wide radius: no source crosses the edge
+        load = lambda df: (df['household_population'] * (1 - df['pathogen_containment_efficiency'])).values
+        exact = transport.accumulate(transport.build_adjacency(self.df[['lat', 'long']].values, boreholes, radius),
+                                     load(self.df), decay)
+        coarse, mapping = coarsen.coarsen_sources(self.df, 10.0)
+        approx = transport.accumulate(transport.build_adjacency(coarse[['lat', 'long']].values, boreholes, radius),
+                                      load(coarse), decay)
+        self.assertLessEqual(mapping.max_displacement_m, 10.0 * np.sqrt(2) * 1.01)
+        self.assertLessEqual(np.max(np.abs(approx / exact - 1)), mapping.error_bound(decay) + 1e-12)
+        self.assertGreater(mapping.report(decay)['transport_error_bound'], 0.0)
+
+    def test_state_keeps_toilets_and_labels_attribution(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with patch.object(config, 'SOURCE_COARSEN_M', 25.0), \
+                patch.object(config, 'SPATIAL_INDEX_DIR', Path(tmp.name)), \
+                patch('app.engine.load_and_standardize_sanitation', return_value=self.df):
+            state = engine.EngineState()
+            state._boreholes = {'private': pd.DataFrame({'lat': self.df['lat'].values[::50] + 0.0001,
+                                                         'long': self.df['long'].values[::50],
+                                                         'Q_L_per_day': 2000.0})}
+            self.assertIs(state.toilets, self.df)
+            self.assertLess(len(state.sanitation), len(self.df))
+            result = engine.compute_pipeline('fio', 'custom', {'attribution_top_k': 3,
+                                                               'radius_by_type': {'private': 50.0}}, state=state)
+        top = result.attribution['top_sources']
+        self.assertNotIn('id', top.columns)
+        self.assertTrue((top['source_kind'] == 'super_source').all())
+        np.testing.assert_array_equal(top['n_toilets'], state.sanitation['n_sources'].values[top['source_index']])
+
+    def test_load_summaries_count_every_toilet(self):
+        override = {'od_reduction_percent': 30.0}
+        with patch('app.engine.load_and_standardize_sanitation', return_value=self.df):
+            exact = engine.compute_pipeline('nitrogen', 'custom', override)
+            with patch.object(config, 'SOURCE_COARSEN_M', 25.0):
+                state = engine.EngineState()
+                self.assertLess(len(state.sanitation), len(self.df))
+                coarse = engine.compute_pipeline('nitrogen', 'custom', override, state=state)
+                stateless = engine.compute_pipeline('nitrogen', 'custom', override)
+        for result in (coarse, stateless):
+            self.assertEqual(len(result.loads), len(exact.loads))
+            self.assertEqual(result.summary['loads'], exact.summary['loads'])
+            self.assertNotIn('coarsening', result.summary)
+        self.assertEqual(exact.summary['loads']['count'], len(exact.loads))
+        self.assertGreater(exact.summary['loads']['count'], len(self.df))
+
+    def test_negative_tolerance_rejected(self):
+        with self.assertRaises(ValueError):
+            coarsen.coarsen_sources(self.df, -1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Tests for the dashboard colour lookup tables."""
+
+import unittest
+
+import numpy as np
+
+from app import colormap
+
+
+def reference_color(val, min_val, max_val, palette):
+    """Per-point stop interpolation the LUT replaces."""
+    norm = 0.5 if max_val == min_val else float(np.clip((val - min_val) / (max_val - min_val), 0, 1))
+    stops = sorted(colormap.PALETTES[palette].items())
+    for (p0, c0), (p1, c1) in zip(stops, stops[1:]):
+        if p0 <= norm <= p1:
+            t = (norm - p0) / (p1 - p0)
+            return [c0[ch] + (c1[ch] - c0[ch]) * t for ch in range(3)]
+    return list(stops[-1][1])
+
+
+class TestColormap(unittest.TestCase):
+
+    def test_lut_shape_and_endpoints(self):
+        for palette, stops in colormap.PALETTES.items():
+            lut = colormap.build_lut(palette)
+            self.assertEqual(lut.shape, (colormap.LUT_SIZE, 4))
+            self.assertEqual(lut.dtype, np.uint8)
+            self.assertEqual(tuple(lut[0, :3]), stops[0.0])
+            self.assertEqual(tuple(lut[-1, :3]), stops[1.0])
+            self.assertTrue((lut[:, 3] == colormap.DEFAULT_ALPHA).all())
+
+    def test_matches_stop_interpolation(self):
+        values = np.linspace(-10, 110, 997)
+        for palette in colormap.PALETTES:
+            colors = colormap.map_values(values, 0, 100, palette=palette)
+            self.assertEqual(colors.shape, (len(values), 4))
+            expected = np.array([reference_color(v, 0, 100, palette) for v in values])
+            # Half a LUT step on the steepest ramp (nitrogen 0.33-0.50) plus rounding
+            self.assertLessEqual(np.abs(colors[:, :3].astype(float) - expected).max(), 3.0)
+
+    def test_degenerate_range_and_nan(self):
+        colors = colormap.map_values(np.array([1.0, 5.0, np.nan]), 3.0, 3.0, palette='risk')
+        self.assertTrue((colors == colors[0]).all())
+        nan_color = colormap.map_values(np.array([np.nan]), 0, 1, palette='risk')
+        np.testing.assert_array_equal(nan_color[0], colormap.build_lut('risk')[0])
+
+    def test_unknown_palette_is_grey(self):
+        colors = colormap.map_values(np.arange(3), 0, 2, palette='unknown')
+        self.assertTrue((colors == np.array(colormap.FALLBACK_COLOR, dtype=np.uint8)).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
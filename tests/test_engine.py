@@ -1,5 +1,6 @@
 """Tests for the Zanzibar Model Engine."""
 
+import tempfile
 import unittest
 import pandas as pd
 import numpy as np
@@ -55,6 +56,14 @@ class TestEngine(unittest.TestCase):
         # Total pop conserved
         self.assertEqual(df['household_population'].sum(), 40.0)
 
+    def test_apply_interventions_upgrade_list(self):
+        scenario = {'toilet_upgrades': {'source_index': [0, 1, 3], 'toilet_category_id': 3, 'efficiency': 0.8}}
+        sanitation = self.dummy_sanitation.assign(pathogen_containment_efficiency=[0.99, 0.1, 0.5, 0.0])
+        df = engine.apply_interventions(sanitation, scenario)
+        # Sewer (0.99) is never downgraded; pit and OD rows are upgraded, septic (not listed) is kept
+        self.assertEqual(df['toilet_category_id'].tolist(), [1, 3, 3, 3])
+        self.assertEqual(df['pathogen_containment_efficiency'].tolist(), [0.99, 0.8, 0.5, 0.8])
+
     def test_compute_load_fio(self):
         pcfg = engine.PollutantConfig(
             name='fio',
@@ -94,6 +103,50 @@ class TestEngine(unittest.TestCase):
         # Should capture all 4 toilets
         self.assertAlmostEqual(res['aggregated_load'].values[0], 400.0)
 
+    def test_transport_with_cached_adjacency(self):
+        pcfg = engine.PollutantConfig(
+            name='fio',
+            output_load_path=Path('dummy.csv'),
+            efio=1.0,
+            decay_rate=0.01
+        )
+        base = self.dummy_sanitation.copy()
+        base['lat'] = [0.0, 0.00005, 0.0001, 0.0002]
+        base['pathogen_containment_efficiency'] = 0.0
+
+        # OD split appends rows that share their source's location
+        toilets = engine.apply_interventions(base, {'od_reduction_percent': 50.0})
+        toilets['load'] = toilets['household_population']
+        self.assertEqual(len(toilets), 5)
+
+        adjacency = engine.transport.build_adjacency(
+            base[['lat', 'long']].values, self.dummy_boreholes[['lat', 'long']].values, 50.0
+        )
+        cached = engine.run_transport(toilets, self.dummy_boreholes, pcfg, 50.0, adjacency=adjacency)
+        direct = engine.run_transport(toilets, self.dummy_boreholes, pcfg, 50.0)
+        self.assertAlmostEqual(cached['aggregated_load'].values[0], direct['aggregated_load'].values[0])
+
+    def test_standardize_streaming_matches_single_pass(self):
+        raw = pd.DataFrame({
+            'fid': range(7),
+            'Latitude': ['-6.1', '-6.2', 'bad', '-6.3', None, '-6.4', '-6.5'],
+            'Longitude': [39.1, 39.2, 39.3, 39.4, 39.5, 39.6, 39.7],
+            'Category': [1, 2, 3, 4, 2, 5, 3],
+            'population': [5, 6, 7, 8, 9, 10, 11],
+        })
+        with tempfile.TemporaryDirectory() as tmp:
+            raw_path, out_path = Path(tmp) / 'raw.csv', Path(tmp) / 'std.csv'
+            raw.to_csv(raw_path, index=False)
+            stats = engine.standardize_sanitation_streaming(raw_path, out_path, chunksize=3)
+            streamed = pd.read_csv(out_path)
+
+        expected = engine._standardize_chunk(raw).reset_index(drop=True)
+        self.assertEqual(stats['rows_read'], 7)
+        self.assertEqual(stats['rows_dropped'], 2)
+        self.assertEqual(list(streamed.columns), list(expected.columns))
+        np.testing.assert_allclose(streamed['lat'], expected['lat'])
+        np.testing.assert_allclose(streamed['pathogen_containment_efficiency'], [0.99, 0.10, 0.0, 0.0, 0.50])
+
     def test_compute_load_phosphorus(self):
         pcfg = engine.PollutantConfig(
             name='phosphorus',
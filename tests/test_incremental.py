@@ -0,0 +1,90 @@
+"""Tests for incremental updates of toilet and borehole records."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from app import config, incremental
+
+
+class TestIncrementalModel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for name, value in (('SPATIAL_INDEX_DIR', Path(self.tmp.name) / 'index'),
+                            ('INCREMENTAL_REINDEX_FRACTION', 0.01)):
+            patcher = patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.rng = np.random.default_rng(8)
+        n = 5000
+        sanitation = pd.DataFrame({
+            'id': np.arange(n),
+            'lat': self.rng.uniform(-6.17, -6.15, n),
+            'long': self.rng.uniform(39.18, 39.20, n),
+            'toilet_category_id': self.rng.choice([1, 2, 3, 4], size=n),
+            'household_population': self.rng.integers(3, 12, size=n).astype(float),
+        })
+        sanitation['pathogen_containment_efficiency'] = sanitation['toilet_category_id'].map(
+            config.CONTAINMENT_EFFICIENCY_DEFAULT)
+        boreholes = {btype: pd.DataFrame({'lat': self.rng.uniform(-6.17, -6.15, m),
+                                          'long': self.rng.uniform(39.18, 39.20, m),
+                                          'Q_L_per_day': 20000.0})
+                     for btype, m in (('private', 300), ('government', 40))}
+        override = {'radius_by_type': {'private': 35.0, 'government': 100.0}, 'od_reduction_percent': 30.0}
+        self.model = incremental.IncrementalModel(sanitation, boreholes, scenario_override=override)
+
+    def _delta(self, step):
+        ids = self.rng.choice(list(self.model._toilet_rows), 30, replace=False)
+        current = self.model.sanitation.set_index('id')
+        toilets = pd.concat([
+            pd.DataFrame({'id': ids[:10], 'lat': current.loc[ids[:10], 'lat'].values + 1e-4}),
+            pd.DataFrame({'id': ids[10:20], 'toilet_category_id': 4, 'household_population': 20.0}),
+            pd.DataFrame({'id': [10000 + step], 'lat': [-6.16], 'long': [39.19], 'toilet_category_id': [2]}),
+        ])
+        boreholes = pd.DataFrame({'borehole_type': ['private', 'government'],
+                                  'borehole_index': [float(step), np.nan],
+                                  'lat': [-6.165, -6.155], 'long': [39.185, 39.195], 'Q_L_per_day': [np.nan, 30000.0]})
+        return incremental.Delta(toilets=toilets, deleted_toilets=ids[20:], boreholes=boreholes,
+                                 deleted_boreholes=[300 + step])
+
+    def test_patched_matches_full_rebuild(self):
+        self.assertTrue(self.model.verify()['match'])
+        for step in range(6):  # enough moves to trigger index rebuilds
+            summary = self.model.apply(self._delta(step))
+            self.assertLess(summary['affected_boreholes'], summary['boreholes'])
+        report = self.model.verify()
+        self.assertTrue(report['match'], report)
+        self.assertEqual(report['boreholes'], 340)
+
+        sanitation, boreholes = self.model.tables()
+        self.assertEqual(len(sanitation), 5000 - 6 * 10 + 6)
+        self.assertIn(10005, set(sanitation['id']))
+
+    def test_change_log(self):
+        self.model.apply(self._delta(0))
+        path = self.model.save_change_log(Path(self.tmp.name) / 'log.jsonl')
+        entries = [json.loads(line) for line in path.read_text().splitlines()]
+        ops = pd.Series([(e['kind'], e['op']) for e in entries]).value_counts()
+        self.assertEqual(ops[('toilet', 'update')], 20)
+        self.assertEqual(ops[('toilet', 'delete')], 10)
+        self.assertEqual(ops[('toilet', 'insert')], 1)
+        self.assertEqual(ops[('borehole', 'insert')], 1)
+        self.assertEqual(entries[-1]['op'], 'apply')
+
+    def test_unknown_records(self):
+        with self.assertRaises(KeyError):
+            self.model.apply(incremental.Delta(deleted_toilets=[123456]))
+        with self.assertRaises(KeyError):
+            self.model.apply(incremental.Delta(deleted_boreholes=[9999]))
+
+
+if __name__ == '__main__':
+    unittest.main()
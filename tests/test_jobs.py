@@ -0,0 +1,103 @@
+"""Tests for the dashboard background job runner."""
+
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from app import engine, jobs
+
+
+class TestJobRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scratch = Path(self.tmp.name) / 'jobs'
+        self.exports = Path(self.tmp.name) / 'exports'
+        self.runner = jobs.JobRunner(max_workers=2, output_root=self.scratch, export_root=self.exports)
+        self.release = threading.Event()
+        self.calls = []
+
+    def tearDown(self):
+        self.release.set()
+        self.runner.shutdown()
+        self.tmp.cleanup()
+
+    def fake_pipeline(self, model_type, scenario_name, scenario_override=None, state=None, progress=None):
+        self.calls.append((model_type, scenario_name, scenario_override))
+        progress(0.5, "Working")
+        self.release.wait(timeout=5)
+        return engine.PipelineResult(
+            model_type=model_type,
+            scenario_name=scenario_name,
+            scenario=engine.resolve_scenario(scenario_name, scenario_override),
+            loads=pd.DataFrame({'load': [1.0]})
+        )
+
+    def test_identical_requests_coalesce(self):
+        with patch('app.engine.compute_pipeline', side_effect=self.fake_pipeline):
+            first = self.runner.submit('fio', 'baseline_2025', {'od_reduction_percent': 10.0})
+            second = self.runner.submit('fio', 'baseline_2025', {'od_reduction_percent': 10.0})
+            other = self.runner.submit('fio', 'baseline_2025', {'od_reduction_percent': 20.0})
+            self.release.set()
+            first.result(timeout=5)
+            other.result(timeout=5)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(len(self.calls), 2)
+        self.assertNotEqual(first.output_dir, other.output_dir)
+        self.assertEqual(first.status, 'done')
+
+    def test_export_writes_to_export_directory(self):
+        self.release.set()
+        with patch('app.engine.compute_pipeline', side_effect=self.fake_pipeline):
+            job = self.runner.submit('nitrogen', 'baseline_2025')
+            paths = job.export()
+
+        self.assertEqual(paths['load'].parent, self.exports / job.job_id)
+        self.assertTrue(paths['load'].exists())
+
+    def test_finished_job_is_not_reused(self):
+        self.release.set()
+        with patch('app.engine.compute_pipeline', side_effect=self.fake_pipeline):
+            first = self.runner.submit('nitrogen', 'baseline_2025')
+            first.result(timeout=5)
+            second = self.runner.submit('nitrogen', 'baseline_2025')
+            second.result(timeout=5)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(first.scenario_hash, second.scenario_hash)
+
+    def test_pruned_jobs_delete_scratch_but_keep_exports(self):
+        self.release.set()
+        with patch('app.engine.compute_pipeline', side_effect=self.fake_pipeline), \
+                patch('app.config.JOB_HISTORY_LIMIT', 2):
+            submitted, exports = [], []
+            for i in range(4):
+                job = self.runner.submit('nitrogen', 'baseline_2025', {'od_reduction_percent': float(i)})
+                job.result(timeout=5)
+                job.output_dir.mkdir(parents=True)
+                (job.output_dir / 'scratch.tmp').write_text('x')
+                exports.append(job.export()['load'])
+                submitted.append(job)
+
+        self.assertIsNone(self.runner.get(submitted[0].job_id))
+        self.assertFalse(submitted[0].output_dir.exists())
+        self.assertTrue(submitted[-1].output_dir.exists())
+        self.assertEqual(sorted(p.name for p in self.scratch.iterdir()),
+                         sorted(job.job_id for job in submitted if self.runner.get(job.job_id)))
+        self.assertTrue(all(path.exists() for path in exports))
+
+    def test_scenario_hash_ignores_key_order(self):
+        a = jobs.scenario_hash('fio', {'a': 1, 'b': {'x': 1, 'y': 2}})
+        b = jobs.scenario_hash('fio', {'b': {'y': 2, 'x': 1}, 'a': 1})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, jobs.scenario_hash('nitrogen', {'a': 1, 'b': {'x': 1, 'y': 2}}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Tests for the neighbour-list accumulation kernels."""
+
+import unittest
+
+import numpy as np
+
+from app import kernels
+
+
+def _ragged(seed=2, n_rows=300, n_sources=2000):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 40, n_rows)
+    counts[:5] = 0  # boreholes without neighbours
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    indices = rng.integers(0, n_sources, indptr[-1])
+    distances = rng.uniform(0, 500, indptr[-1])
+    loads = rng.exponential(size=n_sources)
+    return indptr, indices, distances, loads
+
+
+def _reference(indptr, indices, distances, loads, decay_rate):
+    """Per-row loop, as the transport and feature code used to compute it."""
+    rows = []
+    for start, end in zip(indptr[:-1], indptr[1:]):
+        ld, d = loads[indices[start:end]], distances[start:end]
+        rows.append((end - start, ld.sum(), np.sum(ld / (d + 1.0)), np.sum(ld * np.exp(-decay_rate * d))))
+    return [np.array(column, dtype=float) for column in zip(*rows)]
+
+
+class TestKernels(unittest.TestCase):
+
+    def setUp(self):
+        self.args = _ragged()
+
+    def test_numpy_matches_reference(self):
+        expected = _reference(*self.args, 0.01)
+        np.testing.assert_allclose(kernels.decay_sum(*self.args, 0.01, backend='numpy'), expected[3], rtol=1e-12)
+        for got, want in zip(kernels.neighbor_features(*self.args, 0.01, backend='numpy'), expected):
+            np.testing.assert_allclose(got, want, rtol=1e-12)
+
+    @unittest.skipUnless('numba' in kernels.available_backends(), 'numba not installed')
+    def test_numba_matches_numpy(self):
+        np.testing.assert_allclose(kernels.decay_sum(*self.args, 0.01, backend='numba'),
+                                   kernels.decay_sum(*self.args, 0.01, backend='numpy'), rtol=1e-12)
+        for got, want in zip(kernels.neighbor_features(*self.args, 0.01, backend='numba'),
+                             kernels.neighbor_features(*self.args, 0.01, backend='numpy')):
+            np.testing.assert_allclose(got, want, rtol=1e-12)
+
+    def test_attribution_matches_reference(self):
+        indptr, indices, distances, loads = self.args
+        category_loads = np.column_stack([loads, loads[::-1] * (loads > 1.0)])
+        backends = kernels.available_backends()
+        results = [kernels.decay_attribution(indptr, indices, distances, category_loads, 0.01, 4, backend=b)
+                   for b in backends]
+        sums, top_sources, top_loads = results[0]
+        for row in range(len(indptr) - 1):
+            lo, hi = indptr[row], indptr[row + 1]
+            kernel = np.exp(-0.01 * distances[lo:hi])
+            np.testing.assert_allclose(sums[row], kernel @ category_loads[indices[lo:hi]], rtol=1e-12)
+            contrib = category_loads[indices[lo:hi]].sum(axis=1) * kernel
+            expected = np.sort(contrib[contrib > 0])[::-1][:4]
+            np.testing.assert_allclose(top_loads[row][top_sources[row] >= 0], expected, rtol=1e-12)
+        for other in results[1:]:
+            np.testing.assert_allclose(other[0], sums, rtol=1e-12)
+            np.testing.assert_array_equal(other[1], top_sources)
+
+    def test_backend_resolution(self):
+        self.assertEqual(kernels.resolve_backend('numpy'), 'numpy')
+        self.assertIn(kernels.resolve_backend('numba'), kernels.available_backends())
+        self.assertIn(kernels.resolve_backend('auto'), kernels.available_backends())
+        with self.assertRaises(ValueError):
+            kernels.resolve_backend('cuda')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Tests for packed map layer buffers."""
+
+import unittest
+
+import numpy as np
+
+from app import layers
+
+
+class TestPointBuffers(unittest.TestCase):
+
+    def setUp(self):
+        self.lat = np.array([-6.165, -6.2, -5.9])
+        self.lon = np.array([39.202, 39.3, 39.25])
+        self.colors = np.array([[0, 0, 255, 200], [255, 0, 0, 200], [0, 255, 0, 200]])
+        self.buffers = layers.point_buffers(self.lat, self.lon, self.colors,
+                                            weights=[1.5, 2.0, 0.25], radii=[100, 150, 200])
+
+    def test_packed_dtypes(self):
+        self.assertEqual(len(self.buffers), 3)
+        self.assertEqual(self.buffers.positions.dtype, np.float32)
+        self.assertEqual(self.buffers.positions.shape, (3, 2))
+        self.assertEqual(self.buffers.colors.dtype, np.uint8)
+        self.assertEqual(self.buffers.weights.dtype, np.float32)
+        self.assertEqual(self.buffers.nbytes, 3 * (8 + 4 + 4 + 4))
+
+    def test_records_round_trip(self):
+        rows = self.buffers.records()
+        self.assertEqual([r['x'] for r in rows], [39.202, 39.3, 39.25])
+        self.assertEqual([r['y'] for r in rows], [-6.165, -6.2, -5.9])
+        self.assertEqual([[r[c] for c in 'rgba'] for r in rows], self.colors.tolist())
+        self.assertEqual([r['w'] for r in rows], [1.5, 2.0, 0.25])
+        self.assertTrue(all(isinstance(r['r'], int) for r in rows))
+
+    def test_defaults(self):
+        buffers = layers.point_buffers(self.lat, self.lon, self.colors)
+        np.testing.assert_array_equal(buffers.weights, 1.0)
+        np.testing.assert_array_equal(buffers.radii, 0.0)
+
+    def test_empty(self):
+        buffers = layers.point_buffers([], [], np.zeros((0, 4)))
+        self.assertEqual(buffers.records(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+"""Tests for quadtree level-of-detail aggregation."""
+
+import unittest
+
+import numpy as np
+
+from app import lod
+
+
+class TestLodPyramid(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.lat = -6.2 + rng.normal(scale=0.05, size=5000)
+        self.lon = 39.3 + rng.normal(scale=0.05, size=5000)
+        self.load = rng.exponential(size=5000)
+        self.pyramid = lod.build_pyramid(self.lat, self.lon, {'load': self.load}, min_level=8, max_level=18)
+
+    def test_levels_preserve_totals_and_maxima(self):
+        for level, cells in self.pyramid.levels.items():
+            self.assertEqual(cells['count'].sum(), 5000)
+            self.assertAlmostEqual(cells['load_sum'].sum(), self.load.sum())
+            self.assertEqual(cells['load_max'].max(), self.load.max())
+            self.assertTrue((cells['level'] == level).all())
+
+    def test_coarser_levels_have_fewer_cells(self):
+        sizes = [len(self.pyramid.levels[level]) for level in sorted(self.pyramid.levels)]
+        self.assertEqual(sizes, sorted(sizes))
+        self.assertLessEqual(sizes[0], 4)
+
+    def test_select_respects_budget(self):
+        cells = self.pyramid.select(max_features=500)
+        self.assertLessEqual(len(cells), 500)
+        finer = cells['level'].iloc[0] + 1
+        self.assertGreater(len(self.pyramid.levels[finer]), 500)
+
+    def test_deterministic(self):
+        again = lod.build_pyramid(self.lat, self.lon, {'load': self.load}, min_level=8, max_level=18)
+        np.testing.assert_array_equal(again.select(500).values, self.pyramid.select(500).values)
+
+
+if __name__ == '__main__':
+    unittest.main()
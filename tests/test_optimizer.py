@@ -0,0 +1,77 @@
+"""Tests for the lazy-greedy upgrade optimizer."""
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app import config, engine, optimizer
+
+
+def _objective(influence, delta, picked, cap):
+    reduction = influence[:, picked] @ delta[picked] if len(picked) else np.zeros(influence.shape[0])
+    return np.minimum(reduction, cap).sum()
+
+
+def _plain_greedy(influence, delta, cost, budget, cap):
+    picked, spent = [], 0.0
+    while True:
+        current = _objective(influence, delta, picked, cap)
+        best, best_ratio = None, 0.0
+        for s in range(influence.shape[1]):
+            if s in picked or cost[s] > budget - spent:
+                continue
+            ratio = (_objective(influence, delta, picked + [s], cap) - current) / cost[s]
+            if ratio > best_ratio + 1e-12:
+                best, best_ratio = s, ratio
+        if best is None:
+            return picked
+        picked.append(best)
+        spent += cost[best]
+
+
+class TestLazyGreedy(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(9)
+        self.influence = sparse.random(40, 120, density=0.08, random_state=3, format='csc')
+        self.delta = rng.uniform(0, 5, 120)
+        self.cost = rng.integers(1, 4, 120).astype(float)
+        self.cap = rng.uniform(0, 2, 40)
+
+    def test_matches_plain_greedy(self):
+        for cap in (self.cap, np.full(40, np.inf)):
+            picked, gains = optimizer.lazy_greedy(self.influence, self.delta, self.cost, 15.0, cap)
+            expected = _plain_greedy(self.influence, self.delta, self.cost, 15.0, cap)
+            self.assertEqual(picked.tolist(), expected)
+            self.assertAlmostEqual(gains.sum(), _objective(self.influence, self.delta, picked, cap))
+
+    def test_respects_budget_and_gains_shrink(self):
+        picked, gains = optimizer.lazy_greedy(self.influence, self.delta, np.ones(120), 10.0, self.cap)
+        self.assertLessEqual(len(picked), 10)
+        self.assertTrue(np.all(np.diff(gains) <= 1e-12))
+
+    def test_single_large_source_beats_many_small(self):
+        influence = sparse.csc_matrix(np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 1.0]]))
+        picked, _ = optimizer.lazy_greedy(influence, np.array([100.0, 1.0, 1.0]), np.array([10.0, 1.0, 1.0]), 10.0)
+        self.assertEqual(picked.tolist(), [0])
+
+
+class TestOptimizeUpgrades(unittest.TestCase):
+
+    def test_rejects_coarsened_sources(self):
+        toilets = pd.DataFrame({'lat': [-6.1, -6.1], 'long': [39.2, 39.2], 'toilet_category_id': [2, 2],
+                                'pathogen_containment_efficiency': [0.1, 0.1], 'household_population': [5.0, 3.0]})
+        with patch.object(config, 'SOURCE_COARSEN_M', 0.0), \
+                patch('app.engine.load_and_standardize_sanitation', return_value=toilets), \
+                patch('app.engine.compute_pipeline') as pipeline:
+            for state in (engine.EngineState(), None):
+                with self.assertRaises(ValueError):
+                    optimizer.optimize_upgrades(10.0, state=state)
+        pipeline.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
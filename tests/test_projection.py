@@ -0,0 +1,71 @@
+"""Tests for batched multi-year projections."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from app import config, engine, projection
+
+
+class TestProjection(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = patch.object(config, 'SPATIAL_INDEX_DIR', Path(self.tmp.name) / 'index')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        rng = np.random.default_rng(12)
+        n = 4000
+        sanitation = pd.DataFrame({
+            'id': np.arange(n),
+            'lat': rng.uniform(-6.17, -6.15, n),
+            'long': rng.uniform(39.18, 39.20, n),
+            'toilet_category_id': rng.choice([1, 2, 3, 4], size=n),
+            'household_population': rng.integers(3, 12, size=n).astype(float),
+        })
+        sanitation['pathogen_containment_efficiency'] = sanitation['toilet_category_id'].map(
+            config.CONTAINMENT_EFFICIENCY_DEFAULT)
+        self.state = engine.EngineState()
+        self.state._sanitation = sanitation
+        self.state._boreholes = {
+            btype: pd.DataFrame({'lat': rng.uniform(-6.17, -6.15, m), 'long': rng.uniform(39.18, 39.20, m),
+                                 'Q_L_per_day': rng.uniform(1e4, 3e4, m)})
+            for btype, m in (('private', 200), ('government', 30))
+        }
+        years = range(2025, 2031)
+        self.schedule = projection.make_schedule(
+            years, annual_growth=0.03,
+            od_reduction_percent=projection.ramp(years, 0, 90),
+            infrastructure_upgrade_percent=projection.ramp(years, 0, 50, 2027, 2029),
+            fecal_sludge_treatment_percent=25.0,
+        )
+        self.override = {'radius_by_type': {'private': 35.0, 'government': 100.0}, 'stone_town_sewer_enabled': True}
+
+    def test_schedule(self):
+        np.testing.assert_allclose(self.schedule['pop_factor'], 1.03 ** np.arange(6))
+        np.testing.assert_allclose(self.schedule['infrastructure_upgrade_percent'], [0, 0, 0, 25, 50, 50])
+        with self.assertRaises(ValueError):
+            projection.make_schedule(range(2025, 2027), sewer_percent=10)
+
+    def test_matches_yearly_pipeline_runs(self):
+        result = projection.project(self.schedule, scenario_override=self.override, state=self.state)
+        self.assertEqual(result.concentration.shape, (6, 230))
+        for row in (0, 3, 5):
+            year = self.schedule.iloc[row]
+            override = {**self.override, 'pop_factor': year['pop_factor'],
+                        **{key: year[key] for key in projection.SCHEDULE_KEYS}}
+            expected = engine.compute_pipeline('fio', 'custom', override, state=self.state).concentrations
+            np.testing.assert_allclose(result.concentration[row], expected['concentration_CFU_per_100mL'].values,
+                                       rtol=1e-10, atol=1e-12)
+        self.assertEqual([s['year'] for s in result.summary], list(range(2025, 2031)))
+        self.assertEqual(result.summary[0]['all']['count'], 230)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Tests for cached targeted-protection zones."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from app import config, protection
+from app.scenario_diff import BaselineRisk
+
+
+class TestProtectionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = patch.object(config, 'SPATIAL_INDEX_DIR', Path(self.tmp.name) / 'index')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        rng = np.random.default_rng(4)
+        self.toilets = np.column_stack([rng.uniform(-6.17, -6.15, 3000), rng.uniform(39.18, 39.20, 3000)])
+        latlon = np.column_stack([rng.uniform(-6.17, -6.15, 200), rng.uniform(39.18, 39.20, 200)])
+        risk = rng.uniform(0, 100, 200)
+        risk[7], latlon[7] = np.nan, np.nan  # borehole missing from the baseline
+        self.baseline = BaselineRisk(risk_score=risk, concentration=risk, latlon=latlon)
+        self.path = Path(self.tmp.name) / 'protection.npz'
+
+    def _brute_force(self, percentile, buffer_m):
+        risk = self.baseline.risk_score
+        high = np.flatnonzero(risk >= np.nanquantile(risk, percentile))
+        tree = BallTree(np.radians(self.toilets), metric='haversine')
+        hits = tree.query_radius(np.radians(self.baseline.latlon[high]), r=buffer_m / config.EARTH_RADIUS_M)
+        return np.unique(np.concatenate(hits))
+
+    def test_select_matches_direct_query(self):
+        index = protection.build_protection_index(self.toilets, self.baseline, max_buffer_m=100.0)
+        for percentile, buffer_m in ((0.95, 35.0), (0.8, 100.0), (0.5, 10.0)):
+            np.testing.assert_array_equal(index.select(percentile, buffer_m), self._brute_force(percentile, buffer_m))
+        self.assertEqual(index.zones.indptr[8] - index.zones.indptr[7], 0)
+
+    def test_buffer_beyond_cached_zones(self):
+        index = protection.build_protection_index(self.toilets, self.baseline, max_buffer_m=50.0)
+        with self.assertRaises(ValueError):
+            index.select(0.95, 60.0)
+
+    def test_cached_per_baseline(self):
+        first = protection.load_or_build_protection_index(self.toilets, self.baseline, 100.0, path=self.path)
+        with patch.object(protection, 'build_protection_index') as build:
+            again = protection.load_or_build_protection_index(self.toilets, self.baseline, 100.0, path=self.path)
+            build.assert_not_called()
+        np.testing.assert_array_equal(again.select(), first.select())
+
+        changed = BaselineRisk(risk_score=self.baseline.risk_score[::-1].copy(),
+                               concentration=self.baseline.concentration, latlon=self.baseline.latlon)
+        rebuilt = protection.load_or_build_protection_index(self.toilets, changed, 100.0, path=self.path)
+        self.assertNotEqual(rebuilt.key, first.key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Tests for scenario-vs-baseline diffs."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app import scenario_diff
+
+
+def _concentrations(risk, order=None):
+    n = len(risk)
+    df = pd.DataFrame({
+        'borehole_index': np.arange(n),
+        'borehole_type': ['private'] * (n - 2) + ['government'] * 2,
+        'lat': np.linspace(-6.3, -6.1, n),
+        'long': np.linspace(39.2, 39.4, n),
+        'risk_score': risk,
+        'concentration_CFU_per_100mL': 10 ** (np.asarray(risk) / 20) - 1,
+    })
+    return df.iloc[order].reset_index(drop=True) if order is not None else df
+
+
+class TestScenarioDiff(unittest.TestCase):
+
+    def setUp(self):
+        self.base_risk = np.array([80.0, 60.0, 40.0, 20.0, 90.0, 50.0])
+        self.baseline = scenario_diff.BaselineRisk.from_concentrations(_concentrations(self.base_risk))
+
+    def test_aligns_by_borehole_index(self):
+        scenario_risk = self.base_risk - np.array([10.0, 0.0, 5.0, -2.0, 30.0, 0.05])
+        order = [3, 0, 5, 1, 4, 2]
+        diff = scenario_diff.compute_diff(_concentrations(scenario_risk, order), self.baseline)
+        np.testing.assert_array_equal(diff.borehole_index, order)
+        np.testing.assert_allclose(diff.improvement, [-2.0, 10.0, 0.05, 0.0, 30.0, 5.0], atol=1e-5)
+        np.testing.assert_array_equal(diff.mask(), [False, True, False, False, True, True])
+        np.testing.assert_array_equal(diff.mask(['government']), [False, False, False, False, True, False])
+
+    def test_summary_totals(self):
+        scenario_risk = self.base_risk - np.array([10.0, 0.0, 5.0, -2.0, 30.0, 0.05])
+        summary = scenario_diff.compute_diff(_concentrations(scenario_risk), self.baseline).summary
+        self.assertEqual(summary['all']['improved'], 3)
+        self.assertEqual(summary['all']['worsened'], 1)
+        self.assertAlmostEqual(summary['all']['risk_reduced'], 45.0, places=4)
+        self.assertAlmostEqual(summary['by_type']['private']['risk_reduced'], 15.0, places=4)
+        self.assertAlmostEqual(summary['by_type']['government']['risk_reduced'], 30.0, places=4)
+
+    def test_mismatched_baseline_is_skipped(self):
+        longer = _concentrations(np.append(self.base_risk, 10.0))
+        self.assertIsNone(scenario_diff.compute_diff(longer, self.baseline))
+
+    def test_save_and_load(self):
+        diff = scenario_diff.compute_diff(_concentrations(self.base_risk - 1.0), self.baseline)
+        with tempfile.TemporaryDirectory() as tmp:
+            npz, summary = diff.save(Path(tmp) / 'diff.npz', Path(tmp) / 'diff.json')
+            loaded = scenario_diff.ScenarioDiff.load(npz, summary)
+            self.baseline.save(Path(tmp) / 'baseline.npz')
+            baseline = scenario_diff.BaselineRisk.load(Path(tmp) / 'baseline.npz')
+        np.testing.assert_array_equal(loaded.improvement, diff.improvement)
+        np.testing.assert_array_equal(loaded.borehole_type, diff.borehole_type)
+        self.assertEqual(loaded.summary, diff.summary)
+        np.testing.assert_array_equal(baseline.risk_score, self.baseline.risk_score)
+
+
+if __name__ == '__main__':
+    unittest.main()
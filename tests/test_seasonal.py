@@ -0,0 +1,94 @@
+"""Tests for monthly abstraction-rate concentrations."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app import engine, seasonal
+
+
+class TestSeasonal(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.conc = pd.DataFrame({
+            'borehole_index': np.arange(6),
+            'borehole_type': ['private'] * 4 + ['government'] * 2,
+            'aggregated_load': rng.uniform(1e5, 1e8, 6),
+            'Q_L_per_day': [2000.0, 1000.0, 2000.0, 500.0, 20000.0, 20000.0],
+        })
+        self.factors = [1.0, 1.0, 0.8, 0.6, 0.6, 0.7, 1.0, 1.2, 1.3, 1.2, 1.0, 1.0]
+        self.scenario = {'monthly_q_factors': self.factors,
+                         'flow_multiplier_by_type': {'private': 1.0, 'government': 10.0}}
+
+    def test_months_match_compute_concentration(self):
+        result = engine.compute_seasonal(self.conc, self.scenario)
+        self.assertEqual(result.concentration.shape, (12, 6))
+        for month, factor in enumerate(self.factors):
+            for btype, flow in (('private', 1.0), ('government', 10.0)):
+                part = self.conc[self.conc['borehole_type'] == btype]
+                expected = engine.compute_concentration(part.assign(Q_L_per_day=part['Q_L_per_day'] * factor),
+                                                        flow_multiplier=flow)
+                np.testing.assert_allclose(result.concentration[month, part.index],
+                                           expected['concentration_CFU_per_100mL'].values, rtol=1e-12)
+                np.testing.assert_allclose(result.risk_score[month, part.index], expected['risk_score'].values,
+                                           rtol=1e-12)
+
+    def test_profile_precedence(self):
+        conc = self.conc.copy()
+        for m, column in enumerate(seasonal.MONTH_COLUMNS):
+            conc[column] = [100.0 + m, np.nan, np.nan, np.nan, np.nan, np.nan]
+        profile = pd.DataFrame({'borehole_index': [1, 0],
+                                **{c: [50.0, 1.0] if m < 6 else [np.nan, 1.0]
+                                   for m, c in enumerate(seasonal.MONTH_COLUMNS)}})
+        q = seasonal.monthly_q(conc, self.factors, profile)
+        np.testing.assert_allclose(q[:, 0], 1.0)  # profile overrides the table columns
+        np.testing.assert_allclose(q[:6, 1], 50.0)
+        np.testing.assert_allclose(q[6:, 1], 1000.0 * np.array(self.factors[6:]))
+        np.testing.assert_allclose(q[:, 2], 2000.0 * np.array(self.factors))
+        with self.assertRaises(ValueError):
+            seasonal.monthly_q(conc, [1.0] * 11)
+
+    def test_load_profile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'profile.csv'
+            self.assertIsNone(seasonal.load_profile(path))
+            pd.DataFrame({'borehole_index': [0], 'Q_L_per_day_01': [1.0]}).to_csv(path, index=False)
+            with self.assertRaises(ValueError):
+                seasonal.load_profile(path)
+
+    def test_exceedance_summary(self):
+        result = engine.compute_seasonal(self.conc, {**self.scenario, 'seasonal_exceedance_cfu': 500.0})
+        months = result.exceedance_months()
+        np.testing.assert_array_equal(months, (result.concentration > 500.0).sum(axis=0))
+        stats = result.summary()
+        self.assertEqual(stats['all']['count'], 6)
+        self.assertEqual(sum(stats['all']['exceedance_months_histogram']), 6)
+        self.assertEqual(stats['by_type']['government']['count'], 2)
+        self.assertAlmostEqual(stats['all']['mean_exceedance_frequency'], months.mean() / 12)
+
+    def test_non_pumping_months(self):
+        conc = self.conc.assign(aggregated_load=[1e8, 0.0, 1e8, 1e8, 1e8, 1e8])
+        scenario = {**self.scenario, 'monthly_q_factors': [1.0] * 11 + [0.0], 'seasonal_exceedance_cfu': 1.0}
+        with np.errstate(all='raise'):
+            result = engine.compute_seasonal(conc, scenario)
+            stats = result.summary()
+        self.assertTrue(np.isnan(result.concentration[11]).all())
+        self.assertTrue(np.isfinite(result.concentration[:11]).all())
+        np.testing.assert_array_equal(result.pumping_months(), 11)
+        np.testing.assert_array_equal(result.exceedance_months(), [11, 0, 11, 11, 11, 11])
+        self.assertEqual(stats['all']['exceeding_by_month'][11], 0)
+        self.assertEqual(stats['all']['pumping_by_month'][11], 0)
+        self.assertEqual(stats['all']['wells_exceeding_all_months'], 5)
+        self.assertAlmostEqual(stats['all']['mean_exceedance_frequency'], 5 / 6)
+        self.assertTrue(np.isfinite(stats['all']['concentration_mean_by_month']).all())
+        self.assertEqual(stats['all']['concentration_mean_by_month'][11], 0.0)
+        with self.assertRaises(ValueError):
+            seasonal.monthly_q(conc, [1.0] * 11 + [-1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
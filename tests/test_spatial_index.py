@@ -0,0 +1,98 @@
+"""Tests for the pluggable spatial index backends."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from app import config, spatial_index
+
+
+class TestProjection(unittest.TestCase):
+
+    def test_local_scale_matches_ellipsoid(self):
+        # 0.001 deg steps near Stone Town against WGS84 meridional / parallel arc lengths
+        lat = -6.165
+        xy = spatial_index.project_utm(np.array([[lat, 39.202], [lat + 0.001, 39.202], [lat, 39.203]]))
+        e2 = spatial_index.WGS84_F * (2 - spatial_index.WGS84_F)
+        s2 = np.sin(np.radians(lat)) ** 2
+        meridional = spatial_index.WGS84_A * (1 - e2) / (1 - e2 * s2) ** 1.5 * np.radians(0.001)
+        parallel = spatial_index.WGS84_A / np.sqrt(1 - e2 * s2) * np.cos(np.radians(lat)) * np.radians(0.001)
+        self.assertAlmostEqual(np.hypot(*(xy[1] - xy[0])), meridional * spatial_index.UTM_K0, delta=0.01)
+        self.assertAlmostEqual(np.hypot(*(xy[2] - xy[0])), parallel * spatial_index.UTM_K0, delta=0.01)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            spatial_index.build_index(np.zeros((1, 2)), backend='rtree')
+
+
+class TestPersistedIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.points = np.column_stack([rng.uniform(-6.3, -6.0, 2000), rng.uniform(39.2, 39.4, 2000)])
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch.object(config, 'SPATIAL_INDEX_DIR', Path(self.tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_round_trip_is_memory_mapped(self):
+        for backend in spatial_index.BACKENDS:
+            built = spatial_index.load_or_build_index(self.points, backend)
+            loaded = spatial_index.load_or_build_index(self.points, backend)
+            self.assertIsNot(built, loaded)
+            expected = built.query_radius(self.points[:50], 300.0)
+            actual = loaded.query_radius(self.points[:50], 300.0)
+            for e, a in zip(expected, actual):
+                np.testing.assert_array_equal(np.sort(e), np.sort(a))
+        self.assertEqual(len(list(Path(self.tmp.name).glob('*.joblib'))), 2)
+
+    def test_fingerprint_tracks_coordinates_and_backend(self):
+        moved = self.points.copy()
+        moved[0, 0] += 1e-7
+        key = spatial_index.fingerprint(self.points, 'utm')
+        self.assertEqual(key, spatial_index.fingerprint(self.points.copy(), 'utm'))
+        self.assertNotEqual(key, spatial_index.fingerprint(moved, 'utm'))
+        self.assertNotEqual(key, spatial_index.fingerprint(self.points, 'haversine'))
+
+    def test_prunes_old_files(self):
+        with patch.object(config, 'SPATIAL_INDEX_CACHE_FILES', 2):
+            for shift in range(4):
+                spatial_index.load_or_build_index(self.points + shift * 1e-3, 'utm')
+        self.assertEqual(len(list(Path(self.tmp.name).glob('*.joblib'))), 2)
+
+
+@unittest.skipUnless(config.PRIVATE_BOREHOLES_ENRICHED_PATH.exists(), "bundled borehole data not available")
+class TestBackendEquivalence(unittest.TestCase):
+    """Both backends return the same neighbours on the bundled boreholes.
+
+    Haversine uses a spherical earth, UTM the WGS84 ellipsoid, so distances
+    differ by up to ~0.6%; only pairs that close to the radius may disagree.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        private = pd.read_csv(config.PRIVATE_BOREHOLES_ENRICHED_PATH, usecols=['lat', 'long']).dropna()
+        cls.points = private.values
+        cls.queries = private.sample(300, random_state=0).values
+
+    def test_neighbours_agree(self):
+        for radius in (25.0, 250.0):
+            results = {}
+            for backend in spatial_index.BACKENDS:
+                index = spatial_index.build_index(self.points, backend)
+                indices, distances = index.query_radius(self.queries, radius, return_distance=True)
+                results[backend] = [dict(zip(i, d)) for i, d in zip(indices, distances)]
+            for hav, utm in zip(results['haversine'], results['utm']):
+                for j in set(hav) ^ set(utm):
+                    self.assertAlmostEqual(hav.get(j, utm.get(j)), radius, delta=0.01 * radius)
+                for j in set(hav) & set(utm):
+                    self.assertAlmostEqual(hav[j], utm[j], delta=0.01 * radius)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Tests for per-run summary statistics."""
+
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app import summary
+
+
+class TestRunSummary(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        risk = np.concatenate([rng.uniform(0, 100, 500), [25.0, 50.0, 60.0, 90.0, 0.0]])
+        self.conc = pd.DataFrame({
+            'borehole_type': rng.choice(['private', 'government'], size=len(risk)),
+            'risk_score': risk,
+            'concentration_CFU_per_100mL': 10 ** (risk / 20) - 1,
+        })
+        loads = np.round(rng.exponential(5, 1000), 1)
+        loads[:50] = 0.0
+        self.loads = pd.DataFrame({'nitrogen_load': loads})
+
+    def test_risk_buckets_match_pd_cut(self):
+        result = summary.summarize_concentrations(self.conc)
+        for btype, part in self.conc.groupby('borehole_type'):
+            expected = pd.cut(part['risk_score'], bins=summary.RISK_BINS, labels=summary.RISK_LABELS).value_counts()
+            self.assertEqual(result['by_type'][btype]['risk_buckets'], {k: int(expected[k]) for k in summary.RISK_LABELS})
+            self.assertEqual(result['by_type'][btype]['count'], len(part))
+        self.assertEqual(sum(result['all']['risk_histogram']['counts']), len(self.conc))
+
+    def test_load_buckets_match_pd_cut(self):
+        stats = summary.summarize_loads(self.loads, 'nitrogen_load')
+        values = self.loads['nitrogen_load']
+        q33, q67 = values.quantile(0.33), values.quantile(0.67)
+        self.assertAlmostEqual(stats['quantiles']['0.33'], q33)
+        self.assertAlmostEqual(stats['quantiles']['0.95'], values.quantile(0.95))
+        expected = pd.cut(values, bins=[0, q33, q67, values.max() + 1], labels=summary.LOAD_LABELS).value_counts()
+        self.assertEqual(stats['buckets'], {k: int(expected[k]) for k in summary.LOAD_LABELS})
+        self.assertAlmostEqual(stats['total'], values.sum())
+
+    def test_uniform_loads(self):
+        stats = summary.summarize_loads(pd.DataFrame({'phosphorus_load': np.full(10, 0.5)}), 'phosphorus_load')
+        self.assertTrue(stats['uniform'])
+        self.assertEqual(stats['buckets'], {'Low': 0, 'Moderate': 10, 'High': 0})
+
+    def test_result_is_json_serialisable(self):
+        result = summary.summarize_result('fio', 'baseline_2025', self.loads, self.conc)
+        self.assertEqual(json.loads(json.dumps(result)), result)
+
+
+if __name__ == '__main__':
+    unittest.main()
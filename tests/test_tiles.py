@@ -0,0 +1,109 @@
+"""Tests for the offline tile pyramid export."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app import summary, tiles
+
+
+class TestTileExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name)
+        rng = np.random.default_rng(1)
+        self.boreholes = pd.DataFrame({
+            'lat': -6.16 + rng.normal(scale=0.02, size=50),
+            'long': 39.2 + rng.normal(scale=0.02, size=50),
+            'risk_score': rng.uniform(0, 100, size=50),
+            'concentration_CFU_per_100mL': rng.exponential(100, size=50),
+            'borehole_type': ['private'] * 40 + ['government'] * 10,
+        })
+        self.toilets = pd.DataFrame({
+            'lat': -6.16 + rng.normal(scale=0.02, size=400),
+            'long': 39.2 + rng.normal(scale=0.02, size=400),
+            'toilet_category_id': rng.integers(1, 5, size=400),
+            'load': rng.exponential(1e7, size=400),
+        })
+        square = [[39.15, -6.2], [39.25, -6.2], [39.25, -6.1], [39.15, -6.1], [39.15, -6.2]]
+        self.wards = {'features': [{
+            'properties': {'ward_name': 'Test'},
+            'geometry': {'type': 'MultiPolygon', 'coordinates': [[square]]},
+        }]}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def export(self, boreholes=None):
+        return tiles.export_tiles(
+            self.boreholes if boreholes is None else boreholes, self.toilets, self.wards, self.out,
+            min_zoom=9, max_zoom=11, workers=1
+        )
+
+    def test_tiles_round_trip_and_preserve_totals(self):
+        self.export()
+        for z in (9, 10, 11):
+            n_boreholes, n_toilets, load = 0, 0, 0.0
+            for path in (self.out / str(z)).glob('*/*.bin'):
+                header, layers = tiles.read_tile(path)
+                self.assertEqual(header['z'], z)
+                n_boreholes += len(layers['boreholes']['risk_score'])
+                n_toilets += sum(int(layers['toilets'][f'cat_{c}'].sum()) for c in (1, 2, 3, 4))
+                load += float(layers['toilets']['load'].astype(float).sum())
+                self.assertEqual(header['summary']['boreholes'], header['layers']['boreholes']['count'])
+            self.assertEqual(n_boreholes, 50)
+            self.assertEqual(n_toilets, 400)
+            self.assertAlmostEqual(load / self.toilets['load'].sum(), 1.0, places=5)
+
+    def test_reexport_only_rewrites_changed_tiles(self):
+        first = self.export()
+        self.assertGreater(first['written'], 0)
+        self.assertEqual(self.export()['written'], 0)
+
+        changed = self.boreholes.copy()
+        changed.loc[0, 'risk_score'] = 1.0
+        stats = self.export(changed)
+        self.assertEqual(stats['written'], 3)  # one tile per zoom level
+        self.assertEqual(stats['unchanged'], first['written'] - 3)
+
+    def test_risk_buckets_match_summary(self):
+        boreholes = self.boreholes.assign(risk_score=np.resize([0.0, 25.0, 50.0, 60.0, 90.0, 100.0], 50))
+        self.export(boreholes)
+        counts = {}
+        for path in (self.out / '9').glob('*/*.bin'):
+            header, _ = tiles.read_tile(path)
+            for label, n in header['summary'].get('risk_buckets', {}).items():
+                counts[label] = counts.get(label, 0) + n
+        expected = summary.summarize_concentrations(boreholes)['all']['risk_buckets']
+        self.assertEqual(list(counts.values()), [expected[label] for label in summary.RISK_LABELS])
+        self.assertEqual(list(counts), tiles.RISK_LABELS)
+
+    def test_split_rows_count_one_toilet(self):
+        toilets = self.toilets.assign(source_index=np.arange(400))
+        split = toilets.iloc[:100].assign(toilet_category_id=3, load=1.0)
+        self.toilets = pd.concat([toilets, split], ignore_index=True)
+        self.export()
+        n_toilets, n_septic, load = 0, 0, 0.0
+        for path in (self.out / '9').glob('*/*.bin'):
+            header, layers = tiles.read_tile(path)
+            n_toilets += header['summary']['toilets']
+            n_septic += header['summary']['toilet_categories']['cat_3']
+            load += float(layers['toilets']['load'].astype(float).sum())
+        self.assertEqual(n_toilets, 400)
+        self.assertEqual(n_septic, int((toilets['toilet_category_id'] == 3).sum()))
+        self.assertAlmostEqual(load / self.toilets['load'].sum(), 1.0, places=5)
+
+    def test_clip_ring_to_tile(self):
+        ring = np.array([[-10.0, -10.0], [20.0, -10.0], [20.0, 20.0], [-10.0, 20.0]])
+        clipped = tiles._clip_ring(ring, 0.0, 10.0)
+        self.assertEqual(clipped.min(), 0.0)
+        self.assertEqual(clipped.max(), 10.0)
+        self.assertEqual(len(np.unique(clipped, axis=0)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+"""Tests for Layer 2 transport primitives."""
+
+import unittest
+
+import numpy as np
+
+from app import transport
+
+
+class TestTiledTransport(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        centers = np.column_stack([rng.uniform(-6.4, -5.8, 40), rng.uniform(39.1, 39.5, 40)])
+        self.sources = centers[rng.integers(0, 40, 20000)] + rng.normal(scale=0.002, size=(20000, 2))
+        self.loads = rng.exponential(size=20000)
+        self.boreholes = centers[rng.integers(0, 40, 800)] + rng.normal(scale=0.003, size=(800, 2))
+
+    def test_matches_in_memory(self):
+        for radius in (35.0, 250.0):
+            expected = transport.accumulate(
+                transport.build_adjacency(self.sources, self.boreholes, radius), self.loads, 0.01
+            )
+            tiled = transport.accumulate_tiled(self.sources, self.loads, self.boreholes, radius, 0.01,
+                                               memory_budget_mb=0.25)
+            np.testing.assert_allclose(tiled, expected, rtol=1e-12, atol=0)
+
+    def test_tiles_cover_each_borehole_once(self):
+        budget = 2 ** 18
+        tiles = list(transport.plan_tiles(self.sources, self.boreholes, 250.0, budget))
+        self.assertGreater(len(tiles), 1)
+        rows = np.sort(np.concatenate([bh for bh, _ in tiles]))
+        np.testing.assert_array_equal(rows, np.arange(len(self.boreholes)))
+
+    def test_estimate_tracks_actual_pairs(self):
+        adjacency = transport.build_adjacency(self.sources, self.boreholes, 250.0)
+        estimate = transport.estimate_pairs(self.sources, self.boreholes, 250.0).sum()
+        self.assertLess(abs(estimate / adjacency.n_pairs - 1), 0.5)
+
+
+class TestParallelTransport(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.sources = np.column_stack([rng.uniform(-6.3, -6.0, 5000), rng.uniform(39.2, 39.4, 5000)])
+        self.loads = rng.exponential(size=5000)
+        self.boreholes = np.column_stack([rng.uniform(-6.3, -6.0, 300), rng.uniform(39.2, 39.4, 300)])
+
+    def test_matches_in_memory_and_is_worker_independent(self):
+        expected = transport.accumulate(
+            transport.build_adjacency(self.sources, self.boreholes, 300.0), self.loads, 0.01
+        )
+        serial = transport.accumulate_parallel(self.sources, self.loads, self.boreholes, 300.0, 0.01,
+                                               workers=1, n_shards=8)
+        pooled = transport.accumulate_parallel(self.sources, self.loads, self.boreholes, 300.0, 0.01,
+                                               workers=2, n_shards=8)
+        np.testing.assert_allclose(serial, expected, rtol=1e-12, atol=0)
+        np.testing.assert_array_equal(pooled, serial)
+
+    def test_shards_partition_boreholes(self):
+        shards = transport.spatial_shards(self.sources, self.boreholes, 300.0, 8)
+        self.assertEqual(len(shards), 8)
+        np.testing.assert_array_equal(np.sort(np.concatenate(shards)), np.arange(len(self.boreholes)))
+
+
+class TestFarFieldTransport(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        centers = np.column_stack([rng.uniform(-6.3, -6.0, 10), rng.uniform(39.2, 39.4, 10)])
+        self.sources = centers[rng.integers(0, 10, 30000)] + rng.normal(scale=0.003, size=(30000, 2))
+        self.loads = rng.exponential(size=30000)
+        self.boreholes = centers[rng.integers(0, 10, 200)] + rng.normal(scale=0.003, size=(200, 2))
+
+    def test_within_tolerance_of_exact(self):
+        for backend in ('haversine', 'utm'):
+            for radius, decay in ((250.0, 0.01), (500.0, 0.002)):
+                expected = transport.accumulate(
+                    transport.build_adjacency(self.sources, self.boreholes, radius, backend=backend),
+                    self.loads, decay
+                )
+                tree = transport.FarFieldTree(self.sources, top_m=radius, backend=backend)
+                approx, error = transport.accumulate_far_field(self.sources, self.loads, self.boreholes,
+                                                               radius, decay, tolerance=0.01, tree=tree)
+                np.testing.assert_allclose(approx, expected, rtol=0.01)
+                self.assertTrue(np.all(error >= 0))
+                self.assertTrue(np.all(error <= 0.01 * approx + 1e-12))
+
+    def test_tight_tolerance_is_exact(self):
+        expected = transport.accumulate(
+            transport.build_adjacency(self.sources, self.boreholes, 100.0), self.loads, 0.01
+        )
+        approx, error = transport.accumulate_far_field(self.sources, self.loads, self.boreholes, 100.0, 0.01,
+                                                       tolerance=0.0)
+        np.testing.assert_allclose(approx, expected, rtol=1e-9)
+
+    def test_empty_inputs(self):
+        approx, error = transport.accumulate_far_field(np.zeros((0, 2)), np.zeros(0), self.boreholes, 250.0, 0.01)
+        np.testing.assert_array_equal(approx, np.zeros(len(self.boreholes)))
+
+
+class TestAttribution(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.sources = np.column_stack([rng.uniform(-6.2, -6.19, 3000), rng.uniform(39.2, 39.21, 3000)])
+        self.boreholes = np.column_stack([rng.uniform(-6.2, -6.19, 200), rng.uniform(39.2, 39.21, 200)])
+        self.category_loads = rng.exponential(size=(3000, 3)) * (rng.random((3000, 3)) < 0.5)
+        self.adjacency = transport.build_adjacency(self.sources, self.boreholes, 80.0)
+
+    def test_matches_brute_force(self):
+        attribution = transport.attribute(self.adjacency, self.category_loads, 0.01, k=4)
+        np.testing.assert_allclose(attribution.category_loads.sum(axis=1),
+                                   transport.accumulate(self.adjacency, self.category_loads.sum(axis=1), 0.01),
+                                   rtol=1e-12)
+        for row in range(self.adjacency.n_boreholes):
+            lo, hi = self.adjacency.indptr[row], self.adjacency.indptr[row + 1]
+            contrib = self.category_loads.sum(axis=1)[self.adjacency.indices[lo:hi]] * np.exp(
+                -0.01 * self.adjacency.distances_m[lo:hi])
+            expected = np.sort(contrib[contrib > 0])[::-1][:4]
+            got = attribution.top_loads[row][attribution.top_sources[row] >= 0]
+            np.testing.assert_allclose(got, expected, rtol=1e-12)
+        shares = attribution.category_shares()
+        np.testing.assert_allclose(shares.sum(axis=1)[attribution.category_loads.sum(axis=1) > 0], 1.0)
+
+    def test_tiled_matches_in_memory(self):
+        expected = transport.attribute(self.adjacency, self.category_loads, 0.01, k=3)
+        tiled = transport.attribute_tiled(self.sources, self.category_loads, self.boreholes, 80.0, 0.01, k=3,
+                                          memory_budget_mb=0.05)
+        np.testing.assert_array_equal(tiled.top_sources, expected.top_sources)
+        np.testing.assert_allclose(tiled.top_loads, expected.top_loads, rtol=1e-12)
+        np.testing.assert_allclose(tiled.category_loads, expected.category_loads, rtol=1e-12)
+
+    def test_parallel_matches_in_memory(self):
+        expected = transport.attribute(self.adjacency, self.category_loads, 0.01, k=3)
+        pooled = transport.attribute_parallel(self.sources, self.category_loads, self.boreholes, 80.0, 0.01, k=3,
+                                              workers=1, n_shards=7)
+        np.testing.assert_array_equal(pooled.top_sources, expected.top_sources)
+        np.testing.assert_allclose(pooled.category_loads, expected.category_loads, rtol=1e-12)
+
+    def test_far_field_top_k_is_exact(self):
+        adjacency = transport.build_adjacency(self.sources, self.boreholes, 250.0)
+        expected = transport.attribute(adjacency, self.category_loads, 0.01, k=4)
+        attribution, error = transport.attribute_far_field(self.sources, self.category_loads, self.boreholes,
+                                                           250.0, 0.01, k=4, tolerance=0.01)
+        np.testing.assert_array_equal(attribution.top_sources, expected.top_sources)
+        np.testing.assert_allclose(attribution.top_loads, expected.top_loads, rtol=1e-10)
+        totals, expected_error = transport.accumulate_far_field(self.sources, self.category_loads.sum(axis=1),
+                                                                self.boreholes, 250.0, 0.01, tolerance=0.01)
+        np.testing.assert_allclose(attribution.category_loads.sum(axis=1), totals, rtol=1e-12)
+        np.testing.assert_allclose(error, expected_error, rtol=1e-12)
+
+
+class TestKernelRadius(unittest.TestCase):
+
+    def test_truncated_fraction_matches_integral(self):
+        k, radius = 0.05, 40.0
+        r = np.linspace(0, 2000, 200001)
+        mass = np.exp(-k * r) * r
+        trapezoid = lambda y, x: float(np.sum(np.diff(x) * (y[1:] + y[:-1]) / 2))
+        expected = trapezoid(mass[r >= radius], r[r >= radius]) / trapezoid(mass, r)
+        self.assertAlmostEqual(transport.truncated_mass_fraction(k, radius), expected, places=4)
+
+    def test_radius_meets_tolerance(self):
+        for k in (0.01, 0.05, 0.2):
+            for tol in (0.1, 0.01, 0.001):
+                radius = transport.kernel_radius(k, tol, min_radius_m=0.0, max_radius_m=1e6)
+                self.assertAlmostEqual(transport.truncated_mass_fraction(k, radius), tol, places=9)
+        # Slower decay needs a wider radius for the same accuracy
+        self.assertGreater(transport.kernel_radius(0.01, 0.01), transport.kernel_radius(0.1, 0.01))
+
+    def test_bounds(self):
+        self.assertEqual(transport.kernel_radius(0.0, 0.01, max_radius_m=500.0), 500.0)
+        self.assertEqual(transport.kernel_radius(5.0, 0.5, min_radius_m=5.0), 5.0)
+        with self.assertRaises(ValueError):
+            transport.kernel_radius(0.01, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
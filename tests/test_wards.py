@@ -0,0 +1,72 @@
+"""Tests for simplified ward geometry."""
+
+import unittest
+
+import numpy as np
+
+from app import wards
+
+
+def _feature(name, ring):
+    return {
+        'type': 'Feature',
+        'properties': {'ward_name': name, 'dist_name': 'D', 'reg_name': 'R', 'extra': 1},
+        'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+    }
+
+
+def _jagged_pair():
+    """Two squares sharing a jagged vertical border at long 39.3."""
+    lats = np.linspace(-6.2, -6.1, 41)
+    border = [[39.3 + (0.00005 if i % 2 else 0.0), lat] for i, lat in enumerate(lats)]
+    west = [[39.2, -6.2]] + border + [[39.2, -6.1], [39.2, -6.2]]
+    east = border[::-1] + [[39.4, -6.2], [39.4, -6.1]]
+    east = [[39.4, -6.1]] + east[:-1] + [[39.4, -6.1]]
+    return {'type': 'FeatureCollection', 'features': [_feature('West', west), _feature('East', east)]}
+
+
+def _ring(feature):
+    return np.asarray(feature['geometry']['coordinates'][0][0])
+
+
+class TestSimplifyWards(unittest.TestCase):
+
+    def setUp(self):
+        self.geojson = _jagged_pair()
+        self.simplified = wards.simplify_geojson(self.geojson, tolerance_m=25.0)
+
+    def test_shared_border_stays_identical(self):
+        west, east = (_ring(f) for f in self.simplified['features'])
+        on_border = lambda ring: {tuple(p) for p in ring if abs(p[0] - 39.3) < 1e-3}
+        self.assertEqual(on_border(west), on_border(east))
+        self.assertGreaterEqual(len(on_border(west)), 2)
+
+    def test_vertex_count_drops_and_rings_stay_valid(self):
+        for before, after in zip(self.geojson['features'], self.simplified['features']):
+            ring = _ring(after)
+            self.assertLess(len(ring), len(before['geometry']['coordinates'][0]))
+            self.assertGreaterEqual(len(ring), 4)
+            np.testing.assert_array_equal(ring[0], ring[-1])
+
+    def test_properties_trimmed(self):
+        props = self.simplified['features'][0]['properties']
+        self.assertEqual(set(props), set(wards.KEEP_PROPERTIES))
+        self.assertEqual(props['ward_name'], 'West')
+
+    def test_isolated_ring_keeps_area(self):
+        square = [[39.0, -6.0], [39.001, -6.0], [39.001, -6.001], [39.0, -6.001], [39.0, -6.0]]
+        out = wards.simplify_geojson({'type': 'FeatureCollection', 'features': [_feature('S', square)]}, 1000.0)
+        self.assertGreaterEqual(len(_ring(out['features'][0])), 4)
+
+
+class TestLevelForZoom(unittest.TestCase):
+
+    def test_finer_levels_at_higher_zoom(self):
+        tolerances = (5.0, 25.0, 100.0)
+        self.assertEqual(wards.level_for_zoom(10, tolerances=tolerances), 100.0)
+        self.assertEqual(wards.level_for_zoom(12, tolerances=tolerances), 25.0)
+        self.assertEqual(wards.level_for_zoom(18, tolerances=tolerances), 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()